@@ -0,0 +1,203 @@
+"""
+HTTP aggregation queries over the weekly cubes of the dashboard
+
+Endpoints, registered on the Flask server of the dashboard:
+
+    GET /api/datasets
+        Dimensions, measures and version of every dataset.
+
+    GET /api/<dataset>/aggregate
+        by        Dimensions to group by, comma separated (default: Semana)
+        metric    Measures to return, comma separated (default: all)
+        stat      sum or mean (default: sum)
+        Region, Categoria, ID_Producto, Semana
+                  Labels to keep, comma separated or repeated; only the
+                  dimensions of the dataset (a filter on any other
+                  parameter is a 400)
+        desde, hasta
+                  Date range (YYYY-MM-DD), applied to whole weeks
+        format    json or arrow (default: json)
+
+    Example: /api/ventas/aggregate?by=Semana,Region&Categoria=Bebidas&desde=2024-03-01
+
+Responses carry an ETag derived from the dataset version and the query, so
+conditional GETs get a 304 while the data does not change.
+"""
+
+import hashlib
+import io
+import json
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, Response, jsonify, request
+
+try:
+    import pyarrow as pa
+except ImportError:  # Without pyarrow only JSON responses are available
+    pa = None
+
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+# Query parameters other than the dimension filters
+PARAMETERS = ("by", "metric", "stat", "desde", "hasta", "format")
+
+
+class QueryError(ValueError):
+    """Invalid aggregation query, answered with a 400."""
+
+
+def create_api(provider):
+    """
+    Blueprint with the aggregation endpoints.
+
+    Args:
+        provider (DataProvider): Provider whose datasets are ``WeeklyCube`` objects
+
+    Returns:
+        flask.Blueprint: Blueprint to register on the server
+    """
+    api = Blueprint("api", __name__, url_prefix="/api")
+
+    @api.errorhandler(QueryError)
+    def bad_query(exc):
+        return jsonify(error=str(exc)), 400
+
+    @api.route("/datasets")
+    def datasets():
+        result = {}
+        for name in provider.names():
+            version, cube = provider.snapshot(name)
+            if cube is None:
+                continue
+            result[name] = {
+                "dims": cube.dims,
+                "measures": cube.measures,
+                "inicio": cube.attrs.get("inicio"),
+                "version": _etag(version, ""),
+            }
+        return jsonify(result)
+
+    @api.route("/<dataset>/aggregate")
+    def aggregate(dataset):
+        if dataset not in provider.names():
+            return jsonify(error=f"Dataset desconocido: {dataset}"), 404
+        # Data and version of the same load, a reload in between cannot mix them
+        version, cube = provider.snapshot(dataset)
+        if cube is None:
+            return jsonify(error=f"Dataset desconocido: {dataset}"), 404
+
+        fmt = request.args.get("format", "json")
+        if fmt not in ("json", "arrow"):
+            raise QueryError(f"Formato desconocido: {fmt}")
+        if fmt == "arrow" and pa is None:
+            raise QueryError("pyarrow es necesario para el formato arrow")
+
+        etag = _etag(version, request.query_string.decode())
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+        result = query_cube(cube, request.args)
+        if fmt == "arrow":
+            response = Response(_to_arrow(result), mimetype=ARROW_MIMETYPE)
+        else:
+            response = Response(result.to_json(orient="split", index=False), mimetype="application/json")
+        # Weak: the gzip and identity encodings share the tag
+        response.set_etag(etag, weak=True)
+        response.cache_control.no_cache = True
+        return response
+
+    return api
+
+
+def query_cube(cube, args):
+    """
+    Answer an aggregation query on a cube.
+
+    Args:
+        cube (WeeklyCube): Cube to query
+        args (werkzeug.datastructures.MultiDict): Query parameters
+
+    Returns:
+        pd.DataFrame: One row per group, with the group columns first
+    """
+    for name in args:
+        if name not in PARAMETERS and name not in cube.dims:
+            raise QueryError(f"Parámetro desconocido: {name}")
+    by = _list(args, "by") or ["Semana"]
+    metrics = _list(args, "metric") or cube.measures
+    stat = args.get("stat", "sum")
+    for col in by:
+        if col not in cube.dims:
+            raise QueryError(f"Dimensión desconocida: {col}")
+    for col in metrics:
+        if col not in cube.measures:
+            raise QueryError(f"Métrica desconocida: {col}")
+    if stat not in ("sum", "mean"):
+        raise QueryError(f"Estadístico desconocido: {stat}")
+
+    where = {}
+    for dim in cube.dims:
+        values = _list(args, dim)
+        if values:
+            where[dim] = _as_labels(values, cube.labels[dim])
+    weeks = _week_range(cube, args.get("desde"), args.get("hasta"))
+    if weeks is not None:
+        lo, hi = weeks
+        labels = cube.labels["Semana"]
+        selected = labels[(labels >= lo) & (labels <= hi)]
+        if "Semana" in where:
+            selected = selected.intersection(pd.Index(where["Semana"]))
+        where["Semana"] = selected
+
+    result = cube.aggregate(by, where, metrics, stat=stat, dropna=stat == "mean")
+    return result.reset_index()
+
+
+def _list(args, name):
+    """Values of a parameter given comma separated or repeated."""
+    values = []
+    for value in args.getlist(name):
+        values.extend(v.strip() for v in value.split(",") if v.strip())
+    return values
+
+
+def _as_labels(values, labels):
+    """Convert query strings to the type of the labels of a dimension."""
+    if pd.api.types.is_integer_dtype(labels.dtype):
+        try:
+            return [int(v) for v in values]
+        except ValueError:
+            raise QueryError(f"Valores no enteros para {labels.name}: {values}") from None
+    return values
+
+
+def _week_range(cube, start, end):
+    """Semana numbers covered by a date range, None without range."""
+    if start is None and end is None:
+        return None
+    if "Semana" not in cube.dims or not cube.attrs.get("inicio"):
+        raise QueryError("El dataset no admite filtros por fecha")
+    origin = pd.Timestamp(cube.attrs["inicio"])
+    try:
+        lo = (pd.Timestamp(start) - origin).days // 7 + 1 if start else -np.inf
+        hi = (pd.Timestamp(end) - origin).days // 7 + 1 if end else np.inf
+    except ValueError:
+        raise QueryError(f"Fecha inválida: {start} / {end}") from None
+    return lo, hi
+
+
+def _etag(version, query):
+    """ETag of a query on one version of a dataset."""
+    return hashlib.sha1(json.dumps([repr(version), query]).encode()).hexdigest()
+
+
+def _to_arrow(df):
+    """Serialize a dataframe as an Arrow IPC stream."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
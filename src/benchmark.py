@@ -0,0 +1,295 @@
+"""
+Benchmarks of the feature engineering pipeline and the dashboard callbacks
+
+For every size, synthetic sales are generated with ``synthetic_data`` and
+each FeatureEngineer stage, ``engineer()`` end to end, the load of every
+dashboard dataset and each dashboard callback are timed. Every size runs in
+its own process, so the peak RSS of one size does not leak into the next.
+Results are appended to a JSON history and compared with a baseline run.
+
+Run:      python src/benchmark.py --sizes 10000 1000000 10000000 --label nightly
+Compare:  python src/benchmark.py --baseline nightly --threshold 0.2
+Stored:   python src/benchmark.py --against pr-123 --baseline nightly
+          (compares two runs of the history without running anything)
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+from feature_engineering import FeatureEngineer
+from instrumentation import peak_rss_mb
+from synthetic_data import sales_profile, synthetic_predictions, write_sales
+
+STAGES = [
+    "load_data",
+    "sort_data",
+    "create_temporal_features",
+    "create_lag_features",
+    "create_rolling_features",
+    "create_interaction_features",
+    "create_categorical_encoding",
+    "save_data",
+]
+
+# Dashboard datasets with their loader and the callback that reads them
+DASHBOARD = {
+    "ventas": ("cargar_ventas", "update_ventas_graph"),
+    "predicciones": ("cargar_predicciones", "update_vs_graph"),
+    "productos": ("cargar_productos", "update_productos_graph"),
+    "2025": ("cargar_2025", "update_2025_graph"),
+}
+
+# Differences below this many seconds are noise, never regressions
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def run_size(n_rows, seed=0, repeat=3, dashboard=True, work_dir=None, run_id=None):
+    """
+    Benchmark one input size.
+
+    Args:
+        n_rows (int): Rows of synthetic sales
+        seed (int): Random seed of the generator
+        repeat (int): Runs of every callback, the fastest one is kept
+        dashboard (bool): Also benchmark the dashboard
+        work_dir (str): Directory for the generated files, a temporary one if None
+        run_id (str): Id of the benchmark run, given to the FeatureEngineer stage records
+
+    Returns:
+        list: One record per benchmark with seconds, rows/s and peak RSS
+    """
+    tmp_dir = tempfile.mkdtemp(prefix=f"bench_{n_rows}_", dir=work_dir)
+    records = []
+
+    def record(name, seconds, rows=n_rows, **extra):
+        records.append({
+            "size": n_rows,
+            "name": name,
+            "seconds": seconds,
+            "rows_per_s": rows / seconds if seconds > 0 else None,
+            "peak_rss_mb": peak_rss_mb(),
+            **extra,
+        })
+        print(f"  {name:<40} {seconds:9.3f} s")
+
+    try:
+        ventas_path = os.path.join(tmp_dir, "ventas_clean.csv")
+        start = time.perf_counter()
+        write_sales(ventas_path, n_rows, seed=seed, profile=sales_profile())
+        record("generate", time.perf_counter() - start)
+
+        output_path = os.path.join(tmp_dir, "data_fe.csv")
+        fe = FeatureEngineer(ventas_path, output_path)
+        fe.run_id = run_id
+        for stage in STAGES:
+            fe.run_stage(stage)
+            stage_record = fe.stage_records[-1]
+            record(
+                f"fe.{stage}",
+                stage_record["wall_s"],
+                run_id=stage_record["run_id"],
+                cpu_s=stage_record["cpu_s"],
+                peak_mem_delta_mb=stage_record["peak_mem_delta_mb"],
+            )
+        fe = None
+
+        start = time.perf_counter()
+        FeatureEngineer(ventas_path, output_path).engineer()
+        record("fe.engineer", time.perf_counter() - start)
+
+        if dashboard:
+            _run_dashboard(ventas_path, tmp_dir, seed, repeat, record)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return records
+
+
+def _run_dashboard(ventas_path, tmp_dir, seed, repeat, record):
+    """Time the load of every dashboard dataset and its callback."""
+    import pandas as pd
+
+    tables = dict(zip(["predicciones", "productos", "2025"],
+                      synthetic_predictions(pd.read_csv(ventas_path), seed)))
+    paths = {"ventas": ventas_path}
+    for name, df in tables.items():
+        paths[name] = os.path.join(tmp_dir, f"{name}.csv")
+        df.to_csv(paths[name], index=False)
+    # Every table has one row per sale
+    rows = len(tables["predicciones"])
+    tables = None
+
+    # Datasets are loaded lazily, so pointing the provider to the synthetic files is enough
+    dashboard = importlib.import_module("dashboard_app1")
+    for name, (loader, callback) in DASHBOARD.items():
+        dashboard.datos.register(name, paths[name], getattr(dashboard, loader))
+
+        start = time.perf_counter()
+        cube = dashboard.datos.get(name)
+        record(f"dash.load.{name}", time.perf_counter() - start, rows)
+
+        regions = list(cube.labels["Region"])
+        args = (regions,) if name == "productos" else (regions, list(cube.labels["Categoria"]))
+        best = float("inf")
+        for _ in range(repeat):
+            # Without the figure cache, every call builds the figure
+            dashboard.cache_figuras.invalidate()
+            start = time.perf_counter()
+            getattr(dashboard, callback)(*args)
+            best = min(best, time.perf_counter() - start)
+        record(f"dash.{callback}", best, rows)
+
+
+def run(sizes, seed=0, repeat=3, dashboard=True, work_dir=None, run_id=None):
+    """
+    Benchmark every size, each one in a fresh process.
+
+    Args:
+        run_id (str): Id of the benchmark run, see ``run_size``
+
+    Returns:
+        list: Records of every size
+    """
+    records = []
+    context = multiprocessing.get_context("spawn")
+    for n_rows in sizes:
+        print(f"Benchmark con {n_rows} filas...")
+        with context.Pool(1) as pool:
+            records += pool.apply(run_size, (n_rows, seed, repeat, dashboard, work_dir, run_id))
+    return records
+
+
+def load_history(path):
+    """Runs stored in a history file, an empty list if it does not exist."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)["runs"]
+
+
+def save_run(path, run_record):
+    """Append a run to the history file."""
+    runs = load_history(path) + [run_record]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"runs": runs}, f, indent=2)
+
+
+def find_baseline(runs, label=None):
+    """Last run with ``label``, or the last run if ``label`` is None."""
+    candidates = [r for r in runs if label is None or r["label"] == label]
+    return candidates[-1] if candidates else None
+
+
+def compare(records, baseline, threshold=0.2):
+    """
+    Regressions of ``records`` against a baseline run.
+
+    A benchmark regresses when it is more than ``threshold`` (relative)
+    slower than in the baseline for the same size.
+
+    Args:
+        records (list): Records of the current run
+        baseline (dict): Run from the history
+        threshold (float): Allowed relative slowdown
+
+    Returns:
+        list: ``(size, name, baseline seconds, seconds, ratio)`` of every regression
+    """
+    reference = {(r["size"], r["name"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for r in records:
+        base = reference.get((r["size"], r["name"]))
+        if base is None:
+            continue
+        if r["seconds"] > base * (1 + threshold) and r["seconds"] - base > MIN_REGRESSION_SECONDS:
+            regressions.append((r["size"], r["name"], base, r["seconds"], r["seconds"] / base))
+    return regressions
+
+
+def report(records, baseline, threshold=0.2):
+    """
+    Print the regressions of ``records`` against a baseline run.
+
+    Returns:
+        int: Exit code, 1 if there are regressions
+    """
+    if baseline is None:
+        print("Sin corrida de referencia para comparar")
+        return 0
+    regressions = compare(records, baseline, threshold)
+    ref = baseline["label"] or baseline["timestamp"]
+    if not regressions:
+        print(f"Sin regresiones respecto a {ref}")
+        return 0
+    print(f"Regresiones respecto a {ref}:")
+    for size, name, base, seconds, ratio in regressions:
+        print(f"  {size:>10} {name:<40} {base:9.3f} s -> {seconds:9.3f} s (x{ratio:.2f})")
+    return 1
+
+
+def _git_commit():
+    """Current commit, None outside a git checkout."""
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de FeatureEngineer y del dashboard")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--label", default=None, help="Etiqueta de la corrida en el historial")
+    parser.add_argument("--history", default="benchmarks/history.json")
+    parser.add_argument("--baseline", default=None,
+                        help="Etiqueta de la corrida de referencia (por defecto la última)")
+    parser.add_argument("--against", default=None,
+                        help="Comparar la corrida guardada con esta etiqueta, sin ejecutar benchmarks")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Lentitud relativa tolerada")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-dashboard", action="store_true")
+    parser.add_argument("--work-dir", default=None)
+    args = parser.parse_args(argv)
+
+    if args.against is not None:
+        runs = load_history(args.history)
+        current = find_baseline(runs, args.against)
+        if current is None:
+            print(f"No hay corridas con la etiqueta {args.against} en {args.history}")
+            return 2
+        # The baseline is a run stored before the one compared
+        before = runs[: next(i for i, r in enumerate(runs) if r is current)]
+        return report(current["results"], find_baseline(before, args.baseline), args.threshold)
+
+    run_id = uuid.uuid4().hex[:12]
+    records = run(args.sizes, args.seed, args.repeat, not args.no_dashboard, args.work_dir, run_id)
+    baseline = find_baseline(load_history(args.history), args.baseline)
+    save_run(args.history, {
+        "run_id": run_id,
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "results": records,
+    })
+    print(f"Resultados guardados en: {args.history}")
+    return report(records, baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
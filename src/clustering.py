@@ -0,0 +1,305 @@
+"""
+Mini-batch k-means clustering of the FeatureEngineer output
+
+Same preparation and features as notebooks/clustering.ipynb: standardized
+columns, NaNs filled forward (and backward for the first rows), six
+clusters on the sales and category rolling features. Clusters are fitted
+with ``MiniBatchKMeans``, or streamed over a CSV in chunks with
+``partial_fit``; the k sweep runs on a process pool that reads the
+features from shared memory, and the silhouette is estimated on a sample
+stratified by cluster. The scaler, the centroids and
+the last filled row are saved, so new rows are assigned to a cluster
+without refitting.
+
+Run from src/: python clustering.py
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from sklearn.preprocessing import StandardScaler
+
+from dataset_store import read_dataset
+from rolling import group_positions
+
+FEATURES = [
+    "Cantidad",
+    "ventas_categoria_rolling_mean_3",
+    "ventas_categoria_rolling_std_3",
+    "ventas_categoria_rolling_mean_7",
+    "ventas_categoria_rolling_std_7",
+    "ID_Region",
+    "ID_Categoria",
+]
+
+
+class Clusterer:
+    """
+    Mini-batch k-means with a persistent scaler and centroids.
+    """
+
+    def __init__(self, n_clusters=6, features=FEATURES, batch_size=4096, random_state=42):
+        """
+        Initialize the Clusterer.
+
+        Args:
+            n_clusters (int): Number of clusters
+            features (list): Columns used for clustering
+            batch_size (int): Rows per mini-batch
+            random_state (int): Seed of the k-means initialization and batches
+        """
+        self.n_clusters = n_clusters
+        self.features = list(features)
+        self.batch_size = batch_size
+        self.random_state = random_state
+        self.mean = None
+        self.scale = None
+        self.centroids = None
+        # Last filled row, continues the forward fill on the next rows
+        self.last_row = None
+
+    def fit(self, df):
+        """
+        Fit the scaler and the clusters on a dataframe.
+
+        Args:
+            df (pd.DataFrame): FeatureEngineer output
+        """
+        self.fit_predict(df)
+        return self
+
+    def fit_predict(self, df):
+        """
+        Fit the scaler and the clusters on a dataframe and return its clusters.
+
+        Args:
+            df (pd.DataFrame): FeatureEngineer output
+
+        Returns:
+            np.ndarray: Cluster of every row
+        """
+        X = self.fit_scaler(df).transform(df)
+        self.centroids = self._kmeans().fit(X).cluster_centers_
+        return nearest_centroid(X, self.centroids)
+
+    def fit_scaler(self, df):
+        """Fit the standardization of the features and restart the forward fill."""
+        scaler = StandardScaler().fit(df[self.features].to_numpy(dtype=np.float64))
+        self.mean, self.scale = scaler.mean_, scaler.scale_
+        self.last_row = None
+        return self
+
+    def fit_stream(self, path, chunksize=100_000):
+        """
+        Fit on a CSV too large for memory, reading only the feature columns.
+
+        The first pass fits the scaler, the second one feeds every chunk to
+        ``partial_fit``; the forward fill continues across chunks.
+
+        Args:
+            path (str): CSV with the FeatureEngineer output
+            chunksize (int): Rows per chunk
+        """
+        scaler = StandardScaler()
+        for chunk in pd.read_csv(path, usecols=self.features, chunksize=chunksize):
+            scaler.partial_fit(chunk[self.features].to_numpy(dtype=np.float64))
+        self.mean, self.scale = scaler.mean_, scaler.scale_
+
+        self.last_row = None
+        kmeans = self._kmeans()
+        for chunk in pd.read_csv(path, usecols=self.features, chunksize=chunksize):
+            X = self.transform(chunk)
+            # partial_fit needs at least n_clusters rows for its initialization
+            if len(X) >= self.n_clusters:
+                kmeans.partial_fit(X)
+        self.centroids = kmeans.cluster_centers_
+        return self
+
+    def transform(self, df):
+        """
+        Standardized and filled features of consecutive rows.
+
+        NaNs take the value of the previous row, the last row of the previous
+        call included; leading NaNs without a previous row take the next
+        value, and columns without any value take the mean (0).
+
+        Args:
+            df (pd.DataFrame): Rows following the ones already transformed
+
+        Returns:
+            np.ndarray: One row per row of ``df``
+        """
+        X = (df[self.features].to_numpy(dtype=np.float64) - self.mean) / self.scale
+        if self.last_row is not None:
+            X = np.vstack([self.last_row, X])
+        X = pd.DataFrame(X).ffill().bfill().fillna(0.0).to_numpy()
+        if self.last_row is not None:
+            X = X[1:]
+        if len(X):
+            self.last_row = X[-1]
+        return X
+
+    def predict(self, df):
+        """
+        Cluster of every row, assigning new rows to the nearest centroid.
+
+        Args:
+            df (pd.DataFrame): Rows following the ones already seen
+
+        Returns:
+            np.ndarray: Cluster of every row
+        """
+        if self.centroids is None:
+            raise RuntimeError("El modelo no está entrenado, llamar a fit() primero")
+        return nearest_centroid(self.transform(df), self.centroids)
+
+    def save(self, path="../models/clusters.npz"):
+        """Save the scaler, centroids and last filled row."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                features=np.array(self.features),
+                mean=self.mean,
+                scale=self.scale,
+                centroids=self.centroids,
+                last_row=self.last_row if self.last_row is not None else np.array([]),
+            )
+        os.replace(tmp_path, path)
+        return self
+
+    @classmethod
+    def load(cls, path="../models/clusters.npz"):
+        """Clusterer saved by ``save``."""
+        with np.load(path) as data:
+            clusterer = cls(n_clusters=len(data["centroids"]), features=data["features"].tolist())
+            clusterer.mean = data["mean"]
+            clusterer.scale = data["scale"]
+            clusterer.centroids = data["centroids"]
+            clusterer.last_row = data["last_row"] if len(data["last_row"]) else None
+        return clusterer
+
+    def _kmeans(self, n_clusters=None):
+        return MiniBatchKMeans(
+            n_clusters=n_clusters or self.n_clusters,
+            batch_size=self.batch_size,
+            random_state=self.random_state,
+            n_init=10,
+        )
+
+
+def nearest_centroid(X, centroids):
+    """Index of the nearest centroid of every row."""
+    # |x - c|² without the |x|² term, which does not change the argmin
+    distances = (centroids * centroids).sum(axis=1) - 2 * X @ centroids.T
+    return distances.argmin(axis=1)
+
+
+def stratified_sample(labels, size, seed=0):
+    """
+    Positions of a random sample with every label in proportion to its size.
+
+    Every label keeps at least two rows (when it has them), so the
+    silhouette of small clusters is still estimated.
+
+    Args:
+        labels (np.ndarray): Label of every row
+        size (int): Approximate sample size
+        seed (int): Random seed
+
+    Returns:
+        np.ndarray: Sorted positions of the sampled rows
+    """
+    n = len(labels)
+    if n <= size:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    shuffled = rng.permutation(n)
+    order = shuffled[np.argsort(labels[shuffled], kind="stable")]
+    sorted_labels = labels[order]
+    values, counts = np.unique(sorted_labels, return_counts=True)
+    quota = np.maximum(np.round(counts * size / n), np.minimum(counts, 2))
+    keep = group_positions(sorted_labels) < quota[np.searchsorted(values, sorted_labels)]
+    return np.sort(order[keep])
+
+
+def sweep(X, ks=range(2, 11), sample_size=10_000, batch_size=4096, random_state=42, n_jobs=None):
+    """
+    Inertia and sampled silhouette of every number of clusters, fitted in parallel.
+
+    The features are copied once into shared memory and every worker reads
+    them from there, so ``X`` is not pickled for every k.
+
+    Args:
+        X (np.ndarray): Standardized features
+        ks (iterable): Numbers of clusters
+        sample_size (int): Rows of the stratified silhouette sample
+        batch_size (int): Rows per mini-batch
+        random_state (int): Seed of the fits and samples
+        n_jobs (int): Worker processes, one per CPU if None
+
+    Returns:
+        pd.DataFrame: ``k``, ``inertia`` and ``silhouette`` of every k
+    """
+    ks = list(ks)
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(ks))
+    if n_jobs == 1:
+        results = [_score_k(X, k, sample_size, batch_size, random_state) for k in ks]
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+        try:
+            np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)[:] = X
+            tasks = [(shm.name, X.shape, k, sample_size, batch_size, random_state) for k in ks]
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                results = list(pool.map(_sweep_task, tasks))
+        finally:
+            shm.close()
+            shm.unlink()
+    return pd.DataFrame(results, columns=["k", "inertia", "silhouette"])
+
+
+def _sweep_task(task):
+    """Worker: fit one k on the features in shared memory and score it."""
+    name, shape, k, sample_size, batch_size, random_state = task
+    # Pool workers share the parent's resource tracker, only the parent unlinks the block
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        X = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        result = _score_k(X, k, sample_size, batch_size, random_state)
+        del X
+    finally:
+        shm.close()
+    return result
+
+
+def _score_k(X, k, sample_size, batch_size, random_state):
+    """Fit one k and score it."""
+    kmeans = Clusterer(k, batch_size=batch_size, random_state=random_state)._kmeans()
+    labels = kmeans.fit_predict(X)
+    sample = stratified_sample(labels, sample_size, random_state)
+    silhouette = silhouette_score(X[sample], labels[sample]) if len(np.unique(labels[sample])) > 1 else np.nan
+    return k, kmeans.inertia_, silhouette
+
+
+if __name__ == "__main__":
+    input_path = sys.argv[1] if len(sys.argv) > 1 else "../data_clean/data_fe.csv"
+    output_path = sys.argv[2] if len(sys.argv) > 2 else "../data_clean/data_fe_clusters.csv"
+    model_path = "../models/clusters.npz"
+    df = read_dataset(input_path)
+
+    clusterer = Clusterer()
+    print(sweep(clusterer.fit_scaler(df).transform(df)).to_string(index=False))
+    df["Cluster"] = clusterer.fit_predict(df)
+    clusterer.save(model_path)
+    df.to_csv(output_path, index=False)
+    print(f"Clusters: {df['Cluster'].value_counts().sort_index().to_dict()}")
+    print(f"Modelo guardado en: {model_path}")
+    print(f"Datos con clusters guardados en: {output_path}")
@@ -5,193 +5,313 @@ Ejecutar: python src/dashboard_app.py
 Ver en: http://localhost:8050
 """
 
-import pandas as pd
+import os
+import time
+
 import plotly.express as px
 from dash import Dash, dcc, html, Input, Output
 
+from aggregation_api import create_api
+from data_provider import DataProvider
+from dataset_store import dataset_version, read_dataset
+from figure_cache import FigureCache
+from figure_payload import gzip_responses, payload_budget
+from weekly_cube import WeeklyCube, shared_cube
+
+INICIO = time.perf_counter()
+
 # =============================================================================
 # CARGA DE DATOS
 # =============================================================================
 
+# Cada dataset se carga la primera vez que se usa su pestaña y se recarga en
+# segundo plano cuando cambia su archivo en data_clean/. Se leen solo las
+# columnas que usan las gráficas; si existe el dataset Parquet actualizado se
+# lee ese en lugar del CSV
+RUTA_VENTAS = 'data_clean/ventas_clean.csv'
+RUTA_PREDICCIONES = 'data_clean/data_con_predicciones.csv'
+RUTA_PRODUCTOS = 'data_clean/data_con_predicciones_productos.csv'
+RUTA_2025 = 'data_clean/data_2025_predicciones.csv'
+
+
+def agregar_semana(datos):
+    """Número de semana contado desde la primera fecha del dataset."""
+    datos['Semana'] = ((datos['Fecha'] - datos['Fecha'].min()).dt.days // 7) + 1
+    return datos
+
+
+def inicio_semanas(datos):
+    """Fecha de inicio de la semana 1, guardada en el cubo para filtrar por fechas."""
+    return {'inicio': datos['Fecha'].min().strftime('%Y-%m-%d') if len(datos) else None}
+
+
+# Cada cargador devuelve el cubo semanal del dataset: los callbacks consultan
+# estos agregados (Semana x Región x Categoría/Producto) en lugar de filtrar y
+# agrupar las filas en cada cambio de selección, y las filas no se conservan
+
+# Modo servidor (varios workers, p. ej. gunicorn): con DASHBOARD_CUBOS apuntando
+# a un directorio, el primer proceso que necesita un cubo lo guarda ahí y todos
+# los workers lo mapean en memoria de solo lectura, compartiendo una sola copia
+DIR_CUBOS = os.environ.get('DASHBOARD_CUBOS')
+
+
+def cubo_semanal(nombre, ruta, construir):
+    """Cubo propio del proceso o, en modo servidor, compartido entre workers."""
+    if DIR_CUBOS is None:
+        return construir()
+    version = dataset_version(ruta)
+    # El mtime ordena las versiones: solo se borran los cubos de versiones anteriores
+    return shared_cube(DIR_CUBOS, nombre, version, construir, version[2] if version else None)
+
+
 # Ventas limpias
-df = pd.read_csv('data_clean/ventas_clean.csv')
-df['Fecha'] = pd.to_datetime(df['Fecha'])
-df = df.sort_values('Fecha')
-df['Semana'] = ((df['Fecha'] - df['Fecha'].min()).dt.days // 7) + 1
+def cargar_ventas(ruta):
+    def construir():
+        df = read_dataset(ruta, columns=['Fecha', 'Region', 'Categoria', 'Cantidad'])
+        df = agregar_semana(df.sort_values('Fecha'))
+        return WeeklyCube(df, ['Semana', 'Region', 'Categoria'], ['Cantidad'], inicio_semanas(df))
+    return cubo_semanal('ventas', ruta, construir)
+
 
 # Predicciones
-data_predicha = pd.read_csv('data_clean/data_con_predicciones.csv')
-data_predicha['Fecha'] = pd.to_datetime(data_predicha['Fecha'])
-data_predicha['Semana'] = ((data_predicha['Fecha'] - data_predicha['Fecha'].min()).dt.days // 7) + 1
+def cargar_predicciones(ruta):
+    def construir():
+        data_predicha = agregar_semana(read_dataset(
+            ruta, columns=['Fecha', 'Region', 'Categoria', 'Cantidad_Semanal', 'Cantidad_Predicha']))
+        return WeeklyCube(data_predicha, ['Semana', 'Region', 'Categoria'],
+                          ['Cantidad_Semanal', 'Cantidad_Predicha'], inicio_semanas(data_predicha))
+    return cubo_semanal('predicciones', ruta, construir)
+
 
 # Predicciones por productos (si existe)
-try:
-    productos_pred = pd.read_csv('data_clean/data_con_predicciones_productos.csv')
-    productos_pred['Fecha'] = pd.to_datetime(productos_pred['Fecha'])
-    productos_pred['Semana'] = ((productos_pred['Fecha'] - productos_pred['Fecha'].min()).dt.days // 7) + 1
-    TIENE_PRODUCTOS = True
-except FileNotFoundError:
-    productos_pred = pd.DataFrame()
-    TIENE_PRODUCTOS = False
+def cargar_productos(ruta):
+    def construir():
+        productos_pred = agregar_semana(read_dataset(
+            ruta, columns=['Fecha', 'Region', 'ID_Producto', 'Cantidad_Predicha']))
+        dims = ['Semana', 'Region'] + (['ID_Producto'] if 'ID_Producto' in productos_pred.columns else [])
+        return WeeklyCube(productos_pred, dims, ['Cantidad_Predicha'], inicio_semanas(productos_pred))
+    return cubo_semanal('productos', ruta, construir)
+
 
 # Predicciones 2025 (si existe)
-try:
-    data_2025 = pd.read_csv('data_clean/data_2025_predicciones.csv')
-    data_2025['Fecha'] = pd.to_datetime(data_2025['Fecha'])
-    data_2025['Semana'] = ((data_2025['Fecha'] - data_2025['Fecha'].min()).dt.days // 7) + 1
-    TIENE_2025 = True
-except FileNotFoundError:
-    data_2025 = pd.DataFrame()
-    TIENE_2025 = False
+def cargar_2025(ruta):
+    def construir():
+        data_2025 = agregar_semana(read_dataset(
+            ruta, columns=['Fecha', 'Region', 'Categoria', 'Cantidad_Predicha']))
+        return WeeklyCube(data_2025, ['Semana', 'Region', 'Categoria'], ['Cantidad_Predicha'],
+                          inicio_semanas(data_2025))
+    return cubo_semanal('2025', ruta, construir)
+
+
+datos = (
+    DataProvider(poll_interval=5.0)
+    .register('ventas', RUTA_VENTAS, cargar_ventas)
+    .register('predicciones', RUTA_PREDICCIONES, cargar_predicciones)
+    .register('productos', RUTA_PRODUCTOS, cargar_productos)
+    .register('2025', RUTA_2025, cargar_2025)
+)
 
 # =============================================================================
 # CREAR APLICACIÓN
 # =============================================================================
 
-app = Dash(__name__)
+# Las pestañas se generan al seleccionarlas, por eso sus componentes no
+# existen en el layout inicial
+app = Dash(__name__, suppress_callback_exceptions=True)
 app.title = "Dashboard de Ventas"
+# Aplicación WSGI para servidores con varios workers:
+#   DASHBOARD_CUBOS=data_clean/cubos gunicorn -w 4 --pythonpath src dashboard_app1:server
+server = app.server
+
+# Figuras ya construidas por selección y versión de los datos; las entradas
+# de una versión anterior se descartan cuando se recargan los datos
+cache_figuras = FigureCache(maxsize=256, version=datos.version)
+
+# Presupuesto de las figuras: series largas reducidas con LTTB, líneas en WebGL
+# a partir de cierto número de puntos y floats redondeados; se registra el
+# tamaño y el tiempo de construcción de cada figura y las respuestas van en gzip
+presupuesto_figuras = payload_budget(max_points=2000, webgl_threshold=1000, decimals=2)
+gzip_responses(server)
+
+# API de agregación (/api/...) sobre los mismos cubos que usan las gráficas
+server.register_blueprint(create_api(datos))
+
+
+@app.server.route('/cache-stats')
+def cache_stats():
+    return cache_figuras.stats()
 
 # =============================================================================
-# LAYOUTS DE CADA TAB (definidos antes para que los callbacks funcionen)
+# LAYOUTS DE CADA TAB (se construyen con los datos al abrir la pestaña)
 # =============================================================================
 
+# Los dropdowns conservan la selección al cambiar de pestaña
+PERSISTENCIA = {'persistence': True, 'persistence_type': 'memory'}
+
+
 # Tab 1: Ventas por Categoría
-tab_ventas = html.Div([
-    html.H3("📈 Cantidad por Categoría a lo largo del tiempo", style={'color': '#2c3e50'}),
-    html.Div([
-        html.Div([
-            html.Label("Región:", style={'fontWeight': 'bold'}),
-            dcc.Dropdown(
-                id='region-dropdown',
-                options=[{'label': r, 'value': r} for r in sorted(df['Region'].unique())],
-                value=df['Region'].unique().tolist(),
-                multi=True
-            ),
-        ], style={'width': '48%', 'display': 'inline-block', 'marginRight': '2%', 'verticalAlign': 'top'}),
+def layout_ventas():
+    cubo = datos.get('ventas')
+    regiones = list(cubo.labels['Region'])
+    categorias = list(cubo.labels['Categoria'])
+    return html.Div([
+        html.H3("📈 Cantidad por Categoría a lo largo del tiempo", style={'color': '#2c3e50'}),
         html.Div([
-            html.Label("Categoría:", style={'fontWeight': 'bold'}),
-            dcc.Dropdown(
-                id='categoria-dropdown',
-                options=[{'label': c, 'value': c} for c in sorted(df['Categoria'].unique())],
-                value=df['Categoria'].unique().tolist(),
-                multi=True
-            ),
-        ], style={'width': '48%', 'display': 'inline-block', 'verticalAlign': 'top'}),
-    ], style={'marginBottom': '20px'}),
-    dcc.Graph(id='cantidad-graph')
-], style={'padding': '20px'})
+            html.Div([
+                html.Label("Región:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(
+                    id='region-dropdown',
+                    options=[{'label': r, 'value': r} for r in regiones],
+                    value=regiones,
+                    multi=True,
+                    **PERSISTENCIA
+                ),
+            ], style={'width': '48%', 'display': 'inline-block', 'marginRight': '2%', 'verticalAlign': 'top'}),
+            html.Div([
+                html.Label("Categoría:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(
+                    id='categoria-dropdown',
+                    options=[{'label': c, 'value': c} for c in categorias],
+                    value=categorias,
+                    multi=True,
+                    **PERSISTENCIA
+                ),
+            ], style={'width': '48%', 'display': 'inline-block', 'verticalAlign': 'top'}),
+        ], style={'marginBottom': '20px'}),
+        dcc.Graph(id='cantidad-graph')
+    ], style={'padding': '20px'})
+
 
 # Tab 2: Real vs Predicho
-tab_vs = html.Div([
-    html.H3("🔮 Cantidad Real vs Cantidad Predicha", style={'color': '#2c3e50'}),
-    html.Div([
-        html.Div([
-            html.Label("Región:", style={'fontWeight': 'bold'}),
-            dcc.Dropdown(
-                id='region-dropdown-vs',
-                options=[{'label': r, 'value': r} for r in sorted(data_predicha['Region'].unique())],
-                value=data_predicha['Region'].unique().tolist(),
-                multi=True
-            ),
-        ], style={'width': '48%', 'display': 'inline-block', 'marginRight': '2%', 'verticalAlign': 'top'}),
+def layout_vs():
+    cubo = datos.get('predicciones')
+    regiones = list(cubo.labels['Region'])
+    categorias = list(cubo.labels['Categoria'])
+    return html.Div([
+        html.H3("🔮 Cantidad Real vs Cantidad Predicha", style={'color': '#2c3e50'}),
         html.Div([
-            html.Label("Categoría:", style={'fontWeight': 'bold'}),
-            dcc.Dropdown(
-                id='categoria-dropdown-vs',
-                options=[{'label': c, 'value': c} for c in sorted(data_predicha['Categoria'].unique())],
-                value=data_predicha['Categoria'].unique().tolist(),
-                multi=True
-            ),
-        ], style={'width': '48%', 'display': 'inline-block', 'verticalAlign': 'top'}),
-    ], style={'marginBottom': '20px'}),
-    dcc.Graph(id='cantidad-vs-graph')
-], style={'padding': '20px'})
+            html.Div([
+                html.Label("Región:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(
+                    id='region-dropdown-vs',
+                    options=[{'label': r, 'value': r} for r in regiones],
+                    value=regiones,
+                    multi=True,
+                    **PERSISTENCIA
+                ),
+            ], style={'width': '48%', 'display': 'inline-block', 'marginRight': '2%', 'verticalAlign': 'top'}),
+            html.Div([
+                html.Label("Categoría:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(
+                    id='categoria-dropdown-vs',
+                    options=[{'label': c, 'value': c} for c in categorias],
+                    value=categorias,
+                    multi=True,
+                    **PERSISTENCIA
+                ),
+            ], style={'width': '48%', 'display': 'inline-block', 'verticalAlign': 'top'}),
+        ], style={'marginBottom': '20px'}),
+        dcc.Graph(id='cantidad-vs-graph')
+    ], style={'padding': '20px'})
+
 
 # Tab 3: Productos Predichos
-if TIENE_PRODUCTOS:
-    tab_productos = html.Div([
+def layout_productos():
+    productos = datos.get('productos')
+    if productos is None:
+        return html.Div([
+            html.H3("📦 Productos Predichos", style={'color': '#2c3e50'}),
+            html.P("⚠️ No se encontró el archivo data_con_predicciones_productos.csv",
+                   style={'color': 'red', 'fontSize': '18px'}),
+        ], style={'padding': '20px'})
+
+    regiones = list(productos.labels['Region'])
+    return html.Div([
         html.H3("📦 Cantidad Predicha por Producto", style={'color': '#2c3e50'}),
         html.Div([
             html.Label("Región:", style={'fontWeight': 'bold'}),
             dcc.Dropdown(
                 id='region-dropdown-prod',
-                options=[{'label': r, 'value': r} for r in sorted(productos_pred['Region'].unique())],
-                value=productos_pred['Region'].unique().tolist(),
-                multi=True
+                options=[{'label': r, 'value': r} for r in regiones],
+                value=regiones,
+                multi=True,
+                **PERSISTENCIA
             ),
         ], style={'width': '48%', 'marginBottom': '20px'}),
         dcc.Graph(id='productos-graph')
     ], style={'padding': '20px'})
-else:
-    tab_productos = html.Div([
-        html.H3("📦 Productos Predichos", style={'color': '#2c3e50'}),
-        html.P("⚠️ No se encontró el archivo data_con_predicciones_productos.csv", 
-               style={'color': 'red', 'fontSize': '18px'}),
-        # Componentes ocultos para evitar errores de callback
-        dcc.Dropdown(id='region-dropdown-prod', style={'display': 'none'}),
-        dcc.Graph(id='productos-graph', style={'display': 'none'})
-    ], style={'padding': '20px'})
+
 
 # Tab 4: Predicciones 2025
-if TIENE_2025:
-    tab_2025 = html.Div([
+def layout_2025():
+    predicciones_2025 = datos.get('2025')
+    if predicciones_2025 is None:
+        return html.Div([
+            html.H3("📅 Predicciones 2025", style={'color': '#2c3e50'}),
+            html.P("⚠️ No se encontró el archivo data_2025_predicciones.csv",
+                   style={'color': 'red', 'fontSize': '18px'}),
+        ], style={'padding': '20px'})
+
+    regiones = list(predicciones_2025.labels['Region'])
+    categorias = list(predicciones_2025.labels['Categoria'])
+    return html.Div([
         html.H3("📅 Predicciones 2025 por Categoría", style={'color': '#2c3e50'}),
         html.Div([
             html.Div([
                 html.Label("Región:", style={'fontWeight': 'bold'}),
                 dcc.Dropdown(
                     id='region-dropdown-2025',
-                    options=[{'label': r, 'value': r} for r in sorted(data_2025['Region'].unique())],
-                    value=data_2025['Region'].unique().tolist(),
-                    multi=True
+                    options=[{'label': r, 'value': r} for r in regiones],
+                    value=regiones,
+                    multi=True,
+                    **PERSISTENCIA
                 ),
             ], style={'width': '48%', 'display': 'inline-block', 'marginRight': '2%', 'verticalAlign': 'top'}),
             html.Div([
                 html.Label("Categoría:", style={'fontWeight': 'bold'}),
                 dcc.Dropdown(
                     id='categoria-dropdown-2025',
-                    options=[{'label': c, 'value': c} for c in sorted(data_2025['Categoria'].unique())],
-                    value=data_2025['Categoria'].unique().tolist(),
-                    multi=True
+                    options=[{'label': c, 'value': c} for c in categorias],
+                    value=categorias,
+                    multi=True,
+                    **PERSISTENCIA
                 ),
             ], style={'width': '48%', 'display': 'inline-block', 'verticalAlign': 'top'}),
         ], style={'marginBottom': '20px'}),
         dcc.Graph(id='cantidad-predicha-2025-graph')
     ], style={'padding': '20px'})
-else:
-    tab_2025 = html.Div([
-        html.H3("📅 Predicciones 2025", style={'color': '#2c3e50'}),
-        html.P("⚠️ No se encontró el archivo data_2025_predicciones.csv", 
-               style={'color': 'red', 'fontSize': '18px'}),
-        # Componentes ocultos para evitar errores de callback
-        dcc.Dropdown(id='region-dropdown-2025', style={'display': 'none'}),
-        dcc.Dropdown(id='categoria-dropdown-2025', style={'display': 'none'}),
-        dcc.Graph(id='cantidad-predicha-2025-graph', style={'display': 'none'})
-    ], style={'padding': '20px'})
+
+
+LAYOUTS_TABS = {
+    'tab-ventas': layout_ventas,
+    'tab-vs': layout_vs,
+    'tab-productos': layout_productos,
+    'tab-2025': layout_2025,
+}
 
 # =============================================================================
 # LAYOUT PRINCIPAL CON TABS
 # =============================================================================
 
+ESTILO_TAB = {'padding': '10px', 'fontWeight': 'bold'}
+ESTILO_TAB_SELECCIONADA = {'padding': '10px', 'fontWeight': 'bold', 'backgroundColor': '#e8f4f8'}
+
 app.layout = html.Div([
     html.H1("📊 Dashboard de Análisis de Ventas", 
             style={'textAlign': 'center', 'color': '#2c3e50', 'marginBottom': '30px', 
                    'borderBottom': '3px solid #3498db', 'paddingBottom': '15px'}),
     
-    dcc.Tabs([
-        dcc.Tab(label='📈 Ventas por Categoría', children=[tab_ventas],
-                style={'padding': '10px', 'fontWeight': 'bold'}, 
-                selected_style={'padding': '10px', 'fontWeight': 'bold', 'backgroundColor': '#e8f4f8'}),
-        dcc.Tab(label='🔮 Real vs Predicho', children=[tab_vs],
-                style={'padding': '10px', 'fontWeight': 'bold'}, 
-                selected_style={'padding': '10px', 'fontWeight': 'bold', 'backgroundColor': '#e8f4f8'}),
-        dcc.Tab(label='📦 Productos Predichos', children=[tab_productos],
-                style={'padding': '10px', 'fontWeight': 'bold'}, 
-                selected_style={'padding': '10px', 'fontWeight': 'bold', 'backgroundColor': '#e8f4f8'}),
-        dcc.Tab(label='📅 Predicciones 2025', children=[tab_2025],
-                style={'padding': '10px', 'fontWeight': 'bold'}, 
-                selected_style={'padding': '10px', 'fontWeight': 'bold', 'backgroundColor': '#e8f4f8'}),
+    dcc.Tabs(id='tabs', value='tab-ventas', children=[
+        dcc.Tab(label='📈 Ventas por Categoría', value='tab-ventas',
+                style=ESTILO_TAB, selected_style=ESTILO_TAB_SELECCIONADA),
+        dcc.Tab(label='🔮 Real vs Predicho', value='tab-vs',
+                style=ESTILO_TAB, selected_style=ESTILO_TAB_SELECCIONADA),
+        dcc.Tab(label='📦 Productos Predichos', value='tab-productos',
+                style=ESTILO_TAB, selected_style=ESTILO_TAB_SELECCIONADA),
+        dcc.Tab(label='📅 Predicciones 2025', value='tab-2025',
+                style=ESTILO_TAB, selected_style=ESTILO_TAB_SELECCIONADA),
     ]),
+    html.Div(id='contenido-tab'),
     
 ], style={'padding': '30px', 'fontFamily': 'Arial, sans-serif', 'backgroundColor': '#f8f9fa'})
 
@@ -199,18 +319,31 @@ app.layout = html.Div([
 # CALLBACKS
 # =============================================================================
 
+# Contenido de la pestaña seleccionada; sus datos se cargan la primera vez
+@app.callback(
+    Output('contenido-tab', 'children'),
+    Input('tabs', 'value')
+)
+def render_tab(tab):
+    return LAYOUTS_TABS[tab]()
+
+
 # Callback Tab 1: Ventas por Categoría
 @app.callback(
     Output('cantidad-graph', 'figure'),
     [Input('region-dropdown', 'value'),
      Input('categoria-dropdown', 'value')]
 )
+@cache_figuras.memoize('ventas')
+@presupuesto_figuras
 def update_ventas_graph(selected_regions, selected_categories):
     if not selected_regions or not selected_categories:
         return px.bar(title='Selecciona al menos una región y categoría')
     
-    filtered = df[df['Region'].isin(selected_regions) & df['Categoria'].isin(selected_categories)]
-    grouped = filtered.groupby(['Semana', 'Categoria'])['Cantidad'].sum().unstack().reset_index()
+    cubo_ventas = datos.get('ventas')
+    grouped = cubo_ventas.aggregate(['Semana', 'Categoria'],
+                                    {'Region': selected_regions, 'Categoria': selected_categories},
+                                    'Cantidad').unstack().reset_index()
     grouped = grouped.sort_values('Semana')
     
     fig = px.bar(grouped, x='Semana', y=grouped.columns[1:],
@@ -228,15 +361,16 @@ def update_ventas_graph(selected_regions, selected_categories):
     [Input('region-dropdown-vs', 'value'),
      Input('categoria-dropdown-vs', 'value')]
 )
+@cache_figuras.memoize('predicciones')
+@presupuesto_figuras
 def update_vs_graph(selected_regions, selected_categories):
     if not selected_regions or not selected_categories:
         return px.line(title='Selecciona al menos una región y categoría')
     
-    filtered = data_predicha[
-        data_predicha['Region'].isin(selected_regions) & 
-        data_predicha['Categoria'].isin(selected_categories)
-    ]
-    grouped = filtered.groupby('Semana')[['Cantidad_Semanal', 'Cantidad_Predicha']].sum().reset_index()
+    cubo_vs = datos.get('predicciones')
+    grouped = cubo_vs.aggregate(['Semana'],
+                                {'Region': selected_regions, 'Categoria': selected_categories},
+                                ['Cantidad_Semanal', 'Cantidad_Predicha']).reset_index()
     grouped = grouped.sort_values('Semana')
     
     fig = px.line(grouped, x='Semana', y=['Cantidad_Semanal', 'Cantidad_Predicha'],
@@ -257,26 +391,29 @@ def update_vs_graph(selected_regions, selected_categories):
     Output('productos-graph', 'figure'),
     Input('region-dropdown-prod', 'value')
 )
+@cache_figuras.memoize('productos')
+@presupuesto_figuras
 def update_productos_graph(selected_regions):
-    if not TIENE_PRODUCTOS or productos_pred.empty:
+    cubo_productos = datos.get('productos')
+    if cubo_productos is None or cubo_productos.empty:
         return px.bar(title='No hay datos de productos disponibles')
     
     if not selected_regions:
         return px.bar(title='Selecciona al menos una región')
     
-    filtered = productos_pred[productos_pred['Region'].isin(selected_regions)]
-    
     # Agrupar por semana y producto
-    if 'ID_Producto' in filtered.columns:
-        grouped = filtered.groupby(['Semana', 'ID_Producto'])['Cantidad_Semanal'].mean().reset_index()
+    if 'ID_Producto' in cubo_productos.dims:
+        grouped = cubo_productos.aggregate(['Semana', 'ID_Producto'], {'Region': selected_regions},
+                                           'Cantidad_Predicha', stat='mean').reset_index()
         grouped['ID_Producto'] = grouped['ID_Producto'].astype(str)
-        fig = px.bar(grouped, x='Semana', y='Cantidad_Semanal', color='ID_Producto',
+        fig = px.bar(grouped, x='Semana', y='Cantidad_Predicha', color='ID_Producto',
                      title='Cantidad Predicha Promedio por Producto',
-                     labels={'Cantidad_Semanal': 'Cantidad Promedio', 'ID_Producto': 'Producto'})
+                     labels={'Cantidad_Predicha': 'Cantidad Promedio', 'ID_Producto': 'Producto'})
         fig.update_layout(barmode='stack')
     else:
-        grouped = filtered.groupby('Semana')['Cantidad_Semanal'].mean().reset_index()
-        fig = px.bar(grouped, x='Semana', y='Cantidad_Semanal',
+        grouped = cubo_productos.aggregate(['Semana'], {'Region': selected_regions},
+                                           'Cantidad_Predicha', stat='mean').reset_index()
+        fig = px.bar(grouped, x='Semana', y='Cantidad_Predicha',
                      title='Cantidad Predicha Promedio por Semana')
     
     fig.update_layout(height=550, xaxis_tickangle=-45,
@@ -290,24 +427,26 @@ def update_productos_graph(selected_regions):
     [Input('region-dropdown-2025', 'value'),
      Input('categoria-dropdown-2025', 'value')]
 )
+@cache_figuras.memoize('2025')
+@presupuesto_figuras
 def update_2025_graph(selected_regions, selected_categories):
-    if not TIENE_2025 or data_2025.empty:
+    cubo_2025 = datos.get('2025')
+    if cubo_2025 is None or cubo_2025.empty:
         return px.bar(title='No hay datos de 2025 disponibles')
     
     if not selected_regions:
-        selected_regions = data_2025['Region'].unique().tolist()
+        selected_regions = list(cubo_2025.labels['Region'])
     if not selected_categories:
-        selected_categories = data_2025['Categoria'].unique().tolist()
+        selected_categories = list(cubo_2025.labels['Categoria'])
 
-    filtered = data_2025[
-        data_2025['Region'].isin(selected_regions) &
-        data_2025['Categoria'].isin(selected_categories)
-    ].dropna(subset=['Cantidad_Predicha']).copy()
+    predicho = cubo_2025.aggregate(['Semana', 'Categoria'],
+                                   {'Region': selected_regions, 'Categoria': selected_categories},
+                                   'Cantidad_Predicha', stat='mean', dropna=True)
 
-    if filtered.empty:
+    if predicho.empty:
         return px.bar(title='No hay datos para las selecciones')
 
-    grouped = filtered.groupby(['Semana', 'Categoria'])['Cantidad_Predicha'].mean().unstack().reset_index().sort_values('Semana')
+    grouped = predicho.unstack().reset_index().sort_values('Semana')
 
     if grouped.empty:
         return px.bar(title='No hay datos para las selecciones')
@@ -334,6 +473,10 @@ def update_2025_graph(selected_regions, selected_categories):
 # EJECUTAR SERVIDOR
 # =============================================================================
 
+# Los datos se recargan en segundo plano cuando cambian
+datos.start()
+print(f"Dashboard listo en {time.perf_counter() - INICIO:.2f} s (datos diferidos hasta su primer uso)")
+
 if __name__ == '__main__':
     print("\n" + "="*50)
     print("🚀 Dashboard de Ventas iniciado!")
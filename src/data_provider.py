@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+
+from dataset_store import dataset_version
+
+
+class DataProvider:
+    """
+    Lazy, hot-reloadable access to the datasets of the dashboard.
+
+    Every dataset is registered with a loader and only read the first time
+    it is requested. A background thread watches the version of the loaded
+    datasets and, when a file changes, loads the new version next to the old
+    one and swaps the reference; requests in flight keep the snapshot they
+    already got, so nothing is dropped or half read.
+    """
+
+    def __init__(self, poll_interval=5.0):
+        """
+        Initialize the DataProvider.
+
+        Args:
+            poll_interval (float): Seconds between checks for new data
+        """
+        self.poll_interval = poll_interval
+        self.load_times = {}
+        self._sources = {}
+        self._snapshots = {}
+        self._locks = {}
+        self._stop = threading.Event()
+        self._watcher = None
+        self._fork_hook = False
+
+    def register(self, name, path, loader):
+        """
+        Register a dataset.
+
+        Args:
+            name (str): Name used to request the dataset
+            path (str): Dataset path, as passed to ``read_dataset``
+            loader (callable): ``loader(path)`` returns the data to serve
+        """
+        self._sources[name] = (path, loader)
+        self._locks[name] = threading.Lock()
+        return self
+
+    def get(self, name):
+        """
+        Data of a dataset, loaded on first use.
+
+        Returns:
+            The value returned by the loader, None if the file does not exist
+        """
+        return self.snapshot(name)[1]
+
+    def version(self, name):
+        """Version of the data currently served for a dataset."""
+        return self.snapshot(name)[0]
+
+    def names(self):
+        """Names of the registered datasets."""
+        return list(self._sources)
+
+    def loaded(self):
+        """Names of the datasets already loaded."""
+        return [name for name in self._sources if name in self._snapshots]
+
+    def reload_changed(self):
+        """
+        Reload the loaded datasets whose files changed.
+
+        Returns:
+            list: Names of the reloaded datasets
+        """
+        reloaded = []
+        for name in self.loaded():
+            path, _ = self._sources[name]
+            if dataset_version(path) == self._snapshots[name][0]:
+                continue
+            try:
+                self._load(name)
+                reloaded.append(name)
+            except Exception as exc:  # Keep serving the previous version
+                print(f"⚠️ No se pudo recargar {name}: {exc}")
+        return reloaded
+
+    def start(self):
+        """
+        Start the background thread that reloads changed datasets.
+
+        Threads do not survive a fork, so the thread is started again in
+        every child process (the workers of a pre-fork server).
+        """
+        if not self._fork_hook:
+            os.register_at_fork(after_in_child=self._restart)
+            self._fork_hook = True
+        if self._watcher is None or not self._watcher.is_alive():
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="data-provider", daemon=True)
+            self._watcher.start()
+        return self
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+        return self
+
+    def snapshot(self, name):
+        """
+        Current ``(version, data)`` of a dataset, loading it if needed.
+
+        Both come from the same load: use it instead of ``get`` and
+        ``version`` when the version must describe the data, since a reload
+        can swap the dataset between those two calls.
+        """
+        snapshot = self._snapshots.get(name)
+        if snapshot is None:
+            with self._locks[name]:
+                snapshot = self._snapshots.get(name)
+                if snapshot is None:
+                    snapshot = self._load(name)
+        return snapshot
+
+    def _load(self, name):
+        """Load a dataset and swap it in."""
+        path, loader = self._sources[name]
+        start = time.perf_counter()
+        # Version read before the data, a change during the load triggers another reload
+        version = dataset_version(path)
+        try:
+            data = loader(path)
+        except FileNotFoundError:
+            data = None
+        self.load_times[name] = time.perf_counter() - start
+        snapshot = (version, data)
+        self._snapshots[name] = snapshot
+        print(f"Datos '{name}' cargados en {self.load_times[name]:.2f} s")
+        return snapshot
+
+    def _restart(self):
+        """Restart the watcher in a forked child if it was running in the parent."""
+        self._locks = {name: threading.Lock() for name in self._sources}
+        if self._watcher is not None and not self._stop.is_set():
+            self._watcher = None
+            self.start()
+
+    def _watch(self):
+        """Background loop of ``start``."""
+        while not self._stop.wait(self.poll_interval):
+            reloaded = self.reload_changed()
+            if reloaded:
+                print(f"Datos actualizados: {', '.join(reloaded)}")
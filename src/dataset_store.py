@@ -0,0 +1,356 @@
+"""
+Columnar store for the datasets in data_clean/
+
+Every CSV can be converted to a typed Parquet dataset partitioned by Region
+and month of Fecha. Reads support column projection and filters that are
+applied to partitions and row groups, so only the needed columns and
+partitions are read.
+
+Convert every CSV: python src/dataset_store.py
+"""
+
+import glob
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # Without pyarrow only the CSVs can be read
+    pa = None
+
+# Month of Fecha, used as partition key
+MONTH_COL = "Fecha_mes"
+# Original position of every row, to return them in the same order
+ROW_COL = "_row"
+PARTITION_COLS = ("Region", MONTH_COL)
+
+# Arrow types of the columns of the data_clean datasets, declared so every
+# write stores the same schema instead of inferring it from the data
+VENTAS_TYPES = {
+    "ID_Venta": "int64",
+    "Fecha": "timestamp[us]",
+    "ID_Cliente": "int64",
+    "ID_Producto": "int64",
+    "Cantidad": "int64",
+    "Metodo_Pago_cat": "int64",
+    "Estado": "string",
+    "Categoria": "string",
+    "ID_Categoria": "int64",
+    "Precio_Unitario": "double",
+    "Region": "string",
+    "ID_Metodo": "int64",
+    "Metodo_Pago": "string",
+    "ID_Ticket": "int64",
+    "Monto_Venta": "double",
+}
+# Integer features of FeatureEngineer, the rest are float
+INTEGER_FEATURES = ("semana", "mes", "dia_semana", "ID_Region")
+PREDICTION_TYPES = {"Cantidad_Semanal": "int64", "Cantidad_Predicha": "double"}
+# Columns of every dataset, "features" stands for the FeatureEngineer features
+DATASET_TYPES = {
+    "ventas_clean": [VENTAS_TYPES],
+    "data_fe": [VENTAS_TYPES, "features"],
+    "data_fe_clusters": [VENTAS_TYPES, "features", {"Cluster": "int64"}],
+    "data_modelado": [VENTAS_TYPES, "features", {"Cantidad_Semanal": "int64"}],
+    "data_2025_predicciones": [VENTAS_TYPES, "features", PREDICTION_TYPES],
+    "data_con_predicciones": [
+        {"Fecha": "timestamp[us]", "Region": "string", "Categoria": "string"},
+        PREDICTION_TYPES,
+    ],
+    "data_con_predicciones_productos": [
+        {"Fecha": "timestamp[us]", "Region": "string", "ID_Producto": "int64", "Categoria": "string"},
+        PREDICTION_TYPES,
+        {"Modelo_Usado": "string"},
+    ],
+    # Precio_Unitario keeps the decimal comma of the source file
+    "productos": [
+        {
+            "ID_Producto": "int64",
+            "Nombre_producto": "string",
+            "Categoría": "string",
+            "Precio_Unitario": "string",
+            "Stock": "int64",
+        }
+    ],
+}
+
+
+def store_path(path):
+    """Dataset directory that corresponds to a CSV path."""
+    root, ext = os.path.splitext(path)
+    return root + ".parquet" if ext == ".csv" else path
+
+
+def has_store(path):
+    """
+    Whether the Parquet dataset of ``path`` exists and is up to date.
+
+    A dataset older than its CSV is ignored, so a rewritten CSV is never
+    shadowed by a stale conversion.
+    """
+    directory = store_path(path)
+    if pa is None or not os.path.isdir(directory):
+        return False
+    if directory != path and os.path.exists(path):
+        return os.path.getmtime(directory) >= os.path.getmtime(path)
+    return True
+
+
+def dataset_version(path):
+    """
+    Stamp that changes whenever the data ``read_dataset(path)`` returns changes.
+
+    Returns:
+        tuple: Path actually read with its inode, mtime and size, None if it does not exist
+    """
+    target = store_path(path) if has_store(path) else path
+    try:
+        stat = os.stat(target)
+    except FileNotFoundError:
+        return None
+    return (target, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def column_types(name):
+    """
+    Declared Arrow type name of every column of a data_clean dataset.
+
+    Args:
+        name (str): Dataset name, the CSV file name without extension
+
+    Returns:
+        dict: Column name to type name, None if the dataset is not declared
+    """
+    if name not in DATASET_TYPES:
+        return None
+    types = {}
+    for group in DATASET_TYPES[name]:
+        if group == "features":
+            # Imported here, feature_engineering writes through this module
+            from feature_engineering import FEATURES
+
+            group = {f: "int64" if f in INTEGER_FEATURES else "double" for f in FEATURES}
+        types.update(group)
+    return types
+
+
+def dataset_schema(df, path):
+    """
+    Arrow schema of ``df`` as written to the dataset of ``path``.
+
+    Args:
+        df (pd.DataFrame): Data to store, with the month and row columns added
+        path (str): CSV path or dataset directory
+
+    Returns:
+        pa.Schema: The declared types in the column order of ``df``, None
+        for datasets without declared types (their schema is inferred)
+    """
+    name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+    types = column_types(name)
+    if types is None:
+        return None
+    types = {**types, MONTH_COL: "string", ROW_COL: "int64"}
+    undeclared = [col for col in df.columns if col not in types]
+    if undeclared:
+        raise ValueError(f"Columnas sin tipo declarado en {name}: {undeclared}")
+    return pa.schema([(col, pa.type_for_alias(types[col])) for col in df.columns])
+
+
+def write_dataset(df, path, partition_cols=PARTITION_COLS, schema=None):
+    """
+    Write a dataframe as a partitioned Parquet dataset.
+
+    Args:
+        df (pd.DataFrame): Data to store
+        path (str): CSV path or dataset directory; CSV paths map to ``<name>.parquet``
+        partition_cols (tuple): Partition columns, the ones missing in ``df`` are skipped
+        schema (pa.Schema): Arrow schema, the declared one of the dataset
+            (see ``DATASET_TYPES``) if None, inferred for undeclared datasets
+
+    Returns:
+        str: The dataset directory
+    """
+    if pa is None:
+        raise ImportError("pyarrow es necesario para escribir datasets Parquet")
+
+    directory = store_path(path)
+    df = df.copy()
+    if "Fecha" in df.columns:
+        df["Fecha"] = pd.to_datetime(df["Fecha"])
+        df[MONTH_COL] = df["Fecha"].dt.strftime("%Y-%m")
+    df[ROW_COL] = np.arange(len(df), dtype=np.int64)
+    partition_cols = [col for col in partition_cols if col in df.columns]
+
+    schema = schema or dataset_schema(df, path)
+    if schema is None:
+        table = _cast_partitions(pa.Table.from_pandas(df, preserve_index=False), partition_cols)
+    else:
+        table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    partitioning = None
+    if partition_cols:
+        partitioning = ds.partitioning(
+            pa.schema([(col, pa.string()) for col in partition_cols]), flavor="hive"
+        )
+
+    # Write next to the target and swap it in, readers never see half a dataset
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    ds.write_dataset(
+        table,
+        tmp_dir,
+        format="parquet",
+        # With the pandas metadata of the table, read_dataset restores the column order
+        schema=table.schema,
+        partitioning=partitioning,
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    if os.path.isdir(directory):
+        old_dir = directory + ".old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.rename(directory, old_dir)
+        os.rename(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    else:
+        os.rename(tmp_dir, directory)
+    return directory
+
+
+def read_dataset(path, columns=None, filters=None):
+    """
+    Read a dataset with column projection and row filters.
+
+    Reads the Parquet dataset of ``path`` when it exists and is up to date,
+    otherwise the CSV. Filters use the pyarrow format, a list of
+    ``(column, op, value)`` tuples combined with AND, with ``op`` one of
+    ``==, !=, <, <=, >, >=, in, not in``. Filters on Region and Fecha skip
+    whole partitions.
+
+    Args:
+        path (str): CSV path or dataset directory
+        columns (list): Columns to read, all if None
+        filters (list): Row filters
+
+    Returns:
+        pd.DataFrame: The data in its original row order, with Fecha parsed
+    """
+    filters = list(filters or [])
+    if has_store(path):
+        return _read_parquet(store_path(path), columns, filters)
+    return _read_csv(path, columns, filters)
+
+
+def _cast_partitions(table, partition_cols):
+    """Cast the partition columns to string so they match the partitioning schema."""
+    for col in partition_cols:
+        i = table.column_names.index(col)
+        table = table.set_column(i, col, table.column(col).cast(pa.string()))
+    return table
+
+
+def _month_filters(filters):
+    """Equivalent filters on the month partition for the filters on Fecha."""
+    ops = {">=": ">=", ">": ">=", "<=": "<=", "<": "<=", "==": "=="}
+    month_filters = []
+    for col, op, value in filters:
+        if col == "Fecha" and op in ops:
+            month_filters.append((MONTH_COL, ops[op], pd.Timestamp(value).strftime("%Y-%m")))
+    return month_filters
+
+
+def _read_parquet(directory, columns, filters):
+    """Read the Parquet dataset pushing down projection and filters."""
+    dataset = ds.dataset(directory, format="parquet", partitioning="hive")
+    names = dataset.schema.names
+    for col, _, _ in filters:
+        # Same error as the CSV, a filter is never silently dropped
+        if col not in names:
+            raise KeyError(f"Columna de filtro desconocida: {col}")
+    # The month filters only prune partitions, when the dataset has them
+    month_filters = _month_filters(filters) if MONTH_COL in names else []
+    expression = None
+    for col, op, value in filters + month_filters:
+        if col == "Fecha":
+            value = pd.Timestamp(value)
+        term = _expression(col, op, value)
+        expression = term if expression is None else expression & term
+
+    read_columns = None
+    if columns is not None:
+        read_columns = [col for col in columns if col in names] + [ROW_COL]
+    table = dataset.to_table(columns=read_columns, filter=expression)
+    df = table.to_pandas().sort_values(ROW_COL, kind="stable")
+    df = df.drop(columns=[ROW_COL]).reset_index(drop=True)
+    if columns is None:
+        # Partition columns come last, restore the order they were written in
+        written = [col["name"] for col in dataset.schema.pandas_metadata["columns"]]
+        order = [col for col in written if col in df.columns and col not in (ROW_COL, MONTH_COL)]
+        df = df[order]
+    return df
+
+
+def _expression(col, op, value):
+    """pyarrow expression for one filter."""
+    field = ds.field(col)
+    if op == "in":
+        return field.isin(list(value))
+    if op == "not in":
+        return ~field.isin(list(value))
+    return {
+        "==": field == value,
+        "!=": field != value,
+        "<": field < value,
+        "<=": field <= value,
+        ">": field > value,
+        ">=": field >= value,
+    }[op]
+
+
+def _read_csv(path, columns, filters):
+    """Read the CSV and apply projection and filters in pandas."""
+    usecols = None
+    if columns is not None:
+        needed = list(dict.fromkeys(list(columns) + [col for col, _, _ in filters]))
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = [col for col in needed if col in header]
+    df = pd.read_csv(path, usecols=usecols)
+    if "Fecha" in df.columns:
+        df["Fecha"] = pd.to_datetime(df["Fecha"])
+
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in filters:
+        if col == "Fecha":
+            value = pd.Timestamp(value) if op not in ("in", "not in") else pd.to_datetime(value)
+        series = df[col]
+        if op == "in":
+            mask &= series.isin(value).to_numpy()
+        elif op == "not in":
+            mask &= ~series.isin(value).to_numpy()
+        else:
+            mask &= {
+                "==": series == value,
+                "!=": series != value,
+                "<": series < value,
+                "<=": series <= value,
+                ">": series > value,
+                ">=": series >= value,
+            }[op].to_numpy()
+    df = df[mask].reset_index(drop=True)
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    return df
+
+
+def convert_all(data_dir="data_clean"):
+    """Convert every CSV in ``data_dir`` to a Parquet dataset."""
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.csv"))):
+        directory = write_dataset(_read_csv(path, None, []), path)
+        print(f"{path} -> {directory}")
+
+
+if __name__ == "__main__":
+    convert_all()
@@ -0,0 +1,218 @@
+"""
+Top-down disaggregation of regional forecasts into product forecasts
+
+Product shares are computed from the weekly sales of every product in a
+trailing window of weeks (starting on Monday, as ISO weeks), inside each
+Region x Categoria (or each Region), for every week of the history at once
+from one cumulative sum over the weeks. A regional forecast is split into products by multiplying its
+weekly values with the share matrices of their weeks.
+
+Products of the catalog (data_clean/productos.csv) without sales in the
+window get no forecast unless the whole Region x Categoria has no sales
+there: then the shares of the category in all regions are used, and
+without any sale a Region x Categoria forecast is split evenly among the
+products of the category (a Region forecast gets no split).
+
+Run from src/: python disaggregation.py [forecast.csv] [output.csv]
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import read_dataset
+
+LEVELS = ("Categoria", "Region")
+
+
+def read_catalog(path="../data_clean/productos.csv"):
+    """Product catalog with ``ID_Producto`` and ``Categoria``."""
+    catalog = read_dataset(path)
+    return catalog.rename(columns={"Categoría": "Categoria"})[["ID_Producto", "Categoria"]]
+
+
+class ProductShares:
+    """
+    Trailing product shares per Region x Categoria and week.
+    """
+
+    def __init__(self, windows=(4, 13, None)):
+        """
+        Initialize the ProductShares.
+
+        Args:
+            windows (iterable): Trailing windows in weeks, None for the whole history
+        """
+        self.windows = list(windows)
+        self.origin = None
+        self.labels = None
+        self.quantities = None
+        self.in_category = None
+        self.shares = {}
+
+    def fit(self, history, catalog):
+        """
+        Weekly quantities of the history and the share matrices of every window.
+
+        Args:
+            history (pd.DataFrame): Sales with Fecha, Region, Categoria, ID_Producto and Cantidad
+            catalog (pd.DataFrame): Output of ``read_catalog``
+        """
+        fechas = pd.to_datetime(history["Fecha"])
+        # Monday of the first week, so every bucket is one calendar week
+        first = fechas.min().normalize()
+        self.origin = first - pd.Timedelta(days=first.dayofweek)
+        week = self.week_of(fechas)
+        n_weeks = int(week.max()) + 1
+
+        products = catalog.drop_duplicates("ID_Producto").sort_values("ID_Producto")
+        self.labels = {
+            "Region": pd.Index(sorted(history["Region"].dropna().unique()), name="Region"),
+            "Categoria": pd.Index(
+                sorted(set(products["Categoria"]) | set(history["Categoria"].dropna())), name="Categoria"
+            ),
+            "ID_Producto": pd.Index(products["ID_Producto"], name="ID_Producto"),
+        }
+        shape = (len(self.labels["Region"]), len(self.labels["Categoria"]), n_weeks,
+                 len(self.labels["ID_Producto"]))
+
+        # Categoria x product mask of the catalog
+        self.in_category = np.zeros((shape[1], shape[3]), dtype=bool)
+        self.in_category[self.labels["Categoria"].get_indexer(products["Categoria"]),
+                         np.arange(shape[3])] = True
+
+        codes = [
+            self.labels["Region"].get_indexer(history["Region"]),
+            self.labels["Categoria"].get_indexer(history["Categoria"]),
+            week,
+            self.labels["ID_Producto"].get_indexer(history["ID_Producto"]),
+        ]
+        valid = np.logical_and.reduce([c >= 0 for c in codes])
+        flat = np.ravel_multi_index([c[valid] for c in codes], shape)
+        cantidad = np.nan_to_num(history["Cantidad"].to_numpy(dtype=np.float64)[valid])
+        self.quantities = np.bincount(flat, weights=cantidad, minlength=int(np.prod(shape))).reshape(shape)
+
+        # Quantity of the weeks before w: cumulative[:, :, w]
+        cumulative = np.zeros(shape[:2] + (n_weeks + 1,) + shape[3:])
+        np.cumsum(self.quantities, axis=2, out=cumulative[:, :, 1:])
+        self.shares = {}
+        for window in self.windows:
+            for level in LEVELS:
+                self.shares[window, level] = self._shares(cumulative, window, level)
+        return self
+
+    def _shares(self, cumulative, window, level):
+        """Shares of every product for weeks 0..n_weeks (the week after the history)."""
+        n_weeks = cumulative.shape[2] - 1
+        if window is None:
+            trailing = cumulative
+        else:
+            start = np.maximum(np.arange(n_weeks + 1) - window, 0)
+            trailing = cumulative - cumulative[:, :, start]
+
+        # Region x Categoria totals, or Region totals
+        axes = (3,) if level == "Categoria" else (1, 3)
+        total = trailing.sum(axis=axes, keepdims=True)
+        # Fallbacks: the category in all regions, then an even split of the category
+        pooled = trailing.sum(axis=0, keepdims=True)
+        pooled_total = pooled.sum(axis=axes, keepdims=True)
+        mask = self.in_category[None, :, None, :]
+        even = mask / mask.sum(axis=3, keepdims=True).clip(min=1)
+        if level == "Region":
+            # The split among categories is unknown without sales
+            even = np.full(even.shape, np.nan)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(
+                total > 0, trailing / total,
+                np.where(pooled_total > 0, pooled / pooled_total, even),
+            )
+
+    def week_of(self, fechas):
+        """Week number of dates counted from the Monday of the first week of the history."""
+        return ((pd.to_datetime(fechas) - self.origin).dt.days // 7).to_numpy()
+
+    def disaggregate(self, forecast, window=4, level="Categoria", value_col="Cantidad_Predicha"):
+        """
+        Split a regional forecast into product forecasts.
+
+        The forecast can have one row per sale (the weekly value repeated) or
+        one per week: its value per Region (x Categoria) and week is the mean
+        of its rows. Weeks after the history use the latest shares. Rows with
+        a Region or Categoria missing from the history are ignored.
+
+        Args:
+            forecast (pd.DataFrame): Fecha, Region, Categoria (for level
+                "Categoria") and ``value_col``
+            window (int): One of ``windows``
+            level (str): "Categoria" if the values are per Region x Categoria,
+                "Region" if they are Region totals
+            value_col (str): Column with the forecast
+
+        Returns:
+            pd.DataFrame: Fecha (Monday of the week), Region, ID_Producto,
+            Categoria, Cantidad_Semanal (actual quantity of the product in
+            the week, if known) and Cantidad_Predicha
+        """
+        if (window, level) not in self.shares:
+            raise ValueError(f"Ventana o nivel sin participaciones: {window}, {level}")
+        shares = self.shares[window, level]
+        n_regions, n_categories, n_weeks, n_products = self.quantities.shape
+
+        week = self.week_of(forecast["Fecha"])
+        weeks = pd.Index(np.unique(week[week >= 0]))
+        region = self.labels["Region"].get_indexer(forecast["Region"])
+        category = (self.labels["Categoria"].get_indexer(forecast["Categoria"])
+                    if level == "Categoria" else np.zeros(len(forecast), dtype=np.int64))
+        values = forecast[value_col].to_numpy(dtype=np.float64)
+        valid = (region >= 0) & (category >= 0) & (week >= 0) & ~np.isnan(values)
+
+        # Mean forecast per Region (x Categoria) and week
+        cell_shape = (n_regions, n_categories if level == "Categoria" else 1, len(weeks))
+        flat = np.ravel_multi_index(
+            [region[valid], category[valid], weeks.get_indexer(week[valid])], cell_shape
+        )
+        size = int(np.prod(cell_shape))
+        sums = np.bincount(flat, weights=values[valid], minlength=size).reshape(cell_shape)
+        counts = np.bincount(flat, minlength=size).reshape(cell_shape)
+        cells = _safe_divide(sums, counts, np.nan)
+
+        # Every week and product at once: cells broadcast over products
+        week_shares = shares[:, :, np.minimum(weeks.to_numpy(), n_weeks)]
+        predicted = cells[..., None] * week_shares
+
+        actual = np.full(predicted.shape, np.nan)
+        known = weeks.to_numpy() < n_weeks
+        actual[:, :, known] = self.quantities[:, :, weeks.to_numpy()[known]]
+
+        # Products of the category with a forecast or with sales in the week
+        keep = self.in_category[None, :, None, :] & ((predicted > 0) | (actual > 0))
+        r, c, w, p = np.nonzero(keep)
+        return pd.DataFrame({
+            "Fecha": self.origin + pd.to_timedelta(7 * weeks.to_numpy()[w], unit="D"),
+            "Region": self.labels["Region"][r],
+            "ID_Producto": self.labels["ID_Producto"][p],
+            "Categoria": self.labels["Categoria"][c],
+            "Cantidad_Semanal": actual[keep],
+            "Cantidad_Predicha": predicted[keep],
+        }).sort_values(["Fecha", "Region", "ID_Producto"], kind="stable", ignore_index=True)
+
+
+def _safe_divide(a, b, fill):
+    """``a / b`` with ``fill`` where ``b`` is 0."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(b > 0, a / np.where(b > 0, b, 1), fill)
+
+
+if __name__ == "__main__":
+    forecast_path = sys.argv[1] if len(sys.argv) > 1 else "../data_clean/data_con_predicciones.csv"
+    output_path = sys.argv[2] if len(sys.argv) > 2 else "../data_clean/data_con_predicciones_productos.csv"
+    history = read_dataset(
+        "../data_clean/ventas_clean.csv", columns=["Fecha", "Region", "Categoria", "ID_Producto", "Cantidad"]
+    )
+    shares = ProductShares().fit(history, read_catalog())
+    # Cantidad_Predicha of the forecasts is the weekly total of the region
+    productos = shares.disaggregate(read_dataset(forecast_path), window=4, level="Region")
+    productos.to_csv(output_path, index=False)
+    print(f"{len(productos)} predicciones por producto guardadas en: {output_path}")
@@ -1,18 +1,117 @@
+import os
+import uuid
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from dataset_store import has_store, read_dataset, store_path, write_dataset
+from instrumentation import json_lines_hook, measure_stage, profile
+from rolling import daily_rolling_stats, shifted_rolling_stats
+
+
+def _ratio(numerator, denominator):
+    """Ratio that is NaN where the denominator is 0 or missing."""
+
+    def compute(df):
+        denom = df[denominator]
+        return np.where(
+            (denom == 0) | denom.isna(),
+            np.nan,
+            df[numerator] / denom,
+        )
+
+    return compute
+
+
+# Lag columns and the keys they are grouped by
+LAG_KEYS = {
+    "ventas_categoria_lag_1": ["Categoria"],
+    "ventas_region_lag_1": ["Region"],
+    "cantidad_lag_1": ["Categoria", "Region"],
+}
+
+# Rolling columns: name -> (group, statistic, window in rows)
+ROLLING_KEYS = {"categoria": "Categoria", "region": "Region"}
+ROLLING_COLUMNS = {}
+for _w in (3, 7, 14, 30):
+    # Rolling means
+    for _group in ROLLING_KEYS:
+        ROLLING_COLUMNS[f"ventas_{_group}_rolling_mean_{_w}"] = (_group, "mean", _w)
+    # Rolling stds
+    for _group in ROLLING_KEYS:
+        ROLLING_COLUMNS[f"ventas_{_group}_rolling_std_{_w}"] = (_group, "std", _w)
+# 2, 3, 4, 5, 6 week rolling means for Categoria and Region
+for _w in range(2, 7):
+    for _group in ROLLING_KEYS:
+        ROLLING_COLUMNS[f"ventas_{_group}_rolling_mean_{_w}_weeks"] = (_group, "mean", _w * 7)
+
+# Interaction columns: name -> (input columns, function of the dataframe)
+INTERACTIONS = {
+    # Precio x Cantidad
+    "precio_x_cantidad": (
+        ["Precio_Unitario", "cantidad_lag_1"],
+        lambda df: df["Precio_Unitario"] * df["cantidad_lag_1"],
+    ),
+}
+# Cantidad / Rolling Mean and Std by Categoria and Region
+for _w in (3, 7, 14, 30):
+    for _stat, _short in (("mean", "rmean"), ("std", "rstd")):
+        for _group in ROLLING_KEYS:
+            _denom = f"ventas_{_group}_rolling_{_stat}_{_w}"
+            INTERACTIONS[f"cantidad_/_ventas_{_group}_{_short}_{_w}"] = (
+                ["cantidad_lag_1", _denom],
+                _ratio("cantidad_lag_1", _denom),
+            )
+for _group in ROLLING_KEYS:
+    # rolling_mean_7 / rolling_mean_14
+    INTERACTIONS[f"ventas_{_group}_rmean_7_/_14"] = (
+        [f"ventas_{_group}_rolling_mean_7", f"ventas_{_group}_rolling_mean_14"],
+        lambda df, g=_group: df[f"ventas_{g}_rolling_mean_7"] / df[f"ventas_{g}_rolling_mean_14"],
+    )
+for _group in ROLLING_KEYS:
+    # rolling_mean + rolling_std
+    INTERACTIONS[f"ventas_{_group}_rmean_+_rstd_7"] = (
+        [f"ventas_{_group}_rolling_mean_7", f"ventas_{_group}_rolling_std_7"],
+        lambda df, g=_group: df[f"ventas_{g}_rolling_mean_7"] + df[f"ventas_{g}_rolling_std_7"],
+    )
+for _group in ROLLING_KEYS:
+    # rolling_mean * rolling_std
+    INTERACTIONS[f"ventas_{_group}_rmean_*_rstd_7"] = (
+        [f"ventas_{_group}_rolling_mean_7", f"ventas_{_group}_rolling_std_7"],
+        lambda df, g=_group: df[f"ventas_{g}_rolling_mean_7"] * df[f"ventas_{g}_rolling_std_7"],
+    )
+
+# Feature registry: column -> (stage that creates it, input columns), in pipeline order
+FEATURES = {}
+for _name in ("semana", "mes", "dia_semana"):
+    FEATURES[_name] = ("create_temporal_features", ["Fecha"])
+for _name, _keys in LAG_KEYS.items():
+    FEATURES[_name] = ("create_lag_features", _keys + ["Cantidad"])
+for _name, (_group, _, _) in ROLLING_COLUMNS.items():
+    FEATURES[_name] = ("create_rolling_features", [ROLLING_KEYS[_group], "Cantidad"])
+for _name, (_inputs, _) in INTERACTIONS.items():
+    FEATURES[_name] = ("create_interaction_features", _inputs)
+FEATURES["ID_Region"] = ("create_categorical_encoding", ["Region"])
+
 
 class FeatureEngineer:
     """
     A class to perform feature engineering on sales data.
     """
 
+    # Longest lookback of any feature: the 6 weeks rolling window
+    MAX_WINDOW = 42
+
+    # Columns kept as float64 in compact mode (money amounts)
+    FLOAT64_COLUMNS = ("Precio_Unitario", "Monto_Venta")
+
     def __init__(
         self,
         input_path="../data_clean/ventas_clean.csv",
         output_path="../data_clean/data_fe.csv",
+        window_unit="rows",
     ):
         """
         Initialize the FeatureEngineer with input and output paths.
@@ -20,141 +119,207 @@ class FeatureEngineer:
         Args:
             input_path (str): Path to the cleaned sales data
             output_path (str): Path to save the engineered features
+            window_unit (str): "rows" for rolling windows over transactions, or
+                "days" for windows over calendar days of daily totals
         """
+        if window_unit not in ("rows", "days"):
+            raise ValueError(f"window_unit debe ser 'rows' o 'days', no {window_unit!r}")
         self.input_path = input_path
         self.output_path = output_path
+        self.window_unit = window_unit
         self.df = None
+        self.n_jobs = 1
+        self.memory_report = None
+        self.raw_columns = []
+        self._loaded_version = None
+        self.hooks = []
+        self.stage_records = []
+        self.run_id = None
+        self._profiled_stage = None
 
-    def load_data(self):
-        """Load the data from the input path."""
-        self.df = pd.read_csv(self.input_path)
-        self.df["Fecha"] = pd.to_datetime(self.df["Fecha"])
+    def add_hook(self, hook):
+        """
+        Register a hook that receives the record of every stage.
+
+        Records are dicts with the run id, stage, start time, wall and CPU
+        seconds, peak memory delta in MiB, rows and columns before and after,
+        the number of columns added and the error of a failed stage (None
+        otherwise); ``instrumentation.json_lines_hook`` writes them as JSON
+        lines.
+
+        Args:
+            hook (callable): ``hook(record)``
+        """
+        self.hooks.append(hook)
         return self
 
-    def create_temporal_features(self):
-        """Create temporal features: week, month, day of week."""
-        self.df["semana"] = self.df["Fecha"].dt.isocalendar().week
-        self.df["mes"] = self.df["Fecha"].dt.month
-        self.df["dia_semana"] = self.df["Fecha"].dt.dayofweek
+    def profile_stage(self, stage, output=None):
+        """
+        Run one stage under cProfile in the next runs.
+
+        Args:
+            stage (str): Stage method to profile, e.g. "create_rolling_features"
+            output (str): File for the stats, the top functions are printed if None
+        """
+        if not callable(getattr(self, stage, None)):
+            raise ValueError(f"Etapa desconocida: {stage}")
+        self._profiled_stage = (stage, output)
         return self
 
-    def create_lag_features(self):
-        """Create lag features for time series analysis."""
-        self.df["ventas_categoria_lag_1"] = self.df.groupby(["Categoria"])[
-            "Cantidad"
-        ].shift(1)
-        self.df["ventas_region_lag_1"] = self.df.groupby(["Region"])["Cantidad"].shift(
-            1
-        )
-        self.df["cantidad_lag_1"] = self.df.groupby(["Categoria", "Region"])[
-            "Cantidad"
-        ].shift(1)
+    def run_stage(self, stage, **kwargs):
+        """
+        Run a stage method, recording its metrics and calling the hooks.
+
+        A failed stage is recorded and passed to the hooks too, then its
+        exception is raised again.
+
+        Args:
+            stage (str): Stage method, e.g. "create_lag_features"
+            **kwargs: Arguments of the stage
+
+        Returns:
+            FeatureEngineer: self
+        """
+        try:
+            with measure_stage(stage, lambda: self.df) as record:
+                if self._profiled_stage is not None and self._profiled_stage[0] == stage:
+                    with profile(stage, self._profiled_stage[1]):
+                        getattr(self, stage)(**kwargs)
+                else:
+                    getattr(self, stage)(**kwargs)
+        finally:
+            record = {"run_id": self.run_id, **record}
+            self.stage_records.append(record)
+            for hook in self.hooks:
+                hook(record)
+        return self
+
+    def load_data(self):
+        """Load the data from the input path, from its Parquet dataset if up to date."""
+        self.df = read_dataset(self.input_path)
+        self.raw_columns = list(self.df.columns)
+        self._loaded_version = self.input_version()
         return self
 
-    def create_rolling_features(self):
-        """Create rolling mean and std features for different time windows."""
-        windows = [3, 7, 14, 30]
-
-        for window in windows:
-            # Rolling means
-            self.df[f"ventas_categoria_rolling_mean_{window}"] = self.df.groupby(
-                ["Categoria"]
-            )["Cantidad"].transform(lambda x: x.shift(1).rolling(window=window).mean())
-            self.df[f"ventas_region_rolling_mean_{window}"] = self.df.groupby(
-                ["Region"]
-            )["Cantidad"].transform(lambda x: x.shift(1).rolling(window=window).mean())
-
-            # Rolling stds
-            self.df[f"ventas_categoria_rolling_std_{window}"] = self.df.groupby(
-                ["Categoria"]
-            )["Cantidad"].transform(lambda x: x.shift(1).rolling(window=window).std())
-            self.df[f"ventas_region_rolling_std_{window}"] = self.df.groupby(
-                ["Region"]
-            )["Cantidad"].transform(lambda x: x.shift(1).rolling(window=window).std())
-
-        # 2, 3, 4, 5, 6 week rolling means for Categoria and Region
-        for w in range(2, 7):
-            self.df[f"ventas_categoria_rolling_mean_{w}_weeks"] = self.df.groupby(
-                ["Categoria"]
-            )["Cantidad"].transform(lambda x: x.shift(1).rolling(window=w * 7).mean())
-            self.df[f"ventas_region_rolling_mean_{w}_weeks"] = self.df.groupby(
-                ["Region"]
-            )["Cantidad"].transform(lambda x: x.shift(1).rolling(window=w * 7).mean())
+    def input_version(self):
+        """Modification time of the input, used to invalidate the cached columns."""
+        path = store_path(self.input_path) if has_store(self.input_path) else self.input_path
+        return os.path.getmtime(path)
 
+    def required_features(self, features):
+        """
+        Features to compute for ``features``, dependencies first.
+
+        Columns already in the dataframe are reused and not computed again.
+
+        Args:
+            features (list): Names of registered features
+
+        Returns:
+            list: Features to compute, in dependency order
+        """
+        needed = []
+
+        def visit(name):
+            if name in needed or name in self.df.columns:
+                return
+            if name not in FEATURES:
+                raise KeyError(f"Feature desconocida: {name}")
+            for dependency in FEATURES[name][1]:
+                visit(dependency)
+            needed.append(name)
+
+        for name in features:
+            visit(name)
+        return needed
+
+    def compute_features(self, features):
+        """
+        Compute only the given features and the ones they depend on.
+
+        The sorted data and every computed column stay in ``self.df``, so later
+        calls only compute what is missing. The cache is dropped when the input
+        changes.
+
+        Args:
+            features (list): Names of registered features
+        """
+        self.run_id = uuid.uuid4().hex[:12]
+        if self.df is None or self._loaded_version != self.input_version():
+            self.run_stage("load_data").run_stage("sort_data")
+
+        needed = self.required_features(features)
+        for stage in dict.fromkeys(stage for stage, _ in FEATURES.values()):
+            columns = [name for name in needed if FEATURES[name][0] == stage]
+            if columns:
+                self.run_stage(stage, columns=columns)
         return self
 
-    def create_interaction_features(self):
-        """Create interaction features between different variables."""
-        # Precio x Cantidad
-        self.df["precio_x_cantidad"] = (
-            self.df["Precio_Unitario"] * self.df["cantidad_lag_1"]
-        )
+    def create_temporal_features(self, columns=None):
+        """Create temporal features: week, month, day of week."""
+        temporal = {
+            "semana": lambda: self.df["Fecha"].dt.isocalendar().week,
+            "mes": lambda: self.df["Fecha"].dt.month,
+            "dia_semana": lambda: self.df["Fecha"].dt.dayofweek,
+        }
+        for name, compute in temporal.items():
+            if columns is None or name in columns:
+                self.df[name] = compute()
+        return self
 
-        # Cantidad / Rolling Mean and Std by Categoria and Region
-        for w in (3, 7, 14, 30):
-            # means
-            denom_cat_mean = self.df[f"ventas_categoria_rolling_mean_{w}"]
-            denom_reg_mean = self.df[f"ventas_region_rolling_mean_{w}"]
-            self.df[f"cantidad_/_ventas_categoria_rmean_{w}"] = np.where(
-                (denom_cat_mean == 0) | denom_cat_mean.isna(),
-                np.nan,
-                self.df["cantidad_lag_1"] / denom_cat_mean,
-            )
-            self.df[f"cantidad_/_ventas_region_rmean_{w}"] = np.where(
-                (denom_reg_mean == 0) | denom_reg_mean.isna(),
-                np.nan,
-                self.df["cantidad_lag_1"] / denom_reg_mean,
-            )
+    def create_lag_features(self, columns=None):
+        """Create lag features for time series analysis."""
+        for name, keys in LAG_KEYS.items():
+            if columns is None or name in columns:
+                self.df[name] = self.df.groupby(keys)["Cantidad"].shift(1)
+        return self
 
-            # stds
-            denom_cat_std = self.df[f"ventas_categoria_rolling_std_{w}"]
-            denom_reg_std = self.df[f"ventas_region_rolling_std_{w}"]
-            self.df[f"cantidad_/_ventas_categoria_rstd_{w}"] = np.where(
-                (denom_cat_std == 0) | denom_cat_std.isna(),
-                np.nan,
-                self.df["cantidad_lag_1"] / denom_cat_std,
-            )
-            self.df[f"cantidad_/_ventas_region_rstd_{w}"] = np.where(
-                (denom_reg_std == 0) | denom_reg_std.isna(),
-                np.nan,
-                self.df["cantidad_lag_1"] / denom_reg_std,
-            )
+    def create_rolling_features(self, columns=None):
+        """
+        Create rolling mean and std features for different time windows.
 
-        # ventas_categoria_rolling_mean_7 / ventas_categoria_rolling_mean_14
-        self.df["ventas_categoria_rmean_7_/_14"] = (
-            self.df["ventas_categoria_rolling_mean_7"]
-            / self.df["ventas_categoria_rolling_mean_14"]
-        )
+        With ``window_unit="days"`` the windows are calendar days (the weeks
+        windows are 14 to 42 days) over the daily totals of each group, see
+        ``daily_rolling_stats``.
+        """
+        names = [
+            name
+            for name in ROLLING_COLUMNS
+            if columns is None or name in columns
+        ]
 
-        # ventas_region_rolling_mean_7 / ventas_region_rolling_mean_14
-        self.df["ventas_region_rmean_7_/_14"] = (
-            self.df["ventas_region_rolling_mean_7"]
-            / self.df["ventas_region_rolling_mean_14"]
-        )
+        # One pass of the rolling engine per grouping key, with every window it needs
+        stats = {}
+        for group, key in ROLLING_KEYS.items():
+            specs = [ROLLING_COLUMNS[name] for name in names if ROLLING_COLUMNS[name][0] == group]
+            if not specs:
+                continue
+            rolling_stats = (
+                daily_rolling_stats if self.window_unit == "days" else shifted_rolling_stats
+            )
+            stats[group] = rolling_stats(
+                self.df,
+                [key],
+                "Cantidad",
+                mean_windows=[w for _, stat, w in specs if stat == "mean"],
+                std_windows=[w for _, stat, w in specs if stat == "std"],
+                n_jobs=self.n_jobs,
+            )
 
-        # rolling_mean + rolling_std
-        self.df["ventas_categoria_rmean_+_rstd_7"] = (
-            self.df["ventas_categoria_rolling_mean_7"]
-            + self.df["ventas_categoria_rolling_std_7"]
-        )
-        self.df["ventas_region_rmean_+_rstd_7"] = (
-            self.df["ventas_region_rolling_mean_7"]
-            + self.df["ventas_region_rolling_std_7"]
-        )
+        for name in names:
+            group, stat, window = ROLLING_COLUMNS[name]
+            self.df[name] = stats[group][(stat, window)]
 
-        # rolling_mean * rolling_std
-        self.df["ventas_categoria_rmean_*_rstd_7"] = (
-            self.df["ventas_categoria_rolling_mean_7"]
-            * self.df["ventas_categoria_rolling_std_7"]
-        )
-        self.df["ventas_region_rmean_*_rstd_7"] = (
-            self.df["ventas_region_rolling_mean_7"]
-            * self.df["ventas_region_rolling_std_7"]
-        )
+        return self
 
+    def create_interaction_features(self, columns=None):
+        """Create interaction features between different variables."""
+        for name, (_, compute) in INTERACTIONS.items():
+            if columns is None or name in columns:
+                self.df[name] = compute(self.df)
         return self
 
-    def create_categorical_encoding(self):
+    def create_categorical_encoding(self, columns=None):
         """Encode categorical variables."""
         self.df["ID_Region"] = self.df["Region"].astype("category").cat.codes
         return self
@@ -164,30 +329,83 @@ class FeatureEngineer:
         self.df = self.df.sort_values(by=["Categoria", "Region", "Fecha"])
         return self
 
+    def compact_dtypes(self):
+        """
+        Shrink the dataframe dtypes to reduce its memory.
+
+        String columns become categoricals, integer columns the smallest
+        integer type that holds them (int8 for semana, mes, dia_semana and the
+        IDs) and float features float32. Money columns stay float64. The bytes
+        before and after are stored in ``memory_report``.
+        """
+        before = self.df.memory_usage(deep=True).sum()
+        for col in self.df.columns:
+            dtype = self.df[col].dtype
+            if pd.api.types.is_string_dtype(dtype) or dtype == object:
+                self.df[col] = self.df[col].astype("category")
+            elif pd.api.types.is_integer_dtype(dtype) and not self.df[col].isna().any():
+                self.df[col] = pd.to_numeric(
+                    self.df[col].astype(np.int64), downcast="integer"
+                )
+            elif pd.api.types.is_float_dtype(dtype) and col not in self.FLOAT64_COLUMNS:
+                self.df[col] = self.df[col].astype(np.float32)
+        after = self.df.memory_usage(deep=True).sum()
+
+        self.memory_report = {
+            "bytes_before": int(before),
+            "bytes_after": int(after),
+            "bytes_saved": int(before - after),
+            "ratio": float(before / after) if after else float("nan"),
+        }
+        print(
+            f"Memoria: {before / 1024**2:.2f} MB -> {after / 1024**2:.2f} MB "
+            f"({self.memory_report['ratio']:.1f}x menos)"
+        )
+        return self
+
     def save_data(self):
-        """Save the engineered dataframe to the output path."""
-        self.df.to_csv(self.output_path, index=False)
+        """Save the engineered dataframe to the output path (CSV or .parquet dataset)."""
+        if self.output_path.endswith(".parquet"):
+            write_dataset(self.df, self.output_path)
+        else:
+            self.df.to_csv(self.output_path, index=False)
         print(f"Feature Engineering completado. Datos guardados en: {self.output_path}")
         return self
 
-    def engineer(self):
+    def engineer(self, n_jobs=1, compact=False, features=None):
         """
         Execute the complete feature engineering pipeline.
 
+        Args:
+            n_jobs (int): Worker processes for the grouped features, -1 for all CPUs
+            compact (bool): Shrink the dtypes before saving, see ``compact_dtypes``
+            features (list): Only compute these features (see ``FEATURES``) and
+                return them with the input columns, without saving
+
         Returns:
             pd.DataFrame: The engineered dataframe
         """
+        self.n_jobs = n_jobs
+        if features is not None:
+            self.compute_features(features)
+            return self.df[self.raw_columns + [f for f in features if f not in self.raw_columns]]
+
         print("Iniciando Feature Engineering...")
-        (
-            self.load_data()
-            .sort_data()
-            .create_temporal_features()
-            .create_lag_features()
-            .create_rolling_features()
-            .create_interaction_features()
-            .create_categorical_encoding()
-            .save_data()
-        )
+        self.run_id = uuid.uuid4().hex[:12]
+        stages = [
+            "load_data",
+            "sort_data",
+            "create_temporal_features",
+            "create_lag_features",
+            "create_rolling_features",
+            "create_interaction_features",
+            "create_categorical_encoding",
+        ]
+        if compact:
+            stages.append("compact_dtypes")
+        stages.append("save_data")
+        for stage in stages:
+            self.run_stage(stage)
 
         print(f"Features creadas: {self.df.shape[1]} columnas")
         return self.df
@@ -196,4 +414,6 @@ class FeatureEngineer:
 if __name__ == "__main__":
     # Create the feature engineer and execute the pipeline
     fe = FeatureEngineer()
+    # Metrics of every stage, one JSON line per stage and run
+    fe.add_hook(json_lines_hook("../reports/fe_stages.jsonl"))
     df_engineered = fe.engineer()
@@ -0,0 +1,128 @@
+import functools
+import threading
+from collections import OrderedDict
+
+from dataset_store import dataset_version
+
+
+class FigureCache:
+    """
+    Bounded LRU cache for the figures built by the dashboard callbacks.
+
+    Entries are keyed by the callback, its normalized inputs and the version
+    of the datasets it reads. When a dataset changes, the entries built from
+    the previous version are dropped on the next call, so a figure is never
+    served for data other than the current one.
+    """
+
+    def __init__(self, maxsize=256, version=dataset_version):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize (int): Maximum number of figures kept, the least recently used go first
+            version (callable): Version stamp of a data source, by default of a dataset path
+        """
+        self.maxsize = maxsize
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """
+        Return the cached value of ``key``, building and storing it on a miss.
+
+        Args:
+            key (tuple): Hashable key
+            build (callable): Builds the value when it is not cached
+
+        Returns:
+            The cached or newly built value
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Built outside the lock, concurrent misses of the same key just build twice
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, name=None):
+        """Drop the entries of one callback, or every entry if ``name`` is None."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                self._versions.clear()
+            else:
+                self._drop(name)
+                self._versions.pop(name, None)
+
+    def memoize(self, *sources):
+        """
+        Decorator that caches a callback by its inputs and the version of ``sources``.
+
+        List inputs (dropdown selections) are compared as sets, so the same
+        selection in a different order is a hit.
+
+        Args:
+            *sources (str): Data sources the callback reads, as passed to ``version``
+
+        Returns:
+            callable: The decorator
+        """
+
+        def decorator(func):
+            name = func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args):
+                versions = tuple(self.version(source) for source in sources)
+                self._check_versions(name, versions)
+                key = (name, versions) + tuple(_normalize(arg) for arg in args)
+                return self.get_or_build(key, lambda: func(*args))
+
+            return wrapper
+
+        return decorator
+
+    def stats(self):
+        """Hits, misses and size of the cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def _check_versions(self, name, versions):
+        """Drop the entries of ``name`` built from other dataset versions."""
+        with self._lock:
+            if self._versions.get(name, versions) != versions:
+                self._drop(name)
+            self._versions[name] = versions
+
+    def _drop(self, name):
+        """Remove the entries of one callback, the lock must be held."""
+        for key in [key for key in self._entries if key[0] == name]:
+            del self._entries[key]
+
+
+def _normalize(value):
+    """Order-insensitive, hashable form of a callback input."""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(set(value), key=str))
+    return value
@@ -0,0 +1,174 @@
+import functools
+import gzip
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+from flask import g, has_request_context, request
+
+# Responses worth compressing: JSON, text and Arrow IPC streams
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/", "application/vnd.apache.arrow")
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point that forms the largest triangle with the point kept in the
+    previous bucket and the mean of the next bucket, which preserves peaks
+    and the overall shape of the series.
+
+    Args:
+        x (np.ndarray): Increasing x values
+        y (np.ndarray): y values
+        n_out (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = np.nanmean(x[hi:next_hi]) if next_hi > hi else x[-1]
+        next_y = np.nanmean(y[hi:next_hi]) if next_hi > hi else y[-1]
+        area = np.abs(
+            (x[previous] - next_x) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (next_y - y[previous])
+        )
+        previous = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        kept[i + 1] = previous
+    return kept
+
+
+def reduce_figure(fig, max_points=2000, webgl_threshold=1000, decimals=2):
+    """
+    Shrink the JSON payload of a Plotly figure in place.
+
+    Line and scatter traces longer than ``max_points`` are downsampled with
+    LTTB and the ones still above ``webgl_threshold`` points are drawn with
+    WebGL. Float values are rounded to ``decimals`` and sent as float32.
+    Bar traces keep all their bars, only their values are rounded.
+
+    Args:
+        fig (go.Figure): Figure to reduce
+        max_points (int): Maximum points per line trace
+        webgl_threshold (int): Points from which line traces use WebGL
+        decimals (int): Decimals kept in float values
+
+    Returns:
+        go.Figure: The same figure
+    """
+    traces = []
+    for trace in fig.data:
+        if trace.type in ("scatter", "scattergl") and trace.x is not None and trace.y is not None:
+            x, y = np.asarray(trace.x), np.asarray(trace.y)
+            if len(x) > max_points and np.issubdtype(x.dtype, np.number):
+                idx = lttb_indices(x, y, max_points)
+                trace.update(x=x[idx], y=y[idx])
+            if trace.type == "scatter" and len(trace.x) > webgl_threshold:
+                # The trace type is read-only, the trace is rebuilt as WebGL
+                props = trace.to_plotly_json()
+                props.pop("type")
+                trace = go.Scattergl(props, skip_invalid=True)
+        traces.append(trace)
+    if any(new is not old for new, old in zip(traces, fig.data)):
+        fig.data = []
+        fig.add_traces(traces)
+
+    for trace in fig.data:
+        for axis in ("x", "y"):
+            values = getattr(trace, axis, None)
+            if values is None:
+                continue
+            values = np.asarray(values)
+            if np.issubdtype(values.dtype, np.floating):
+                setattr(trace, axis, np.round(values, decimals).astype(np.float32))
+    return fig
+
+
+def payload_budget(max_points=2000, webgl_threshold=1000, decimals=2, log=True):
+    """
+    Decorator for callbacks that return a figure: reduce it and log its cost.
+
+    Inside a request the log waits for the response: ``gzip_responses``
+    prints it with the size of the body that carries the figure, so the
+    figure is not serialized a second time to measure it. Outside a request
+    (e.g. a benchmark calling the callback) only the build time is printed.
+
+    Args:
+        max_points (int): See ``reduce_figure``
+        webgl_threshold (int): See ``reduce_figure``
+        decimals (int): See ``reduce_figure``
+        log (bool): Print the build time and payload size of every figure
+
+    Returns:
+        callable: The decorator
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            start = time.perf_counter()
+            fig = reduce_figure(func(*args), max_points, webgl_threshold, decimals)
+            elapsed = time.perf_counter() - start
+            if log and has_request_context():
+                g.setdefault("figure_builds", []).append((func.__name__, elapsed))
+            elif log:
+                print(f"[figura] {func.__name__}: {elapsed * 1000:.1f} ms")
+            return fig
+
+        return wrapper
+
+    return decorator
+
+
+def gzip_responses(server, min_size=1024, level=6):
+    """
+    Compress the JSON, text and Arrow responses of a Flask server with gzip.
+
+    Also prints the figures logged by ``payload_budget`` during the request,
+    with the size of the response before and after compression.
+
+    Args:
+        server (flask.Flask): Server to compress, e.g. ``app.server`` of Dash
+        min_size (int): Responses smaller than this are sent as they are
+        level (int): gzip compression level
+    """
+
+    @server.after_request
+    def compress(response):
+        figures = g.pop("figure_builds", ())
+        if response.direct_passthrough:
+            return response
+        size = len(response.get_data())
+        if (
+            "gzip" in request.headers.get("Accept-Encoding", "").lower()
+            and 200 <= response.status_code < 300
+            and "Content-Encoding" not in response.headers
+            and (response.mimetype or "").startswith(COMPRESSIBLE_MIMETYPES)
+            and size >= min_size
+        ):
+            response.set_data(gzip.compress(response.get_data(), compresslevel=level))
+            response.headers["Content-Encoding"] = "gzip"
+            response.headers["Content-Length"] = str(len(response.get_data()))
+            response.vary.add("Accept-Encoding")
+        for name, elapsed in figures:
+            print(
+                f"[figura] {name}: {size / 1024:.1f} KB ({len(response.get_data()) / 1024:.1f} KB enviados) "
+                f"en {elapsed * 1000:.1f} ms"
+            )
+        return response
+
+    return server
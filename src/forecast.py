@@ -0,0 +1,307 @@
+"""
+Weekly demand forecasts with cached LightGBM boosters
+
+Same models as notebooks/modelado-predictivo.ipynb: LightGBM on the numeric
+features of the FeatureEngineer output for every region except NEA and NOA,
+and a moving average of the weekly quantity for NEA and NOA. Trained
+boosters are saved with a fingerprint of their features, parameters and
+training data, and loaded instead of trained again while none of them
+changes; only the most recently used ones are kept.
+
+Run from src/:
+    python forecast.py                            out-of-sample predictions of data_fe.csv
+    python forecast.py <features.csv> <out.csv>   fit on data_fe.csv and forecast new rows
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from sklearn.model_selection import TimeSeriesSplit
+
+from dataset_store import read_dataset
+from ma_backtest import backtest_windows, best_window, moving_average_matrix
+
+# ID_Region of NEA and NOA, forecast with the moving average
+MA_REGIONS = (3, 4)
+
+# Target and columns derived from it, never used as features
+TARGET = "Cantidad_Semanal"
+DROP_COLUMNS = ("Cantidad", "Cantidad_Semanal", "Monto_Venta")
+
+BASE_PARAMS = {
+    "objective": "regression",
+    "metric": "rmse",
+    "boosting_type": "gbdt",
+    "verbosity": -1,
+    "seed": 42,
+}
+
+
+def add_weekly_target(df):
+    """
+    Add ``Cantidad_Semanal``: quantity sold in the region during the row's week.
+
+    Weeks are ISO weeks of their ISO year, so the same week number of two
+    years is never added together (``semana`` has no year).
+    """
+    iso = pd.to_datetime(df["Fecha"]).dt.isocalendar()
+    df[TARGET] = df.groupby([df["Region"], iso["year"], iso["week"]])["Cantidad"].transform("sum")
+    return df
+
+
+def feature_matrix(df):
+    """Numeric columns used as features, as in the notebook."""
+    numeric = df.select_dtypes(include=[np.number])
+    return numeric.drop(columns=[col for col in DROP_COLUMNS if col in numeric.columns])
+
+
+def moving_average(df, window, group_col="ID_Region"):
+    """
+    Moving average of the previous ``window`` rows of ``Cantidad_Semanal`` per region.
+
+    Equivalent to ``groupby(group_col)[TARGET].transform(lambda x: x.shift(1).rolling(window, min_periods=1).mean())``.
+    """
+    values = moving_average_matrix(df, [window], (group_col,), TARGET)[:, 0]
+    return pd.Series(values, index=df.index)
+
+
+class Forecaster:
+    """
+    LightGBM / moving average forecaster with persistent boosters.
+    """
+
+    def __init__(
+        self,
+        params_path="../notebooks/best_lgbm_params.json",
+        model_dir="../models",
+        num_boost_round=1000,
+        ma_window=None,
+        ma_regions=MA_REGIONS,
+        max_boosters=32,
+    ):
+        """
+        Initialize the Forecaster.
+
+        Args:
+            params_path (str): Tuned LightGBM parameters (JSON), the defaults are used if missing or empty
+            model_dir (str): Directory of the saved boosters
+            num_boost_round (int): Boosting rounds of every booster
+            ma_window (int): Window of the moving average, chosen on the data if None
+            ma_regions (tuple): ID_Region values forecast with the moving average
+            max_boosters (int): Boosters kept in ``model_dir``, the least recently used are deleted
+        """
+        self.params = dict(BASE_PARAMS)
+        self.params.update(self._load_params(params_path))
+        self.model_dir = model_dir
+        self.num_boost_round = num_boost_round
+        self.ma_window = ma_window
+        self.ma_regions = tuple(ma_regions)
+        self.max_boosters = max_boosters
+        self.booster = None
+        self.features = None
+        self.ma_tail = {}
+        self.trained = 0
+        self.loaded = 0
+
+    def fingerprint(self, X, y):
+        """Hash of the features, parameters and training data of a booster."""
+        digest = hashlib.sha1()
+        digest.update(json.dumps({
+            "features": list(X.columns),
+            "params": self.params,
+            "num_boost_round": self.num_boost_round,
+            "lightgbm": lgb.__version__,
+        }, sort_keys=True).encode())
+        digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+        digest.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+        return digest.hexdigest()[:20]
+
+    def train_booster(self, X, y):
+        """
+        Booster trained on ``X, y``, loaded from ``model_dir`` when already trained.
+
+        Returns:
+            lgb.Booster: The booster
+        """
+        path = os.path.join(self.model_dir, f"lgbm-{self.fingerprint(X, y)}.txt")
+        if os.path.exists(path):
+            self.loaded += 1
+            booster = lgb.Booster(model_file=path)
+            # Marks it as recently used for prune_boosters
+            os.utime(path)
+            return booster
+
+        booster = lgb.train(self.params, lgb.Dataset(X, y), num_boost_round=self.num_boost_round)
+        os.makedirs(self.model_dir, exist_ok=True)
+        # Written next to the target and renamed, a reader never sees half a model
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        booster.save_model(tmp_path)
+        os.replace(tmp_path, path)
+        self.trained += 1
+        self.prune_boosters()
+        return booster
+
+    def prune_boosters(self):
+        """Delete the least recently used boosters beyond ``max_boosters``."""
+        paths = [
+            os.path.join(self.model_dir, name)
+            for name in os.listdir(self.model_dir)
+            if name.startswith("lgbm-") and name.endswith(".txt")
+        ]
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except FileNotFoundError:  # Pruned by another process
+                pass
+        for path in sorted(mtimes, key=mtimes.get, reverse=True)[self.max_boosters:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return self
+
+    def fit(self, df):
+        """
+        Train (or load) the booster on every LightGBM row and choose the moving average window.
+
+        Args:
+            df (pd.DataFrame): FeatureEngineer output with ``Cantidad_Semanal``
+        """
+        lgbm = ~df["ID_Region"].isin(self.ma_regions)
+        X = feature_matrix(df)
+        self.features = list(X.columns)
+        self.booster = self.train_booster(X[lgbm], df.loc[lgbm, TARGET])
+        if self.ma_window is None:
+            self.ma_window = self.best_ma_window(df[~lgbm])
+        # Last known weekly targets of every moving average region, the
+        # history of the moving average of the rows that follow
+        self.ma_tail = {
+            region: target.dropna().to_numpy(dtype=np.float64)[-self.ma_window:]
+            for region, target in df.loc[~lgbm].groupby("ID_Region")[TARGET]
+        }
+        return self
+
+    def predict(self, df):
+        """
+        Forecast every row: one batched LightGBM call and one moving average pass.
+
+        The moving average regions continue the targets of the history given
+        to ``fit``: every row gets the mean of the last ``ma_window`` known
+        ``Cantidad_Semanal`` of its region before it. Rows without a known
+        target (future weeks, or no ``Cantidad_Semanal`` column) do not add
+        to the history, so they all get the latest moving average.
+
+        Args:
+            df (pd.DataFrame): FeatureEngineer output of the rows following
+                the history; ``Cantidad_Semanal`` is optional
+
+        Returns:
+            pd.DataFrame: ``Modelo_Usado`` and ``Cantidad_Predicha`` aligned with ``df``
+        """
+        if self.booster is None:
+            raise RuntimeError("El modelo no está entrenado, llamar a fit() primero")
+        ma = df["ID_Region"].isin(self.ma_regions).to_numpy()
+        predicted = np.full(len(df), np.nan)
+        if (~ma).any():
+            X = feature_matrix(df)[self.features]
+            predicted[~ma] = self.booster.predict(X[~ma])
+        if ma.any():
+            predicted[ma] = self._continued_moving_average(df[ma])
+        return pd.DataFrame({
+            "Modelo_Usado": np.where(ma, "Media_Movil", "LGBM"),
+            "Cantidad_Predicha": predicted,
+        }, index=df.index)
+
+    def backtest(self, df, n_splits=5):
+        """
+        Out-of-sample predictions over a ``TimeSeriesSplit``, as in the notebook.
+
+        The LightGBM rows of every validation fold are predicted by a booster
+        trained on the previous rows; the first training fold has no
+        predictions. Fold boosters are cached like the others.
+
+        Args:
+            df (pd.DataFrame): FeatureEngineer output with ``Cantidad_Semanal``
+            n_splits (int): Number of folds
+
+        Returns:
+            pd.DataFrame: ``Modelo_Usado`` and ``Cantidad_Predicha`` aligned with ``df``
+        """
+        ma = df["ID_Region"].isin(self.ma_regions).to_numpy()
+        X = feature_matrix(df)
+        X_lgbm, y_lgbm = X[~ma], df.loc[~ma, TARGET]
+        predicted = pd.Series(np.nan, index=df.index)
+        for train_index, val_index in TimeSeriesSplit(n_splits=n_splits).split(X_lgbm):
+            booster = self.train_booster(X_lgbm.iloc[train_index], y_lgbm.iloc[train_index])
+            predicted.loc[X_lgbm.index[val_index]] = booster.predict(X_lgbm.iloc[val_index])
+
+        if self.ma_window is None:
+            self.ma_window = self.best_ma_window(df[ma], n_splits)
+        if ma.any():
+            predicted[ma] = moving_average(df[ma], self.ma_window)
+        return pd.DataFrame({
+            "Modelo_Usado": np.where(ma, "Media_Movil", "LGBM"),
+            "Cantidad_Predicha": predicted,
+        }, index=df.index)
+
+    def best_ma_window(self, df_ma, n_splits=5, windows=range(1, 17)):
+        """Window of the moving average with the lowest mean RMSE over the folds."""
+        if df_ma.empty:
+            return 1
+        return best_window(backtest_windows(df_ma, windows, n_splits=n_splits))
+
+    def _continued_moving_average(self, df_ma):
+        """Moving average of the known targets, the ``fit`` history included."""
+        target = (df_ma[TARGET].to_numpy(dtype=np.float64) if TARGET in df_ma.columns
+                  else np.full(len(df_ma), np.nan))
+        predicted = np.full(len(df_ma), np.nan)
+        for region, rows in df_ma.groupby("ID_Region").indices.items():
+            tail = self.ma_tail.get(region, np.array([]))
+            values = np.concatenate([tail, target[rows]])
+            known = ~np.isnan(values)
+            # Known targets before every position and their prefix sums
+            before = np.cumsum(known) - known
+            prefix = np.concatenate(([0.0], np.cumsum(values[known])))
+            start = np.maximum(before - self.ma_window, 0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = (prefix[before] - prefix[start]) / (before - start)
+            predicted[rows] = means[len(tail):]
+        return predicted
+
+    @staticmethod
+    def _load_params(path):
+        """Tuned parameters, empty if the file is missing or empty."""
+        try:
+            with open(path) as f:
+                content = f.read().strip()
+        except FileNotFoundError:
+            return {}
+        return json.loads(content) if content else {}
+
+
+if __name__ == "__main__":
+    history = add_weekly_target(read_dataset("../data_clean/data_fe.csv"))
+    forecaster = Forecaster()
+    columns = ["Fecha", "Region", "Categoria", "Cantidad_Semanal", "Cantidad_Predicha"]
+    if len(sys.argv) > 2:
+        # New rows: FeatureEngineer output, Cantidad_Semanal is computed when Cantidad is known
+        df = read_dataset(sys.argv[1])
+        if TARGET not in df.columns and "Cantidad" in df.columns:
+            df = add_weekly_target(df)
+        df[["Modelo_Usado", "Cantidad_Predicha"]] = forecaster.fit(history).predict(df)
+        output = sys.argv[2]
+        columns = [col for col in columns if col in df.columns]
+    else:
+        df = history
+        df[["Modelo_Usado", "Cantidad_Predicha"]] = forecaster.backtest(df)
+        output = "../data_clean/data_con_predicciones.csv"
+    df[columns].to_csv(output, index=False)
+    print(f"Boosters entrenados: {forecaster.trained}, cargados: {forecaster.loaded}")
+    print(f"Ventana de media móvil: {forecaster.ma_window}")
+    print(f"Predicciones guardadas en: {output}")
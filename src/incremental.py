@@ -0,0 +1,348 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering import FeatureEngineer
+
+
+class IncrementalFeatureEngineer(FeatureEngineer):
+    """
+    Feature engineering that appends new sales to an existing output.
+
+    The output is sorted by Categoria, Region and Fecha, so every
+    (Categoria, Region) pair is a contiguous block of rows. The Categoria and
+    Region features roll across consecutive blocks, which means appending a day
+    of sales changes the new rows and the first rows of the blocks that follow
+    within ``STATE_ROWS`` rows in the same Categoria or Region. Both only depend
+    on the last rows before them, so the state keeps, for every block, its
+    first and last ``STATE_ROWS`` input rows.
+
+    Every block is stored in ``blocks_dir`` as a head file (its first
+    ``STATE_ROWS`` rows) and a body file (the rest). New rows are engineered
+    together with the state: the heads they change are rewritten and the rows
+    past the head are appended to the body, so an append reads and writes a
+    number of rows bounded by the new rows and the number of blocks, never the
+    history. ``export`` concatenates the blocks into the same file as a full
+    recompute.
+    """
+
+    STATE_ROWS = FeatureEngineer.MAX_WINDOW
+
+    def __init__(
+        self,
+        input_path="../data_clean/ventas_clean.csv",
+        output_path="../data_clean/data_fe.csv",
+        state_path="../data_clean/data_fe_state.pkl",
+        blocks_dir=None,
+    ):
+        """
+        Initialize the IncrementalFeatureEngineer.
+
+        Args:
+            input_path (str): Path to the cleaned sales data
+            output_path (str): Path to save the engineered features
+            state_path (str): Path to save the per-block state
+            blocks_dir (str): Directory of the block files, ``<output>_blocks`` if None
+        """
+        super().__init__(input_path, output_path)
+        self.state_path = state_path
+        self.blocks_dir = blocks_dir or os.path.splitext(output_path)[0] + "_blocks"
+        self.state = None
+
+    def engineer(self, n_jobs=1, compact=False, features=None):
+        """
+        Execute the complete pipeline and save the state for later appends.
+
+        Args:
+            n_jobs (int): Worker processes for the grouped features, -1 for all CPUs
+            compact (bool): Shrink the dtypes before saving, appended rows are
+                compacted too
+            features (list): Not supported, the state needs the full output
+
+        Returns:
+            pd.DataFrame: The engineered dataframe
+        """
+        if features is not None:
+            raise ValueError("El modo incremental necesita todas las features, no admite features=")
+        super().engineer(n_jobs, compact=compact)
+        self.build_state()
+        self.state["compact"] = compact
+        self.write_blocks().save_state()
+        return self.df
+
+    def build_state(self):
+        """Build the per-block state from the engineered dataframe."""
+        raw_columns = list(self.load_raw_columns())
+        blocks = self.df.groupby(["Categoria", "Region"], sort=False).size()
+
+        rows = []
+        start = 0
+        block_info = []
+        # Blocks in output order, the index of a block names its files
+        for (categoria, region), size in blocks.items():
+            positions = np.arange(size)
+            keep = (positions < self.STATE_ROWS) | (positions >= size - self.STATE_ROWS)
+            block = self.df.iloc[start : start + size][raw_columns][keep].copy()
+            block["_pos"] = positions[keep]
+            rows.append(block)
+            block_info.append(
+                {
+                    "Categoria": categoria,
+                    "Region": region,
+                    "size": size,
+                    "last_fecha": self.df["Fecha"].iloc[start + size - 1],
+                }
+            )
+            start += size
+
+        self.state = {
+            "columns": list(self.df.columns),
+            "raw_columns": raw_columns,
+            "blocks": pd.DataFrame(block_info),
+            "rows": pd.concat(rows, ignore_index=True),
+        }
+        return self
+
+    def write_blocks(self):
+        """Write the head and body files of every block of the engineered dataframe."""
+        tmp_dir = f"{self.blocks_dir}.tmp{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        columns = self.state["columns"]
+        start = 0
+        for i, size in enumerate(self.state["blocks"]["size"]):
+            block = self.df.iloc[start : start + size][columns]
+            block.iloc[: self.STATE_ROWS].to_csv(self._block_file(i, "head", tmp_dir), header=False, index=False)
+            block.iloc[self.STATE_ROWS :].to_csv(self._block_file(i, "body", tmp_dir), header=False, index=False)
+            start += size
+
+        # Swapped in whole, the blocks of the previous state are never mixed in
+        old_dir = f"{self.blocks_dir}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.isdir(self.blocks_dir):
+            os.rename(self.blocks_dir, old_dir)
+        os.rename(tmp_dir, self.blocks_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return self
+
+    def export(self, path=None):
+        """
+        Write the output as one CSV: the header and the blocks in output order.
+
+        The block files are copied as they are, nothing is recomputed; it reads
+        and writes the whole output, so run it only when a single file is needed.
+
+        Args:
+            path (str): Output CSV, ``output_path`` if None
+        """
+        path = path or self.output_path
+        if self.state is None:
+            self.load_state()
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as dst:
+            dst.write(pd.DataFrame(columns=self.state["columns"]).to_csv(index=False).encode())
+            for i in range(len(self.state["blocks"])):
+                for part in ("head", "body"):
+                    with open(self._block_file(i, part), "rb") as src:
+                        shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, path)
+        print(f"Feature Engineering exportado en: {path}")
+        return self
+
+    def load_raw_columns(self):
+        """Columns of the cleaned sales data, read from its header."""
+        return pd.read_csv(self.input_path, nrows=0).columns
+
+    def save_state(self):
+        """Save the state to the state path."""
+        pd.to_pickle(self.state, self.state_path)
+        return self
+
+    def load_state(self):
+        """Load the state from the state path."""
+        self.state = pd.read_pickle(self.state_path)
+        return self
+
+    def append(self, new_data):
+        """
+        Engineer new sales and splice them into the existing output.
+
+        The new rows are first appended to ``input_path``, so the input
+        always holds every row of the output. Falls back to a full recompute
+        of that input when the new rows cannot be appended: no previous
+        state, a new Categoria/Region pair, or a date earlier than the last
+        one of its block.
+
+        Args:
+            new_data (str or pd.DataFrame): New rows with the cleaned sales schema
+
+        Returns:
+            pd.DataFrame: The engineered new rows
+        """
+        new = pd.read_csv(new_data) if isinstance(new_data, str) else new_data.copy()
+        self._append_input(new)
+        new["Fecha"] = pd.to_datetime(new["Fecha"])
+
+        if not os.path.exists(self.state_path) or not os.path.isdir(self.blocks_dir):
+            return self._full_recompute(new)
+        self.load_state()
+
+        blocks = self.state["blocks"]
+        merged = new.merge(
+            blocks[["Categoria", "Region", "last_fecha"]],
+            on=["Categoria", "Region"],
+            how="left",
+        )
+        if merged["last_fecha"].isna().any() or (merged["Fecha"] < merged["last_fecha"]).any():
+            print("Filas nuevas fuera de orden o de un grupo nuevo, recalculando todo...")
+            return self._full_recompute(new)
+
+        print(f"Feature Engineering incremental: {len(new)} filas nuevas")
+        state_rows = self.state["rows"]
+        new = new[self.state["raw_columns"]].copy()
+        new["_pos"] = -1
+
+        # The state rows are stored in output order, so the stable sort keeps
+        # them in place and puts the new rows at the end of their block
+        self.df = pd.concat([state_rows, new], ignore_index=True)
+        self.df["_new"] = np.arange(len(self.df)) >= len(state_rows)
+        (
+            self.sort_data()
+            .create_temporal_features()
+            .create_lag_features()
+            .create_rolling_features()
+            .create_interaction_features()
+            .create_categorical_encoding()
+        )
+
+        # Block positions of the new rows, continuing after the old rows
+        is_new = self.df["_new"]
+        new_rows = self.df.loc[is_new, ["Categoria", "Region"]]
+        sizes = blocks.set_index(["Categoria", "Region"])["size"]
+        self.df.loc[is_new, "_pos"] = (
+            sizes.reindex(pd.MultiIndex.from_frame(new_rows)).to_numpy()
+            + new_rows.groupby(["Categoria", "Region"]).cumcount().to_numpy()
+        )
+
+        engineered = self.df
+        if self.state.get("compact"):
+            # Same dtypes as the compacted output, the helper columns stay as they are
+            self.df = engineered[self.state["columns"]]
+            self.compact_dtypes()
+            engineered = pd.concat([self.df, engineered[["_new", "_pos"]]], axis=1)
+        self._write_changed_blocks(engineered)
+        self._update_state(engineered)
+        self.save_state()
+
+        self.df = engineered.loc[engineered["_new"], self.state["columns"]]
+        print(f"Feature Engineering completado. Bloques actualizados en: {self.blocks_dir}")
+        return self.df
+
+    def _append_input(self, new):
+        """Append the new rows to the input CSV, in the column order of its header."""
+        new[list(self.load_raw_columns())].to_csv(self.input_path, mode="a", header=False, index=False)
+
+    def _full_recompute(self, new):
+        """Run the full pipeline on the input, which already includes ``new``."""
+        # Keep the dtypes of the existing output
+        self.engineer(compact=bool(self.state and self.state.get("compact")))
+        return self.df[self.df["ID_Venta"].isin(new["ID_Venta"])]
+
+    def _write_changed_blocks(self, engineered):
+        """Rewrite the heads the new rows change and append the rest to the bodies."""
+        columns = self.state["columns"]
+        blocks = self.state["blocks"]
+        block_of = pd.MultiIndex.from_frame(blocks[["Categoria", "Region"]]).get_indexer(
+            pd.MultiIndex.from_frame(engineered[["Categoria", "Region"]])
+        )
+        is_new = engineered["_new"].to_numpy()
+        head = engineered["_pos"].to_numpy() < self.STATE_ROWS
+
+        # Heads after the new rows, and heads the new rows fall in
+        rewrite = self._affected_blocks(np.bincount(block_of[is_new], minlength=len(blocks)) > 0)
+        rewrite[block_of[is_new & head]] = True
+        for i in np.flatnonzero(rewrite):
+            # The state holds every head row, old and new, in output order
+            path = self._block_file(i, "head")
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            engineered.loc[(block_of == i) & head, columns].to_csv(tmp_path, header=False, index=False)
+            os.replace(tmp_path, path)
+
+        body = is_new & ~head
+        for i, rows in engineered.loc[body, columns].groupby(block_of[body]):
+            rows.to_csv(self._block_file(i, "body"), mode="a", header=False, index=False)
+
+    def _affected_blocks(self, received):
+        """
+        Blocks whose head reads rows added to an earlier block.
+
+        The rows added to a block end right before the next block of its
+        Categoria and of its Region; a head reads them while fewer than
+        ``STATE_ROWS`` rows of the blocks in between separate them.
+        """
+        blocks = self.state["blocks"]
+        sizes = blocks["size"].to_numpy()
+        affected = np.zeros(len(blocks), dtype=bool)
+        for key in ("Categoria", "Region"):
+            for chain in blocks.groupby(key, sort=False).indices.values():
+                for j, i in enumerate(chain):
+                    between = 0
+                    for previous in chain[:j][::-1]:
+                        if received[previous]:
+                            affected[i] = True
+                            break
+                        between += sizes[previous]
+                        if between >= self.STATE_ROWS:
+                            break
+        return affected
+
+    def _block_file(self, i, part, directory=None):
+        """Head or body file of block ``i``."""
+        return os.path.join(directory or self.blocks_dir, f"{i:04d}_{part}.csv")
+
+    def _update_state(self, engineered):
+        """Shift the blocks and keep the first and last rows of each one."""
+        blocks = self.state["blocks"].copy()
+        added = (
+            engineered[engineered["_new"]]
+            .groupby(["Categoria", "Region"])
+            .size()
+            .reindex(pd.MultiIndex.from_frame(blocks[["Categoria", "Region"]]), fill_value=0)
+            .to_numpy()
+        )
+        last_fecha = (
+            engineered.groupby(["Categoria", "Region"])["Fecha"]
+            .max()
+            .reindex(pd.MultiIndex.from_frame(blocks[["Categoria", "Region"]]))
+            .to_numpy()
+        )
+        blocks["size"] += added
+        blocks["last_fecha"] = last_fecha
+
+        sizes = (
+            blocks.set_index(["Categoria", "Region"])["size"]
+            .reindex(pd.MultiIndex.from_frame(engineered[["Categoria", "Region"]]))
+            .to_numpy()
+        )
+        pos = engineered["_pos"].to_numpy()
+        keep = (pos < self.STATE_ROWS) | (pos >= sizes - self.STATE_ROWS)
+        rows = engineered.loc[keep, self.state["raw_columns"] + ["_pos"]]
+
+        self.state["blocks"] = blocks
+        self.state["rows"] = rows.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Append the rows of the given file, write data_fe.csv from the blocks
+    # (--export), or build the state from scratch
+    fe = IncrementalFeatureEngineer()
+    if len(sys.argv) > 1 and sys.argv[1] == "--export":
+        fe.export()
+    elif len(sys.argv) > 1:
+        fe.append(sys.argv[1])
+    else:
+        fe.engineer()
@@ -0,0 +1,165 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Highest resident memory seen before any reset of the kernel's high-water mark
+_process_peak_kb = 0
+
+
+@contextmanager
+def measure_stage(stage, frame):
+    """
+    Measure one pipeline stage.
+
+    The record is filled when the block exits, also when it raises: wall
+    and CPU time, the peak memory above the memory at the start of the
+    stage, rows and columns of the dataframe before and after, the number
+    of columns added, and the error that stopped the stage (None if it
+    completed). The exception is raised again.
+
+    Peak memory is the resident set size on Linux, where the kernel's
+    high-water mark is reset at the start of the stage, so it includes
+    memory outside the Python allocator (e.g. Arrow buffers). Elsewhere it
+    is measured with ``tracemalloc`` when tracing is on, and None otherwise.
+
+    Args:
+        stage (str): Name of the stage
+        frame (callable): Returns the current dataframe, or None
+
+    Yields:
+        dict: The record of the stage
+    """
+    rows_in, columns_in = _shape(frame())
+    record = {
+        "stage": stage,
+        "start": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+    }
+    memory_start, memory_peak = _reset_peak()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    error = None
+    try:
+        yield record
+    except BaseException as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        record["wall_s"] = time.perf_counter() - wall_start
+        record["cpu_s"] = time.process_time() - cpu_start
+        record["peak_mem_delta_mb"] = (
+            (memory_peak() - memory_start) / 1024**2 if memory_peak is not None else None
+        )
+        rows_out, columns_out = _shape(frame())
+        record["rows_in"] = rows_in
+        record["rows_out"] = rows_out
+        record["cols_in"] = len(columns_in)
+        record["cols_out"] = len(columns_out)
+        record["cols_added"] = len(set(columns_out) - set(columns_in))
+        record["error"] = error
+
+
+@contextmanager
+def profile(stage, output=None, sort="cumulative", limit=30):
+    """
+    Run the block under cProfile.
+
+    Args:
+        stage (str): Name of the profiled stage, used in the report
+        output (str): File for the raw stats (``pstats``/snakeviz format);
+            the top functions are printed if None
+        sort (str): Sort key of the printed report
+        limit (int): Functions in the printed report
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if output is not None:
+            os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+            profiler.dump_stats(output)
+            print(f"Perfil de {stage} guardado en: {output}")
+        else:
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats(sort).print_stats(limit)
+            print(f"Perfil de {stage}:\n{report.getvalue()}")
+
+
+def json_lines_hook(path):
+    """
+    Hook that appends every record as one JSON line to ``path``.
+
+    Args:
+        path (str): Output file, created if missing
+
+    Returns:
+        callable: The hook
+    """
+
+    def hook(record):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    return hook
+
+
+def peak_rss_mb():
+    """Peak resident memory of the process so far in MiB, across resets of the high-water mark."""
+    status = _proc_status()
+    if status is not None:
+        return max(_process_peak_kb, status["VmHWM"]) / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def _shape(df):
+    """Rows and column names of a dataframe, (None, []) without one."""
+    if df is None:
+        return None, []
+    return len(df), list(df.columns)
+
+
+def _reset_peak():
+    """
+    Reset the peak memory counter.
+
+    Returns:
+        tuple: Current memory in bytes and a function returning the peak in
+        bytes since the reset, ``(None, None)`` if memory cannot be measured
+    """
+    global _process_peak_kb
+    status = _proc_status()
+    if status is not None:
+        _process_peak_kb = max(_process_peak_kb, status["VmHWM"])
+        try:
+            # Resets VmHWM to the current resident size (Linux >= 4.0)
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+            return status["VmRSS"] * 1024, lambda: _proc_status()["VmHWM"] * 1024
+        except OSError:
+            pass
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0], lambda: tracemalloc.get_traced_memory()[1]
+    return None, None
+
+
+def _proc_status():
+    """VmRSS and VmHWM in KiB from /proc, None outside Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return {key: int(fields[key].split()[0]) for key in ("VmRSS", "VmHWM")}
+    except (OSError, KeyError, ValueError):
+        return None
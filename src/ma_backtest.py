@@ -0,0 +1,123 @@
+"""
+Moving average backtests for many window sizes at once
+
+The baseline of notebooks/experimentos-mp.ipynb and ``evaluate_ma`` in
+notebooks/modelado-predictivo.ipynb compute, for every window ``n``,
+
+    df.groupby(keys)[value_col].transform(lambda x: x.shift(1).rolling(n, min_periods=1).mean())
+
+and score it on the folds of a ``TimeSeriesSplit``. Here the rows are
+sorted by group once, every window of every row is read from the same
+prefix sums, and the errors of all windows and folds are reduced as arrays.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import TimeSeriesSplit
+
+from rolling import group_codes, group_positions
+
+
+def moving_average_matrix(df, windows, keys=("ID_Region",), value_col="Cantidad_Semanal", shift=1, rows=None):
+    """
+    Shifted moving averages (``min_periods=1``) of every window size.
+
+    Column ``j`` equals
+    ``df.groupby(keys)[value_col].transform(lambda x: x.shift(shift).rolling(windows[j], min_periods=1).mean())``.
+
+    Args:
+        df (pd.DataFrame): Data in the order the windows must follow inside each group
+        windows (iterable): Window sizes, positive integers
+        keys (tuple): Grouping columns
+        value_col (str): Column to average
+        shift (int): Number of rows the series is shifted before rolling
+        rows (np.ndarray): Positions of the rows to compute, all rows if None
+
+    Returns:
+        np.ndarray: One row per requested row and one column per window
+    """
+    windows = np.asarray(list(windows), dtype=np.int64)
+    if (windows < 1).any():
+        raise ValueError(f"Las ventanas deben ser enteros positivos: {windows.tolist()}")
+
+    codes = group_codes(df, list(keys))
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    values = df[value_col].to_numpy(dtype=np.float64)[order]
+    valid = ~np.isnan(values)
+    prefix_sum = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    prefix_count = np.concatenate(([0], np.cumsum(valid)))
+    group_start = np.arange(len(values)) - group_positions(sorted_codes)
+
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    idx = rank if rows is None else rank[np.asarray(rows)]
+
+    # The window of a row ends `shift` rows before it and never crosses its group start
+    start = group_start[idx]
+    hi = np.maximum(idx - shift + 1, start)
+    lo = np.minimum(np.maximum(hi[:, None] - windows[None, :], start[:, None]), hi[:, None])
+    sums = prefix_sum[hi][:, None] - prefix_sum[lo]
+    counts = prefix_count[hi][:, None] - prefix_count[lo]
+
+    out = np.full(counts.shape, np.nan)
+    np.divide(sums, counts, out=out, where=counts > 0)
+    out[sorted_codes[idx] < 0] = np.nan
+    return out
+
+
+def backtest_windows(df, windows=range(1, 17), keys=("ID_Region",), value_col="Cantidad_Semanal", n_splits=5):
+    """
+    Score the moving average of every window on every fold of a ``TimeSeriesSplit``.
+
+    Rows without a prediction (the first row of every group) or without a
+    true value are left out of the scores, as ``np.mean`` on the notebook's
+    Series does.
+
+    Args:
+        df (pd.DataFrame): Data in time order
+        windows (iterable): Window sizes
+        keys (tuple): Grouping columns
+        value_col (str): Column to forecast
+        n_splits (int): Folds of the ``TimeSeriesSplit``
+
+    Returns:
+        pd.DataFrame: ``window``, ``fold`` (from 1), ``RMSE``, ``MAE``,
+        ``Max_Error`` and scored rows ``n``, one row per window and fold
+    """
+    windows = np.asarray(list(windows), dtype=np.int64)
+    val_starts = np.array([val[0] for _, val in TimeSeriesSplit(n_splits=n_splits).split(df)])
+    # Validation folds are consecutive and end at the last row
+    rows = np.arange(val_starts[0], len(df))
+    pred = moving_average_matrix(df, windows, keys, value_col, rows=rows)
+    y = df[value_col].to_numpy(dtype=np.float64)[rows]
+
+    err = np.abs(pred - y[:, None])
+    scored = ~np.isnan(err)
+    starts = val_starts - val_starts[0]
+    n = np.add.reduceat(scored, starts, axis=0)
+    sse = np.add.reduceat(np.where(scored, err * err, 0.0), starts, axis=0)
+    sae = np.add.reduceat(np.where(scored, err, 0.0), starts, axis=0)
+    max_error = np.fmax.reduceat(err, starts, axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return pd.DataFrame({
+            "window": np.tile(windows, n_splits),
+            "fold": np.repeat(np.arange(1, n_splits + 1), len(windows)),
+            "RMSE": np.sqrt(sse / n).ravel(),
+            "MAE": (sae / n).ravel(),
+            "Max_Error": max_error.ravel(),
+            "n": n.ravel(),
+        })
+
+
+def summarize(results):
+    """Mean of every score over the folds, one row per window."""
+    return results.drop(columns="fold").groupby("window").agg(
+        RMSE=("RMSE", "mean"), MAE=("MAE", "mean"), Max_Error=("Max_Error", "mean"), n=("n", "sum")
+    )
+
+
+def best_window(results, metric="RMSE"):
+    """Window with the lowest mean ``metric`` over the folds, the smallest one on ties."""
+    return int(summarize(results)[metric].idxmin())
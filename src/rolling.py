@@ -0,0 +1,358 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def group_codes(df, keys):
+    """
+    Integer code of the group each row belongs to.
+
+    Args:
+        df (pd.DataFrame): Data containing the grouping columns
+        keys (list): Columns that define the groups
+
+    Returns:
+        np.ndarray: Group code per row, -1 for rows with a missing key
+    """
+    codes = df.groupby(keys, sort=False, dropna=True).ngroup()
+    return codes.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def group_positions(sorted_codes):
+    """
+    0-based position of each row inside its group.
+
+    Args:
+        sorted_codes (np.ndarray): Group code per row, rows sorted by group
+
+    Returns:
+        np.ndarray: Position of each row inside its group
+    """
+    n = len(sorted_codes)
+    starts = group_starts(sorted_codes)
+    sizes = np.diff(np.r_[starts, n])
+    return np.arange(n) - np.repeat(starts, sizes)
+
+
+def group_starts(sorted_codes):
+    """Index of the first row of every group, rows sorted by group."""
+    if not len(sorted_codes):
+        return np.array([], dtype=np.int64)
+    return np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+
+
+def shifted_rolling_stats(
+    df, keys, value_col, mean_windows, std_windows=(), shift=1, n_jobs=1
+):
+    """
+    Shifted rolling means and standard deviations for every window in one pass.
+
+    Equivalent to ``df.groupby(keys)[value_col].transform(lambda x: x.shift(shift).rolling(w).mean())``
+    (and ``.std()``) for each window, including the NaN warm-up rows. The rows are
+    sorted once by group and every window is derived from the same cumulative
+    sums. The sums restart at every group and the values are centered on the
+    mean of their group before accumulating (rounded when the group holds only
+    integers, which keeps integer quantities exact). Standard deviations are a
+    two-pass variance of every window around its mean, so drifting or
+    near-constant float series keep their precision.
+
+    With ``n_jobs > 1`` the sorted rows are split into ranges of similar size
+    and computed on a process pool, see ``parallel_sorted_rolling_stats``.
+
+    Args:
+        df (pd.DataFrame): Data in the order the windows must follow inside each group
+        keys (list): Grouping columns
+        value_col (str): Column to aggregate
+        mean_windows (iterable): Window sizes for the rolling mean
+        std_windows (iterable): Window sizes for the rolling std (ddof=1)
+        shift (int): Number of rows the series is shifted before rolling
+        n_jobs (int): Number of worker processes, -1 for all CPUs
+
+    Returns:
+        dict: ``{("mean", w): np.ndarray, ("std", w): np.ndarray}`` aligned with ``df``
+    """
+    codes = group_codes(df, keys)
+    order = np.argsort(codes, kind="stable")
+    values = df[value_col].to_numpy(dtype=np.float64)[order]
+    sorted_codes = codes[order]
+    names = [("mean", w) for w in dict.fromkeys(mean_windows)]
+    names += [("std", w) for w in dict.fromkeys(std_windows)]
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs > 1:
+        sorted_stats = parallel_sorted_rolling_stats(values, sorted_codes, names, shift, n_jobs)
+    else:
+        sorted_stats = sorted_rolling_stats(values, sorted_codes, names, shift)
+
+    stats = np.empty_like(sorted_stats)
+    stats[order] = sorted_stats
+    return {name: stats[:, i] for i, name in enumerate(names)}
+
+
+def daily_rolling_stats(
+    df, keys, value_col, mean_windows, std_windows=(), date_col="Fecha", n_jobs=1
+):
+    """
+    Rolling statistics over calendar days of the daily totals of each group.
+
+    The rows are reduced to one total per group and day on the full calendar
+    of ``df`` (days without sales count as 0), the windows run over that
+    compact series, and every row gets the value of its group and day. A
+    window of ``w`` covers the ``w`` days before the row's day, so sales of
+    the same day are never included. The work grows with days x groups
+    instead of with the number of transactions.
+
+    Args:
+        df (pd.DataFrame): Data containing the keys, values and dates
+        keys (list): Grouping columns
+        value_col (str): Column to aggregate
+        mean_windows (iterable): Window sizes in days for the rolling mean
+        std_windows (iterable): Window sizes in days for the rolling std (ddof=1)
+        date_col (str): Date column
+        n_jobs (int): Number of worker processes, -1 for all CPUs
+
+    Returns:
+        dict: ``{("mean", w): np.ndarray, ("std", w): np.ndarray}`` aligned with ``df``
+    """
+    codes = group_codes(df, keys)
+    days = df[date_col].dt.normalize()
+    day_idx = (days - days.min()).dt.days.to_numpy()
+    values = df[value_col].to_numpy(dtype=np.float64)
+    valid = (codes >= 0) & ~np.isnan(day_idx.astype(np.float64))
+    n_groups = codes.max() + 1 if valid.any() else 0
+    n_days = int(np.nanmax(day_idx)) + 1 if valid.any() else 0
+
+    # Dense (group, day) totals; each group is a contiguous run of days
+    flat = np.full(len(df), -1, dtype=np.int64)
+    flat[valid] = codes[valid] * n_days + day_idx[valid].astype(np.int64)
+    totals = np.bincount(
+        flat[valid],
+        weights=np.nan_to_num(values[valid]),
+        minlength=n_groups * n_days,
+    )
+    daily_codes = np.repeat(np.arange(n_groups), n_days)
+
+    names = [("mean", w) for w in dict.fromkeys(mean_windows)]
+    names += [("std", w) for w in dict.fromkeys(std_windows)]
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs > 1:
+        daily = parallel_sorted_rolling_stats(totals, daily_codes, names, 1, n_jobs)
+    else:
+        daily = sorted_rolling_stats(totals, daily_codes, names, shift=1)
+
+    # Broadcast back to the rows with an index join on (group, day)
+    stats = np.full((len(df), len(names)), np.nan)
+    stats[valid] = daily[flat[valid]]
+    return {name: stats[:, i] for i, name in enumerate(names)}
+
+
+def sorted_rolling_stats(values, sorted_codes, names, shift=1):
+    """
+    Shifted rolling statistics of rows already sorted by group.
+
+    Args:
+        values (np.ndarray): Values sorted by group
+        sorted_codes (np.ndarray): Group code per row
+        names (list): ``("mean", w)`` or ``("std", w)`` statistics to compute
+        shift (int): Number of rows the series is shifted before rolling
+
+    Returns:
+        np.ndarray: One column per statistic in ``names``
+    """
+    positions = group_positions(sorted_codes)
+    n = len(values)
+
+    # Shift inside each group: the first `shift` rows of a group have no history
+    shifted = np.full(n, np.nan)
+    if shift < n:
+        shifted[shift:] = values[: n - shift] if shift else values
+    shifted[positions < shift] = np.nan
+    shifted[sorted_codes < 0] = np.nan
+
+    valid = ~np.isnan(shifted)
+    offsets = _group_offsets(shifted, valid, sorted_codes)
+    centered = np.where(valid, shifted - offsets, 0.0)
+
+    # Running sums restart at every group, a window never crosses its group
+    running_sum = _group_cumsum(centered, group_starts(sorted_codes))
+    prefix_count = np.concatenate(([0], np.cumsum(valid)))
+    values = np.where(valid, shifted, 0.0)
+
+    stats = np.empty((n, len(names)))
+    for i, (stat, window) in enumerate(names):
+        stats[:, i] = _window_stat(
+            stat, window, values, running_sum, prefix_count, positions, offsets
+        )
+    return stats
+
+
+def parallel_sorted_rolling_stats(values, sorted_codes, names, shift, n_jobs):
+    """
+    ``sorted_rolling_stats`` computed on a process pool.
+
+    The sorted rows are cut into ranges of similar size, also inside large
+    groups, so the work spreads over every worker even with a few dominant
+    groups. Each task reads ``halo_rows(names, shift)`` rows before its range
+    as the history of its first windows and writes only its own rows. Inputs
+    and the output matrix live in shared memory; every worker reads its range
+    and writes its rows of the output in place, so no data is pickled and the
+    rows stay in their sorted order.
+
+    Args:
+        values (np.ndarray): Values sorted by group
+        sorted_codes (np.ndarray): Group code per row
+        names (list): ``("mean", w)`` or ``("std", w)`` statistics to compute
+        shift (int): Number of rows the series is shifted before rolling
+        n_jobs (int): Number of worker processes
+
+    Returns:
+        np.ndarray: One column per statistic in ``names``
+    """
+    n = len(values)
+    bounds = _task_bounds(n, n_tasks=n_jobs * 4)
+    if len(bounds) <= 1:
+        # Empty or one-task input, a pool would not help
+        return sorted_rolling_stats(values, sorted_codes, names, shift)
+    halo = halo_rows(names, shift)
+    blocks = []
+    try:
+        values_shm = _shared_copy(values, blocks)
+        codes_shm = _shared_copy(sorted_codes, blocks)
+        out_shm = _shared_copy(np.empty((n, len(names))), blocks)
+        tasks = [
+            (values_shm.name, codes_shm.name, out_shm.name, n, names, shift, lo, hi, halo)
+            for lo, hi in bounds
+        ]
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as pool:
+            list(pool.map(_rolling_task, tasks))
+        out = np.ndarray((n, len(names)), dtype=np.float64, buffer=out_shm.buf).copy()
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return out
+
+
+def halo_rows(names, shift):
+    """Rows before a range that the windows of its first rows read."""
+    return max((window for _, window in names), default=1) + shift - 1
+
+
+def _task_bounds(n, n_tasks):
+    """Row ranges of similar size covering ``n`` rows."""
+    edges = np.unique(np.linspace(0, n, n_tasks + 1).astype(np.int64))
+    return [(lo, hi) for lo, hi in zip(edges[:-1], edges[1:]) if hi > lo]
+
+
+def _shared_copy(array, blocks):
+    """Copy an array into a new shared memory block."""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(shm)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm
+
+
+def _attach(name):
+    """
+    Attach to a shared memory block owned by the parent process.
+
+    Pool workers share the parent's resource tracker, so the block stays
+    registered once and is only unlinked by the parent.
+    """
+    return shared_memory.SharedMemory(name=name)
+
+
+def _rolling_task(task):
+    """Worker: compute the statistics of one row range in shared memory."""
+    values_name, codes_name, out_name, n, names, shift, lo, hi, halo = task
+    values_shm, codes_shm, out_shm = _attach(values_name), _attach(codes_name), _attach(out_name)
+    try:
+        values = np.ndarray((n,), dtype=np.float64, buffer=values_shm.buf)
+        codes = np.ndarray((n,), dtype=np.int64, buffer=codes_shm.buf)
+        out = np.ndarray((n, len(names)), dtype=np.float64, buffer=out_shm.buf)
+        # Positions restart at the first row read; rows written are at least
+        # `halo` rows after it, so their windows and shift are not affected
+        start = max(lo - halo, 0)
+        out[lo:hi] = sorted_rolling_stats(values[start:hi], codes[start:hi], names, shift)[lo - start:]
+        del values, codes, out
+    finally:
+        values_shm.close()
+        codes_shm.close()
+        out_shm.close()
+
+
+def _group_offsets(shifted, valid, sorted_codes):
+    """
+    Mean of each group, broadcast to its rows.
+
+    The mean is rounded for groups whose values are all integers, so their
+    centered values and sums stay exact.
+    """
+    codes = np.where(sorted_codes < 0, 0, sorted_codes)
+    n_groups = codes.max() + 1 if len(codes) else 0
+    values = np.where(valid, shifted, 0.0)
+    sums = np.bincount(codes, weights=values, minlength=n_groups)
+    counts = np.bincount(codes, weights=valid.astype(np.float64), minlength=n_groups)
+    fractional = np.bincount(codes, weights=(values != np.round(values)).astype(np.float64), minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / np.maximum(counts, 1)
+    means = np.where(fractional > 0, means, np.round(means))
+    means[~np.isfinite(means)] = 0.0
+    return means[codes]
+
+
+def _group_cumsum(values, starts):
+    """Cumulative sum of every group, restarting at its first row."""
+    total = np.cumsum(values)
+    # Running total just before the first row of every group, broadcast to its rows
+    before = np.r_[0.0, total][starts]
+    sizes = np.diff(np.r_[starts, len(values)])
+    return total - np.repeat(before, sizes)
+
+
+def _window_stat(stat, window, values, running_sum, prefix_count, positions, offsets):
+    """
+    Rolling mean or std of one window size.
+
+    Means come from the running sums of the groups. The std is a two-pass
+    variance: the squared deviations of every window from its mean, summed
+    over the ``window`` shifted copies of the values. The sum of the
+    deviations corrects the rounding of the mean.
+    """
+    n = len(positions)
+    out = np.full(n, np.nan)
+    if window < 1 or (stat == "std" and window < 2):
+        return out
+
+    end = np.arange(1, n + 1)
+    start = end - window
+    # Window must stay inside the group and contain `window` observations
+    full = positions >= window - 1
+    full[full] &= (prefix_count[end[full]] - prefix_count[start[full]]) == window
+    idx = np.flatnonzero(full)
+    # Rows idx - window + 1 .. idx, the sums before the first row are 0 at a group start
+    first = idx - window + 1
+    at_start = positions[first] == 0
+    s = running_sum[idx] - np.where(at_start, 0.0, running_sum[first - 1])
+
+    means = (s + window * offsets[idx]) / window
+    if stat == "mean":
+        out[idx] = means
+        return out
+
+    mean = np.zeros(n)
+    mean[idx] = means
+    dev_sum = np.zeros(n)
+    dev_sq = np.zeros(n)
+    # Row i - k of the window of row i, for every lag k at once
+    for k in range(window):
+        dev = values[: n - k] - mean[k:]
+        dev_sum[k:] += dev
+        dev_sq[k:] += dev * dev
+    var = (dev_sq[idx] - dev_sum[idx] * dev_sum[idx] / window) / (window - 1)
+    out[idx] = np.sqrt(np.maximum(var, 0.0))
+    return out
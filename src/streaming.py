@@ -0,0 +1,174 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering import FeatureEngineer
+
+
+class StreamingFeatureEngineer(FeatureEngineer):
+    """
+    Out-of-core feature engineering for inputs larger than memory.
+
+    The input is read in chunks and spilled to temporary partitions by
+    Categoria, Region and month, which sorts it without loading it whole.
+    Partitions are then processed in output order in batches; every batch is
+    engineered together with the last ``MAX_WINDOW`` rows of each Categoria
+    and Region seen so far, so the rolling windows continue across batches,
+    and the result is appended to the output file.
+    """
+
+    # Approximate bytes per row while engineering: ~75 float64 columns plus
+    # groupby temporaries
+    BYTES_PER_ROW = 75 * 8 * 4
+
+    def __init__(
+        self,
+        input_path="../data_clean/ventas_clean.csv",
+        output_path="../data_clean/data_fe.csv",
+        memory_budget=512 * 1024**2,
+        chunksize=None,
+        tmp_dir=None,
+    ):
+        """
+        Initialize the StreamingFeatureEngineer.
+
+        Args:
+            input_path (str): Path to the cleaned sales data
+            output_path (str): Path to save the engineered features
+            memory_budget (int): Approximate peak memory in bytes for a batch
+            chunksize (int): Rows per chunk and batch, derived from the budget if None
+            tmp_dir (str): Directory for the partitions, a temporary one if None
+        """
+        super().__init__(input_path, output_path)
+        self.chunksize = chunksize or max(1000, memory_budget // self.BYTES_PER_ROW)
+        self.tmp_dir = tmp_dir
+        self.partitions = {}
+        self.regions = []
+        self.context = None
+        self.rows_written = 0
+
+    def partition_data(self, spill_dir):
+        """
+        Read the input in chunks and spill it by Categoria, Region and month.
+
+        Raises:
+            ValueError: If a row has no Categoria or Region, it would belong to no partition
+        """
+        regions = set()
+        n_files = 0
+        for chunk in pd.read_csv(self.input_path, chunksize=self.chunksize):
+            missing = chunk[["Categoria", "Region"]].isna().any(axis=1)
+            if missing.any():
+                raise ValueError(
+                    f"{int(missing.sum())} filas sin Categoria o Region en {self.input_path}"
+                )
+            chunk["Fecha"] = pd.to_datetime(chunk["Fecha"])
+            regions.update(chunk["Region"].unique())
+            month = chunk["Fecha"].dt.to_period("M").astype(str)
+            for key, part in chunk.groupby([chunk["Categoria"], chunk["Region"], month]):
+                path = os.path.join(spill_dir, f"{n_files}.pkl")
+                part.to_pickle(path)
+                self.partitions.setdefault(key, []).append(path)
+                n_files += 1
+        self.regions = sorted(regions)
+        return self
+
+    def iter_batches(self):
+        """Yield the partitions in output order, grouped into batches of about ``chunksize`` rows."""
+        batch = []
+        batch_rows = 0
+        for key in sorted(self.partitions):
+            part = pd.concat(
+                [pd.read_pickle(path) for path in self.partitions[key]], ignore_index=True
+            )
+            part = part.sort_values(by="Fecha", kind="stable")
+            batch.append(part)
+            batch_rows += len(part)
+            if batch_rows >= self.chunksize:
+                yield pd.concat(batch, ignore_index=True)
+                batch = []
+                batch_rows = 0
+        if batch:
+            yield pd.concat(batch, ignore_index=True)
+
+    def engineer_batch(self, batch):
+        """
+        Engineer one batch using the carried rows as history.
+
+        Args:
+            batch (pd.DataFrame): Rows in output order
+
+        Returns:
+            pd.DataFrame: The engineered batch
+        """
+        batch = batch.assign(_seq=np.arange(len(batch)) + self.rows_written)
+        history = self.context if self.context is not None else batch.iloc[:0]
+        # History and batch are already in output order, no sort needed
+        self.df = pd.concat([history, batch], ignore_index=True)
+        (
+            self.create_temporal_features()
+            .create_lag_features()
+            .create_rolling_features()
+            .create_interaction_features()
+            .create_categorical_encoding()
+        )
+        engineered = self.df.iloc[len(history) :]
+
+        # Keep the most recent rows of every Categoria and Region sequence
+        raw = self.df[list(batch.columns)]
+        keep = raw.groupby("Categoria").tail(self.MAX_WINDOW).index.union(
+            raw.groupby("Region").tail(self.MAX_WINDOW).index
+        )
+        self.context = raw.loc[keep].sort_values("_seq").reset_index(drop=True)
+        self.rows_written += len(batch)
+        return engineered.drop(columns="_seq")
+
+    def create_categorical_encoding(self, columns=None):
+        """Encode categorical variables with the regions of the whole input."""
+        self.df["ID_Region"] = pd.Categorical(self.df["Region"], categories=self.regions).codes
+        return self
+
+    def engineer(self, n_jobs=1, compact=False, features=None):
+        """
+        Execute the pipeline chunk by chunk, writing the output as it goes.
+
+        Args:
+            n_jobs (int): Worker processes for the grouped features, -1 for all CPUs
+            compact (bool): Shrink the dtypes of every batch before saving it
+            features (list): Not supported, the output is only kept on disk
+
+        Returns:
+            StreamingFeatureEngineer: self, the output is only kept on disk
+        """
+        if features is not None:
+            raise ValueError("El Feature Engineering por bloques no calcula subconjuntos de features")
+        self.n_jobs = n_jobs
+        print(f"Iniciando Feature Engineering por bloques de {self.chunksize} filas...")
+        spill_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+        try:
+            self.partition_data(spill_dir)
+            first = True
+            for batch in self.iter_batches():
+                engineered = self.engineer_batch(batch)
+                if compact:
+                    self.df = engineered
+                    engineered = self.compact_dtypes().df
+                engineered.to_csv(
+                    self.output_path, mode="w" if first else "a", header=first, index=False
+                )
+                first = False
+        finally:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+        self.df = None
+
+        print(f"Feature Engineering completado. Datos guardados en: {self.output_path}")
+        print(f"Filas procesadas: {self.rows_written}")
+        return self
+
+
+if __name__ == "__main__":
+    fe = StreamingFeatureEngineer()
+    fe.engineer()
@@ -0,0 +1,188 @@
+"""
+Synthetic sales with the schema and mix of data_clean/ventas_clean.csv
+
+The generator samples from the empirical distributions of the real data:
+the joint Region x product frequencies (and with them the Categoria mix),
+the price of every product, the payment method, Estado, Cantidad and the
+sale dates. Prediction tables shaped like the ones the dashboard reads are
+derived from the generated sales.
+
+Generate 1M rows: python src/synthetic_data.py 1000000 data_synthetic/ventas_1M.csv
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    "ID_Venta", "Fecha", "ID_Cliente", "ID_Producto", "Cantidad", "Metodo_Pago_cat",
+    "Estado", "Categoria", "ID_Categoria", "Precio_Unitario", "Region", "ID_Metodo",
+    "Metodo_Pago", "ID_Ticket", "Monto_Venta",
+]
+
+
+def sales_profile(path="data_clean/ventas_clean.csv"):
+    """
+    Empirical distributions of the real sales.
+
+    Args:
+        path (str): Cleaned sales to learn from
+
+    Returns:
+        dict: Frequency tables used by ``generate_sales``
+    """
+    df = pd.read_csv(path)
+    products = df.groupby("ID_Producto")[["Categoria", "ID_Categoria", "Precio_Unitario"]].first()
+    return {
+        "n_rows": len(df),
+        "mix": _frequencies(df, ["Region", "ID_Producto"]),
+        "products": products,
+        "methods": _frequencies(df, ["ID_Metodo", "Metodo_Pago_cat", "Metodo_Pago"]),
+        "estados": _frequencies(df, ["Estado"]),
+        "cantidades": _frequencies(df, ["Cantidad"]),
+        "fechas": _frequencies(df, ["Fecha"]),
+        "n_clientes": int(df["ID_Cliente"].max()),
+        "n_tickets": int(df["ID_Ticket"].max()),
+    }
+
+
+def generate_sales(n_rows, seed=0, profile=None, first_id=1, total_rows=None):
+    """
+    Generate synthetic sales.
+
+    Clients and tickets grow with the number of rows, so the sales per
+    client and per ticket stay close to the real ones.
+
+    Args:
+        n_rows (int): Number of sales
+        seed (int): Random seed
+        profile (dict): Output of ``sales_profile``, learned from the real data if None
+        first_id (int): ID_Venta of the first row
+        total_rows (int): Rows of the whole dataset when generating it in chunks
+
+    Returns:
+        pd.DataFrame: Sales with the columns of ventas_clean.csv
+    """
+    profile = profile or sales_profile()
+    rng = np.random.default_rng(seed)
+    scale = max((total_rows or n_rows) / profile["n_rows"], 1.0)
+
+    mix = _sample(profile["mix"], n_rows, rng)
+    methods = _sample(profile["methods"], n_rows, rng)
+    products = profile["products"].loc[mix["ID_Producto"]].reset_index(drop=True)
+    cantidad = _sample(profile["cantidades"], n_rows, rng)["Cantidad"].to_numpy()
+    precio = products["Precio_Unitario"].to_numpy()
+
+    df = pd.DataFrame({
+        "ID_Venta": np.arange(first_id, first_id + n_rows),
+        "Fecha": _sample(profile["fechas"], n_rows, rng)["Fecha"].to_numpy(),
+        "ID_Cliente": rng.integers(1, int(profile["n_clientes"] * scale) + 1, n_rows),
+        "ID_Producto": mix["ID_Producto"].to_numpy(),
+        "Cantidad": cantidad,
+        "Metodo_Pago_cat": methods["Metodo_Pago_cat"].to_numpy(),
+        "Estado": _sample(profile["estados"], n_rows, rng)["Estado"].to_numpy(),
+        "Categoria": products["Categoria"].to_numpy(),
+        "ID_Categoria": products["ID_Categoria"].to_numpy(),
+        "Precio_Unitario": precio,
+        "Region": mix["Region"].to_numpy(),
+        "ID_Metodo": methods["ID_Metodo"].to_numpy(),
+        "Metodo_Pago": methods["Metodo_Pago"].to_numpy(),
+        "ID_Ticket": rng.integers(1, int(profile["n_tickets"] * scale) + 1, n_rows),
+        "Monto_Venta": np.round(cantidad * precio, 2),
+    })
+    return df[COLUMNS]
+
+
+def write_sales(path, n_rows, seed=0, chunk_rows=1_000_000, profile=None):
+    """
+    Write synthetic sales to a CSV in chunks, without holding them in memory.
+
+    Args:
+        path (str): Output CSV
+        n_rows (int): Number of sales
+        seed (int): Random seed, every chunk uses ``seed + i``
+        chunk_rows (int): Rows generated at a time
+        profile (dict): Output of ``sales_profile``, learned from the real data if None
+
+    Returns:
+        str: The output path
+    """
+    profile = profile or sales_profile()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    for i, start in enumerate(range(0, n_rows, chunk_rows)):
+        size = min(chunk_rows, n_rows - start)
+        chunk = generate_sales(size, seed + i, profile, first_id=start + 1, total_rows=n_rows)
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return path
+
+
+def synthetic_predictions(ventas, seed=0):
+    """
+    Prediction tables shaped like the ones the dashboard reads.
+
+    ``Cantidad_Semanal`` is the weekly quantity of every Region x Categoria
+    (or product), and ``Cantidad_Predicha`` that value with multiplicative
+    noise; the first week has no prediction, as in the real files.
+
+    Args:
+        ventas (pd.DataFrame): Sales as returned by ``generate_sales``
+        seed (int): Random seed
+
+    Returns:
+        tuple: ``(predicciones, productos, predicciones_2025)`` dataframes
+    """
+    rng = np.random.default_rng(seed)
+    fecha = pd.to_datetime(ventas["Fecha"])
+    semana = (fecha - fecha.min()).dt.days // 7
+
+    def weekly(keys):
+        total = ventas.groupby([semana] + [ventas[k] for k in keys])["Cantidad"].transform("sum")
+        predicha = total * rng.lognormal(0.0, 0.1, len(total))
+        predicha[semana.to_numpy() == 0] = np.nan
+        return total, predicha
+
+    semanal, predicha = weekly(["Region", "Categoria"])
+    predicciones = pd.DataFrame({
+        "Fecha": ventas["Fecha"],
+        "Region": ventas["Region"],
+        "Categoria": ventas["Categoria"],
+        "Cantidad_Semanal": semanal,
+        "Cantidad_Predicha": predicha,
+    })
+
+    semanal_prod, predicha_prod = weekly(["Region", "ID_Producto"])
+    productos = pd.DataFrame({
+        "Fecha": ventas["Fecha"],
+        "Region": ventas["Region"],
+        "ID_Producto": ventas["ID_Producto"],
+        "Categoria": ventas["Categoria"],
+        "Cantidad_Semanal": semanal_prod,
+        "Cantidad_Predicha": predicha_prod,
+        "Modelo_Usado": "LGBM",
+    })
+
+    predicciones_2025 = predicciones.assign(
+        Fecha=(fecha + pd.DateOffset(years=1)).dt.strftime("%Y-%m-%d")
+    )
+    return predicciones, productos, predicciones_2025
+
+
+def _frequencies(df, columns):
+    """Relative frequency of every combination of ``columns``."""
+    counts = df.groupby(columns).size()
+    return (counts / counts.sum()).rename("p").reset_index()
+
+
+def _sample(table, n, rng):
+    """Sample ``n`` rows of a frequency table."""
+    idx = rng.choice(len(table), size=n, p=table["p"].to_numpy())
+    return table.iloc[idx].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    path = sys.argv[2] if len(sys.argv) > 2 else f"data_synthetic/ventas_{n_rows}.csv"
+    write_sales(path, n_rows)
+    print(f"{n_rows} ventas sintéticas guardadas en: {path}")
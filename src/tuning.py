@@ -0,0 +1,238 @@
+"""
+Parallel, resumable LightGBM hyperparameter search
+
+Same search as the Optuna study of notebooks/modelado-predictivo.ipynb:
+TPE sampler, median pruner, mean RMSE over a ``TimeSeriesSplit`` of the
+LightGBM regions with early stopping in every fold. The fold datasets are
+binned once per worker and reused by every trial, trials run in parallel
+on a local process pool, and the study lives in a SQLite storage, so an
+interrupted search resumes where it stopped. Running trials send a
+heartbeat to the storage; a trial whose process died stops beating and is
+failed and retried by the next worker that starts a trial.
+
+Run from src/: python tuning.py --trials 50 --jobs 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+import lightgbm as lgb
+import optuna
+from optuna.storages import RetryFailedTrialCallback
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+from sklearn.model_selection import TimeSeriesSplit
+
+from dataset_store import read_dataset
+from forecast import BASE_PARAMS, MA_REGIONS, TARGET, add_weekly_target, feature_matrix
+
+# Binning is fixed when a Dataset is constructed; without the pre-filter,
+# trials can lower min_data_in_leaf on an already binned Dataset
+DATASET_PARAMS = {"feature_pre_filter": False, "verbosity": -1}
+
+FINISHED = (TrialState.COMPLETE, TrialState.PRUNED)
+
+# Seconds between heartbeats of a running trial, and without one before it is failed
+HEARTBEAT_INTERVAL = 60
+GRACE_PERIOD = 180
+
+
+def search_space(trial):
+    """LightGBM parameters of a trial, the ranges of the notebook."""
+    return {
+        "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.3, log=True),
+        "num_leaves": trial.suggest_int("num_leaves", 20, 256),
+        "max_depth": trial.suggest_int("max_depth", 3, 12),
+        "min_data_in_leaf": trial.suggest_int("min_data_in_leaf", 5, 50),
+        "feature_fraction": trial.suggest_float("feature_fraction", 0.6, 1.0),
+        "bagging_fraction": trial.suggest_float("bagging_fraction", 0.6, 1.0),
+        "bagging_freq": trial.suggest_int("bagging_freq", 1, 7),
+        "lambda_l1": trial.suggest_float("lambda_l1", 1e-8, 10.0, log=True),
+        "lambda_l2": trial.suggest_float("lambda_l2", 1e-8, 10.0, log=True),
+    }
+
+
+def training_data(path, ma_regions=MA_REGIONS):
+    """Features and target of the LightGBM regions of a FeatureEngineer output."""
+    df = read_dataset(path)
+    if TARGET not in df.columns:
+        df = add_weekly_target(df)
+    lgbm = ~df["ID_Region"].isin(ma_regions)
+    return feature_matrix(df)[lgbm], df.loc[lgbm, TARGET]
+
+
+def fold_datasets(X, y, n_splits=5):
+    """
+    Training and validation ``lgb.Dataset`` of every fold, binned once.
+
+    Args:
+        X (pd.DataFrame): Features
+        y (pd.Series): Target
+        n_splits (int): Folds of the ``TimeSeriesSplit``
+
+    Returns:
+        list: ``(train, valid)`` constructed datasets of every fold
+    """
+    folds = []
+    for train_index, val_index in TimeSeriesSplit(n_splits=n_splits).split(X):
+        train = lgb.Dataset(X.iloc[train_index], y.iloc[train_index], params=DATASET_PARAMS)
+        # Validation data shares the bin boundaries of its training data
+        valid = train.create_valid(X.iloc[val_index], y.iloc[val_index], params=DATASET_PARAMS)
+        train.construct()
+        valid.construct()
+        folds.append((train, valid))
+    return folds
+
+
+class Objective:
+    """
+    Mean validation RMSE of a trial over prebuilt fold datasets.
+    """
+
+    def __init__(self, folds, num_boost_round=1000, early_stopping_rounds=50, num_threads=0):
+        """
+        Initialize the Objective.
+
+        Args:
+            folds (list): Output of ``fold_datasets``
+            num_boost_round (int): Maximum boosting rounds per fold
+            early_stopping_rounds (int): Rounds without improvement before a fold stops
+            num_threads (int): LightGBM threads per trial, 0 for the OpenMP default
+        """
+        self.folds = folds
+        self.num_boost_round = num_boost_round
+        self.early_stopping_rounds = early_stopping_rounds
+        self.num_threads = num_threads
+
+    def __call__(self, trial):
+        params = dict(BASE_PARAMS, num_threads=self.num_threads, **search_space(trial))
+        scores = []
+        for fold, (train, valid) in enumerate(self.folds):
+            booster = lgb.train(
+                params,
+                train,
+                num_boost_round=self.num_boost_round,
+                valid_sets=[valid],
+                callbacks=[lgb.early_stopping(self.early_stopping_rounds, verbose=False)],
+            )
+            # RMSE at the best iteration, no need to predict the fold again
+            rmse = booster.best_score["valid_0"]["rmse"]
+            trial.report(rmse, fold)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+            scores.append(rmse)
+        return sum(scores) / len(scores)
+
+
+def tune(
+    data_path="../data_clean/data_fe.csv",
+    storage="sqlite:///../models/optuna.db",
+    study_name="lgbm",
+    n_trials=50,
+    n_jobs=None,
+    n_splits=5,
+    seed=42,
+    output="../notebooks/best_lgbm_params.json",
+):
+    """
+    Run (or resume) the search until the study has ``n_trials`` finished trials.
+
+    Every worker process builds the fold datasets once and pulls trials from
+    the shared storage; trials left running by an interrupted search are
+    failed and retried once their heartbeat is older than ``GRACE_PERIOD``.
+
+    Args:
+        data_path (str): FeatureEngineer output
+        storage (str): Optuna storage URL
+        study_name (str): Name of the study in the storage
+        n_trials (int): Finished (complete or pruned) trials of the study
+        n_jobs (int): Worker processes, one per CPU if None
+        n_splits (int): Folds of the ``TimeSeriesSplit``
+        seed (int): Seed of the sampler, worker ``i`` uses ``seed + i``
+        output (str): JSON file for the best parameters, None to skip it
+
+    Returns:
+        optuna.Study: The study
+    """
+    _make_storage_dir(storage)
+    study = optuna.create_study(
+        study_name=study_name, storage=_storage(storage), direction="minimize", load_if_exists=True
+    )
+
+    remaining = n_trials - len(study.get_trials(deepcopy=False, states=FINISHED))
+    if remaining > 0:
+        cpus = os.cpu_count() or 1
+        n_jobs = max(1, min(n_jobs or cpus, remaining))
+        print(f"Optimizando {remaining} trials con {n_jobs} procesos...")
+        args = [
+            (data_path, storage, study_name, n_trials, n_splits, seed + i, max(1, cpus // n_jobs))
+            for i in range(n_jobs)
+        ]
+        if n_jobs == 1:
+            _worker(*args[0])
+        else:
+            with multiprocessing.get_context("spawn").Pool(n_jobs) as pool:
+                pool.starmap(_worker, args)
+
+    print(f"Mejores hiperparámetros: {study.best_params}")
+    print(f"Mejor RMSE: {study.best_value}")
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(study.best_params, f)
+        print(f"Hiperparámetros guardados en: {output}")
+    return study
+
+
+def _worker(data_path, storage, study_name, n_trials, n_splits, seed, num_threads):
+    """Pull trials of the study until it has ``n_trials`` finished trials."""
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    X, y = training_data(data_path)
+    objective = Objective(fold_datasets(X, y, n_splits), num_threads=num_threads)
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=_storage(storage),
+        sampler=optuna.samplers.TPESampler(seed=seed),
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=0),
+    )
+    study.optimize(objective, n_trials=n_trials, callbacks=[MaxTrialsCallback(n_trials, states=FINISHED)])
+
+
+def _storage(url):
+    """RDB storage with trial heartbeats, waiting for the SQLite lock instead of failing."""
+    engine_kwargs = {"connect_args": {"timeout": 60}} if url.startswith("sqlite:") else None
+    return optuna.storages.RDBStorage(
+        url,
+        engine_kwargs=engine_kwargs,
+        heartbeat_interval=HEARTBEAT_INTERVAL,
+        grace_period=GRACE_PERIOD,
+        # Stale trials are failed and enqueued again with the same parameters
+        failed_trial_callback=RetryFailedTrialCallback(),
+    )
+
+
+def _make_storage_dir(url):
+    """Create the directory of a SQLite database."""
+    if url.startswith("sqlite:///"):
+        os.makedirs(os.path.dirname(url[len("sqlite:///"):]) or ".", exist_ok=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimización de hiperparámetros de LightGBM")
+    parser.add_argument("--data", default="../data_clean/data_fe.csv")
+    parser.add_argument("--storage", default="sqlite:///../models/optuna.db")
+    parser.add_argument("--study", default="lgbm")
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--jobs", type=int, default=None, help="Procesos (por defecto uno por CPU)")
+    parser.add_argument("--splits", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="../notebooks/best_lgbm_params.json")
+    args = parser.parse_args(argv)
+    tune(args.data, args.storage, args.study, args.trials, args.jobs, args.splits, args.seed, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
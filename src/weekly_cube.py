@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+class WeeklyCube:
+    """
+    Dense pre-aggregated cube of a dataset, e.g. Semana x Region x Categoria.
+
+    Every cell holds, for each measure, the sum and the number of non-null
+    values, plus the number of rows. Queries select labels along each
+    dimension and add up the selected cells, so their cost depends on the
+    number of cells and not on the number of rows.
+    """
+
+    def __init__(self, df, dims, measures, attrs=None):
+        """
+        Build the cube.
+
+        Args:
+            df (pd.DataFrame): Data to aggregate
+            dims (list): Dimension columns, e.g. ["Semana", "Region", "Categoria"]
+            measures (list): Numeric columns to aggregate
+            attrs (dict): JSON-serializable metadata kept with the cube
+        """
+        self.dims = list(dims)
+        self.measures = list(measures)
+        self.attrs = dict(attrs or {})
+        self.labels = {dim: pd.Index(sorted(df[dim].dropna().unique()), name=dim) for dim in self.dims}
+        shape = tuple(len(self.labels[dim]) for dim in self.dims)
+
+        codes = [self.labels[dim].get_indexer(df[dim]) for dim in self.dims]
+        valid = np.logical_and.reduce([c >= 0 for c in codes]) if codes else np.ones(len(df), bool)
+        flat = np.ravel_multi_index([c[valid] for c in codes], shape) if len(df) else np.array([], int)
+        size = int(np.prod(shape))
+
+        self.rows = np.bincount(flat, minlength=size).reshape(shape)
+        self.sums = {}
+        self.counts = {}
+        self.integer = {}
+        for measure in self.measures:
+            values = df[measure].to_numpy(dtype=np.float64)[valid]
+            notna = ~np.isnan(values)
+            self.sums[measure] = np.bincount(
+                flat[notna], weights=values[notna], minlength=size
+            ).reshape(shape)
+            self.counts[measure] = np.bincount(flat[notna], minlength=size).reshape(shape)
+            self.integer[measure] = pd.api.types.is_integer_dtype(df[measure].dtype)
+
+    @property
+    def empty(self):
+        """Whether the cube was built from no rows."""
+        return not self.rows.any()
+
+    def save(self, directory):
+        """
+        Write the cube as ``.npy`` arrays that ``load`` can memory-map.
+
+        The files are written next to ``directory`` and renamed into place,
+        so concurrent writers are safe: the first one wins and the others
+        discard their copy.
+
+        Args:
+            directory (str): Directory of the cube
+        """
+        tmp_dir = f"{directory}.tmp{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "rows.npy"), self.rows)
+        for i, measure in enumerate(self.measures):
+            np.save(os.path.join(tmp_dir, f"sums_{i}.npy"), self.sums[measure])
+            np.save(os.path.join(tmp_dir, f"counts_{i}.npy"), self.counts[measure])
+        for i, dim in enumerate(self.dims):
+            labels = self.labels[dim].to_numpy()
+            if labels.dtype == object:
+                labels = labels.astype(str)
+            np.save(os.path.join(tmp_dir, f"labels_{i}.npy"), labels)
+        meta = {
+            "dims": self.dims,
+            "measures": self.measures,
+            "integer": [bool(self.integer[m]) for m in self.measures],
+            "attrs": self.attrs,
+        }
+        with open(os.path.join(tmp_dir, "cube.json"), "w") as f:
+            json.dump(meta, f)
+        try:
+            os.rename(tmp_dir, directory)
+        except OSError:  # Another process saved it first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return self
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """
+        Load a cube written by ``save``.
+
+        With ``mmap_mode="r"`` the arrays are mapped read-only instead of
+        read, so every process that loads the same directory shares one copy
+        of the data in the page cache.
+
+        Args:
+            directory (str): Directory of the cube
+            mmap_mode (str): ``np.load`` mmap mode, None to read the arrays into memory
+
+        Returns:
+            WeeklyCube: The loaded cube
+        """
+        with open(os.path.join(directory, "cube.json")) as f:
+            meta = json.load(f)
+        cube = cls.__new__(cls)
+        cube.dims = meta["dims"]
+        cube.measures = meta["measures"]
+        cube.attrs = meta.get("attrs", {})
+        cube.labels = {
+            dim: pd.Index(np.load(os.path.join(directory, f"labels_{i}.npy")), name=dim)
+            for i, dim in enumerate(cube.dims)
+        }
+        cube.rows = np.load(os.path.join(directory, "rows.npy"), mmap_mode=mmap_mode)
+        cube.sums = {}
+        cube.counts = {}
+        cube.integer = {}
+        for i, measure in enumerate(cube.measures):
+            cube.sums[measure] = np.load(os.path.join(directory, f"sums_{i}.npy"), mmap_mode=mmap_mode)
+            cube.counts[measure] = np.load(os.path.join(directory, f"counts_{i}.npy"), mmap_mode=mmap_mode)
+            cube.integer[measure] = meta["integer"][i]
+        return cube
+
+    def aggregate(self, by, where=None, measures=None, stat="sum", dropna=False):
+        """
+        Aggregate the selected cells, like a filtered ``groupby(by)[measures]``.
+
+        Args:
+            by (list): Dimensions to keep, the rest are added up
+            where (dict): Labels to keep per dimension, all if a dimension is missing
+            measures (list or str): Measures to return, all if None
+            stat (str): "sum" (missing values count as 0) or "mean" of the non-null values
+            dropna (bool): Only keep groups with non-null values, like filtering
+                out the missing values before grouping
+
+        Returns:
+            pd.DataFrame or pd.Series: One row per group present in the selection,
+            indexed by ``by`` in sorted order; a Series if ``measures`` is a str
+        """
+        where = where or {}
+        single = isinstance(measures, str)
+        measures = [measures] if single else list(measures or self.measures)
+
+        selectors = []
+        for dim in self.dims:
+            if dim in where:
+                idx = self.labels[dim].get_indexer(pd.Index(list(where[dim])).unique())
+                selectors.append(np.sort(idx[idx >= 0]))
+            else:
+                selectors.append(np.arange(len(self.labels[dim])))
+        selection = np.ix_(*selectors)
+        axes = tuple(i for i, dim in enumerate(self.dims) if dim not in by)
+        # Order of the kept dimensions in the result
+        kept = [dim for dim in self.dims if dim in by]
+
+        rows = self.rows[selection].sum(axis=axes)
+        values = {}
+        present = rows > 0
+        for measure in measures:
+            sums = self.sums[measure][selection].sum(axis=axes)
+            counts = self.counts[measure][selection].sum(axis=axes)
+            if dropna:
+                present &= counts > 0
+            if stat == "mean":
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    values[measure] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+            elif self.integer[measure]:
+                values[measure] = np.rint(sums).astype(np.int64)
+            else:
+                values[measure] = sums
+
+        cells = np.nonzero(present)
+        index = pd.MultiIndex.from_arrays(
+            [self.labels[dim][selectors[self.dims.index(dim)][cell]] for dim, cell in zip(kept, cells)],
+            names=kept,
+        )
+        result = pd.DataFrame({m: values[m][cells] for m in measures}, index=index)
+        result = result.reorder_levels(by) if list(by) != kept else result
+        result = result.sort_index()
+        if len(by) == 1:
+            result.index = result.index.get_level_values(0)
+        return result[measures[0]] if single else result
+
+
+def shared_cube(cache_dir, name, version, build, modified=None):
+    """
+    Cube memory-mapped from ``cache_dir``, built and saved only if missing.
+
+    The directory of a cube is named after the dataset and its version, so
+    the first process that needs a version builds it and every other process
+    (e.g. the workers of a pre-fork server) maps the same files. A process
+    that saves a version removes the cubes of strictly older ones, by their
+    ``modified`` time: a worker still rebuilding a previous version never
+    removes the current one. Processes that still map a removed cube keep
+    their pages until they reload.
+
+    Args:
+        cache_dir (str): Directory shared by the processes
+        name (str): Name of the dataset
+        version: Version stamp of the dataset, any value with a stable ``repr``
+        build (callable): Builds the cube when it is not in the cache
+        modified (int): Modification time of the version, greater for newer
+            versions; None keeps the cubes of every other version
+
+    Returns:
+        WeeklyCube: The memory-mapped cube
+    """
+    digest = hashlib.sha1(repr(version).encode()).hexdigest()[:16]
+    directory = os.path.join(cache_dir, f"{name}-{digest}")
+    if not os.path.isdir(directory):
+        os.makedirs(cache_dir, exist_ok=True)
+        cube = build()
+        cube.attrs["version_modified"] = modified
+        cube.save(directory)
+        if modified is not None:
+            remove_older_cubes(cache_dir, name, modified)
+    try:
+        return WeeklyCube.load(directory)
+    except FileNotFoundError:  # Removed by a newer version meanwhile
+        return build()
+
+
+def remove_older_cubes(cache_dir, name, modified):
+    """Remove the cubes of ``name`` saved for a version older than ``modified``."""
+    for entry in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, entry)
+        if not entry.startswith(f"{name}-") or ".tmp" in entry:
+            continue
+        try:
+            with open(os.path.join(path, "cube.json")) as f:
+                cube_modified = json.load(f).get("attrs", {}).get("version_modified")
+        except (OSError, ValueError):  # Being removed by another process
+            continue
+        if cube_modified is not None and cube_modified < modified:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules of src/ import each other as siblings, as when run from src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
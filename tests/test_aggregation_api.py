@@ -0,0 +1,102 @@
+import io
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from flask import Flask
+
+from aggregation_api import create_api
+from data_provider import DataProvider
+from weekly_cube import WeeklyCube
+
+
+def load_cube(path):
+    df = pd.read_csv(path)
+    return WeeklyCube(df, ["Semana", "Region", "Categoria"], ["Cantidad"], {"inicio": "2024-01-01"})
+
+
+@pytest.fixture
+def data(tmp_path):
+    path = tmp_path / "ventas.csv"
+    pd.DataFrame(
+        {
+            "Semana": [1, 1, 2, 2, 3, 3],
+            "Region": ["Sur", "Norte", "Sur", "Norte", "Sur", "Sur"],
+            "Categoria": ["Bebidas", "Bebidas", "Lácteos", "Bebidas", "Lácteos", "Bebidas"],
+            "Cantidad": [1, 2, 3, 4, 5, 6],
+        }
+    ).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def provider(data):
+    return DataProvider().register("ventas", str(data), load_cube)
+
+
+@pytest.fixture
+def client(provider):
+    server = Flask(__name__)
+    server.register_blueprint(create_api(provider))
+    return server.test_client()
+
+
+def test_aggregate_json(client):
+    response = client.get("/api/ventas/aggregate?by=Region&Categoria=Bebidas")
+    assert response.status_code == 200
+    body = response.json
+    assert body["columns"] == ["Region", "Cantidad"]
+    assert body["data"] == [["Norte", 6], ["Sur", 7]]
+
+
+def test_date_range_selects_whole_weeks(client):
+    response = client.get("/api/ventas/aggregate?by=Semana&desde=2024-01-09&hasta=2024-01-15")
+    assert response.json["data"] == [[2, 7], [3, 11]]
+
+
+def test_aggregate_arrow(client):
+    response = client.get("/api/ventas/aggregate?by=Semana,Region&format=arrow")
+    assert response.mimetype == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(io.BytesIO(response.data)).read_all()
+    assert table.num_rows == 5
+    assert table.column("Cantidad").to_pylist() == [2, 1, 4, 3, 11]
+
+
+def test_etag_and_304(client, provider, data):
+    url = "/api/ventas/aggregate?by=Region"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    # Another query or new data gets another tag
+    assert client.get(url + "&stat=mean").headers["ETag"] != etag
+    data.write_text(data.read_text() + "4,Sur,Bebidas,10\n")
+    mtime = os.path.getmtime(data) + 10
+    os.utime(data, (mtime, mtime))
+    # What the watcher thread of the server does
+    assert provider.reload_changed() == ["ventas"]
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "by=Producto",
+        "metric=Monto",
+        "stat=median",
+        "format=xml",
+        "Semana=uno",
+        "Tienda=1",
+        "desde=ayer",
+    ],
+)
+def test_bad_queries_are_400(client, query):
+    response = client.get(f"/api/ventas/aggregate?{query}")
+    assert response.status_code == 400
+    assert "error" in response.json
+
+
+def test_unknown_dataset_is_404(client):
+    assert client.get("/api/compras/aggregate").status_code == 404
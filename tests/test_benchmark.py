@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import benchmark
+from benchmark import compare, main
+
+
+def make_run(label, seconds):
+    return {
+        "label": label,
+        "timestamp": "2026-10-01T00:00:00+00:00",
+        "results": [{"size": 1000, "name": name, "seconds": s} for name, s in seconds.items()],
+    }
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    # Stored runs are compared without running any benchmark
+    monkeypatch.setattr(benchmark, "run", lambda *args: pytest.fail("no debe ejecutar benchmarks"))
+    path = tmp_path / "history.json"
+    runs = [
+        make_run("nightly", {"fe.sort_data": 1.0, "fe.save_data": 2.0}),
+        make_run("pr", {"fe.sort_data": 1.5, "fe.save_data": 2.001}),
+        make_run("nightly", {"fe.sort_data": 1.6, "fe.save_data": 2.0}),
+    ]
+    path.write_text(json.dumps({"runs": runs}))
+    return str(path)
+
+
+def test_compare_ignores_noise():
+    baseline = make_run("base", {"a": 1.0, "b": 0.001, "c": 1.0})
+    records = make_run("new", {"a": 1.3, "b": 0.003, "c": 1.1, "d": 9.0})["results"]
+    assert compare(records, baseline, threshold=0.2) == [(1000, "a", 1.0, 1.3, pytest.approx(1.3))]
+
+
+def test_against_compares_stored_runs(history, capsys):
+    # pr against the nightly stored before it: sort_data regressed
+    assert main(["--history", history, "--against", "pr", "--baseline", "nightly"]) == 1
+    assert "fe.sort_data" in capsys.readouterr().out
+    # The last nightly against the previous run (pr)
+    assert main(["--history", history, "--against", "nightly"]) == 0
+    assert main(["--history", history, "--against", "nada"]) == 2
+    assert len(json.load(open(history))["runs"]) == 3
+
+
+def test_stage_records_carry_the_run_id(tmp_path):
+    records = benchmark.run_size(2_000, dashboard=False, work_dir=str(tmp_path), run_id="corrida1")
+    stages = [r for r in records if r["name"] in {f"fe.{stage}" for stage in benchmark.STAGES}]
+    assert len(stages) == len(benchmark.STAGES)
+    assert all(r["run_id"] == "corrida1" for r in stages)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from clustering import Clusterer, stratified_sample, sweep
+
+
+def make_data(seed=0, n=2_000):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 5, (4, 3))
+    X = centers[rng.integers(0, 4, n)] + rng.normal(0, 1, (n, 3))
+    df = pd.DataFrame(X, columns=["a", "b", "c"])
+    # NaNs to fill forward, one at the very start
+    df.iloc[0, 1] = np.nan
+    df.iloc[rng.integers(1, n, 50), 2] = np.nan
+    return df
+
+
+def test_saved_model_predicts_new_rows_like_the_fitted_one(tmp_path):
+    df = make_data()
+    history, new = df.iloc[:1_500], df.iloc[1_500:]
+    fitted = Clusterer(n_clusters=4, features=["a", "b", "c"], batch_size=256)
+    labels = fitted.fit_predict(history)
+    fitted.save(str(tmp_path / "clusters.npz"))
+    loaded = Clusterer.load(str(tmp_path / "clusters.npz"))
+
+    assert labels.shape == (1_500,)
+    whole = loaded.predict(new)
+    # The forward fill continues across calls, new rows in pieces get the same clusters
+    pieces = np.concatenate([fitted.predict(new.iloc[:100]), fitted.predict(new.iloc[100:])])
+    assert (pieces == whole).all()
+    assert len(np.unique(whole)) == 4
+
+
+def test_stratified_sample_keeps_every_cluster():
+    labels = np.repeat([0, 1, 2], [9_000, 990, 10])
+    sample = stratified_sample(labels, 1_000)
+    counts = np.bincount(labels[sample], minlength=3)
+    assert abs(len(sample) - 1_000) <= 3
+    assert (np.diff(sample) > 0).all()
+    np.testing.assert_allclose(counts, [900, 99, 2], atol=1)
+
+
+def test_parallel_sweep_matches_serial():
+    X = make_data().fillna(0.0).to_numpy()
+    serial = sweep(X, ks=range(2, 5), sample_size=500, batch_size=256, n_jobs=1)
+    parallel = sweep(X, ks=range(2, 5), sample_size=500, batch_size=256, n_jobs=2)
+    pd.testing.assert_frame_equal(serial, parallel)
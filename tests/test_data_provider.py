@@ -0,0 +1,76 @@
+import os
+import time
+
+import pandas as pd
+
+from data_provider import DataProvider
+
+
+def write(path, cantidad, mtime):
+    pd.DataFrame({"Cantidad": cantidad}).to_csv(path, index=False)
+    os.utime(path, (mtime, mtime))
+
+
+def test_lazy_load_and_reload(tmp_path):
+    path = str(tmp_path / "ventas.csv")
+    write(path, [1, 2], 1_000)
+    loads = []
+
+    def loader(p):
+        loads.append(p)
+        return pd.read_csv(p)
+
+    provider = DataProvider().register("ventas", path, loader)
+    assert provider.loaded() == []
+    version, first = provider.snapshot("ventas")
+    assert provider.get("ventas") is first
+    assert len(loads) == 1
+
+    # Unchanged file: nothing to reload
+    assert provider.reload_changed() == []
+    write(path, [1, 2, 3], 2_000)
+    assert provider.reload_changed() == ["ventas"]
+    new_version, second = provider.snapshot("ventas")
+    assert new_version != version
+    assert second["Cantidad"].sum() == 6
+    # The previous snapshot stays intact for requests that hold it
+    assert first["Cantidad"].sum() == 3
+
+
+def test_failed_reload_keeps_serving(tmp_path):
+    path = str(tmp_path / "ventas.csv")
+    write(path, [1, 2], 1_000)
+    fail = []
+
+    def loader(p):
+        if fail:
+            raise ValueError("archivo a medio escribir")
+        return pd.read_csv(p)
+
+    provider = DataProvider().register("ventas", path, loader)
+    snapshot = provider.snapshot("ventas")
+    fail.append(True)
+    write(path, [5], 2_000)
+    assert provider.reload_changed() == []
+    assert provider.snapshot("ventas") is snapshot
+
+
+def test_missing_file_is_none(tmp_path):
+    provider = DataProvider().register("ventas", str(tmp_path / "nada.csv"), pd.read_csv)
+    assert provider.get("ventas") is None
+
+
+def test_watcher_reloads_in_background(tmp_path):
+    path = str(tmp_path / "ventas.csv")
+    write(path, [1], 1_000)
+    provider = DataProvider(poll_interval=0.01).register("ventas", path, pd.read_csv)
+    provider.get("ventas")
+    provider.start()
+    try:
+        write(path, [1, 1], 2_000)
+        deadline = time.monotonic() + 5
+        while len(provider.get("ventas")) != 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        provider.stop()
+    assert len(provider.get("ventas")) == 2
@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pytest
+
+from dataset_store import read_dataset, store_path, write_dataset
+
+VENTAS = os.path.join(os.path.dirname(__file__), "..", "data_clean", "ventas_clean.csv")
+
+FILTERS = [
+    [],
+    [("Region", "==", "Buenos Aires")],
+    [("Fecha", ">=", "2024-06-01"), ("Fecha", "<", "2024-09-15")],
+    [("Categoria", "in", ["Bebidas", "Lácteos"]), ("Cantidad", ">", 3)],
+    [("Region", "not in", ["Cuyo"]), ("Fecha", "<=", "2024-03-31")],
+]
+
+
+@pytest.fixture
+def ventas(tmp_path):
+    path = tmp_path / "ventas_clean.csv"
+    pd.read_csv(VENTAS).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("columns", [None, ["Fecha", "Cantidad", "Monto_Venta"]])
+def test_parquet_matches_csv(ventas, filters, columns):
+    from_csv = read_dataset(ventas, columns=columns, filters=filters)
+    write_dataset(pd.read_csv(ventas), ventas)
+    from_parquet = read_dataset(ventas, columns=columns, filters=filters)
+    pd.testing.assert_frame_equal(from_parquet, from_csv, check_dtype=False)
+
+
+def test_declared_schema_is_stored(ventas):
+    # A compacted frame is stored with the declared types
+    df = pd.read_csv(ventas).astype({"Cantidad": "int8", "Categoria": "category"})
+    write_dataset(df, ventas)
+    schema = ds.dataset(store_path(ventas), partitioning="hive").schema
+    assert str(schema.field("Cantidad").type) == "int64"
+    assert str(schema.field("Categoria").type) == "string"
+    assert str(schema.field("Fecha").type) == "timestamp[us]"
+
+
+def test_undeclared_column_raises(ventas):
+    df = pd.read_csv(ventas).assign(Extra=1)
+    with pytest.raises(ValueError):
+        write_dataset(df, ventas)
+
+
+def test_unknown_filter_column_raises(ventas):
+    with pytest.raises(KeyError):
+        read_dataset(ventas, filters=[("Nada", "==", 1)])
+    write_dataset(pd.read_csv(ventas), ventas)
+    with pytest.raises(KeyError):
+        read_dataset(ventas, filters=[("Nada", "==", 1)])
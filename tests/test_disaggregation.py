@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from disaggregation import ProductShares
+
+CATALOG = pd.DataFrame({"ID_Producto": [1, 2, 3, 4, 5, 6], "Categoria": ["A", "A", "A", "B", "B", "C"]})
+
+
+def make_history(seed=0, n=3_000):
+    rng = np.random.default_rng(seed)
+    history = pd.DataFrame(
+        {
+            "Fecha": pd.Timestamp("2024-01-03") + pd.to_timedelta(rng.integers(0, 70, n), unit="D"),
+            "Region": rng.choice(["Norte", "Sur"], n),
+            "ID_Producto": rng.choice([1, 2, 4, 5], n),
+            "Cantidad": rng.integers(1, 10, n),
+        }
+    )
+    history["Categoria"] = history["ID_Producto"].map(CATALOG.set_index("ID_Producto")["Categoria"])
+    # Category B is never sold in the Sur region: falls back to the shares of all regions
+    return history[~((history["Region"] == "Sur") & (history["Categoria"] == "B"))]
+
+
+def weekly_forecast(history):
+    weeks = pd.date_range("2024-01-01", periods=12, freq="7D")
+    index = pd.MultiIndex.from_product([weeks, ["Norte", "Sur"], ["A", "B", "C"]], names=["Fecha", "Region", "Categoria"])
+    forecast = index.to_frame(index=False)
+    forecast["Cantidad_Predicha"] = np.arange(len(forecast)) % 7 + 10.0
+    return forecast
+
+
+@pytest.mark.parametrize("window", [4, 13, None])
+def test_product_forecasts_add_up_to_the_regional_forecast(window):
+    history = make_history()
+    forecast = weekly_forecast(history)
+    productos = ProductShares().fit(history, CATALOG).disaggregate(forecast, window=window)
+
+    totals = productos.groupby(["Fecha", "Region", "Categoria"])["Cantidad_Predicha"].sum()
+    expected = forecast.set_index(["Fecha", "Region", "Categoria"])["Cantidad_Predicha"]
+    pd.testing.assert_series_equal(totals, expected.loc[totals.index], check_names=False)
+    # Every forecast cell is split, the unsold category C evenly into its only product
+    assert len(totals) == len(expected)
+
+
+def test_shares_are_the_trailing_weekly_sales():
+    history = make_history()
+    shares = ProductShares(windows=[4]).fit(history, CATALOG)
+    forecast = pd.DataFrame(
+        {"Fecha": [pd.Timestamp("2024-02-05")], "Region": ["Norte"], "Categoria": ["A"], "Cantidad_Predicha": [100.0]}
+    )
+    productos = shares.disaggregate(forecast, window=4)
+    # Rows of other cells are only there with their actual sales
+    productos = productos[(productos["Region"] == "Norte") & (productos["Categoria"] == "A")].set_index("ID_Producto")
+
+    # Sales of the four weeks before the Monday of the forecast
+    window = history[
+        (history["Fecha"] >= pd.Timestamp("2024-01-08"))
+        & (history["Fecha"] < pd.Timestamp("2024-02-05"))
+        & (history["Region"] == "Norte")
+        & (history["Categoria"] == "A")
+    ]
+    sold = window.groupby("ID_Producto")["Cantidad"].sum()
+    np.testing.assert_allclose(productos.loc[sold.index, "Cantidad_Predicha"], 100 * sold / sold.sum())
+    # Product 3 has no sales, it gets no forecast
+    assert 3 not in productos.index
+
+
+def test_region_totals_add_up():
+    history = make_history()
+    forecast = weekly_forecast(history).groupby(["Fecha", "Region"], as_index=False)["Cantidad_Predicha"].sum()
+    # Without sales before it, the first week has no split among categories
+    first = forecast["Fecha"] == forecast["Fecha"].min()
+    assert ProductShares().fit(history, CATALOG).disaggregate(forecast[first], level="Region")["Cantidad_Predicha"].isna().all()
+    forecast = forecast[~first]
+    productos = ProductShares().fit(history, CATALOG).disaggregate(forecast, level="Region")
+    totals = productos.groupby(["Fecha", "Region"])["Cantidad_Predicha"].sum()
+    np.testing.assert_allclose(totals, forecast.set_index(["Fecha", "Region"]).loc[totals.index, "Cantidad_Predicha"])
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_engineering import FeatureEngineer
+
+VENTAS = os.path.join(os.path.dirname(__file__), "..", "data_clean", "ventas_clean.csv")
+
+
+@pytest.fixture(scope="module")
+def full(tmp_path_factory):
+    return FeatureEngineer(VENTAS, str(tmp_path_factory.mktemp("fe") / "data_fe.csv")).engineer()
+
+
+def test_compact_keeps_the_values(tmp_path, full):
+    fe = FeatureEngineer(VENTAS, str(tmp_path / "data_fe.csv"))
+    compact = fe.engineer(compact=True)
+
+    assert fe.memory_report["bytes_after"] < fe.memory_report["bytes_before"]
+    assert list(compact.columns) == list(full.columns)
+    for col in ("semana", "mes", "dia_semana", "ID_Region"):
+        assert compact[col].dtype == np.int8, col
+    for col in full.columns:
+        if isinstance(compact[col].dtype, pd.CategoricalDtype):
+            assert (compact[col].astype(str) == full[col].astype(str)).all(), col
+        elif col in FeatureEngineer.FLOAT64_COLUMNS:
+            assert compact[col].dtype == np.float64
+            pd.testing.assert_series_equal(compact[col], full[col])
+        elif pd.api.types.is_float_dtype(compact[col].dtype):
+            assert compact[col].dtype == np.float32, col
+            np.testing.assert_allclose(compact[col], full[col], rtol=1e-6, equal_nan=True)
+        else:
+            assert (compact[col].to_numpy() == full[col].to_numpy()).all(), col
+
+
+def test_lazy_features_match_the_full_pipeline(tmp_path, full):
+    input_path = tmp_path / "ventas_clean.csv"
+    input_path.write_bytes(open(VENTAS, "rb").read())
+    fe = FeatureEngineer(str(input_path), str(tmp_path / "data_fe.csv"))
+    features = ["cantidad_/_ventas_region_rmean_7", "ventas_categoria_rmean_7_/_14"]
+
+    lazy = fe.engineer(features=features)
+    assert list(lazy.columns) == fe.raw_columns + features
+    pd.testing.assert_frame_equal(lazy, full[lazy.columns])
+    # Only the closure: the lag, three rolling means and the two ratios
+    computed = set(fe.df.columns) - set(fe.raw_columns)
+    assert computed == {
+        "cantidad_lag_1",
+        "ventas_region_rolling_mean_7",
+        "ventas_categoria_rolling_mean_7",
+        "ventas_categoria_rolling_mean_14",
+        *features,
+    }
+    assert not os.path.exists(tmp_path / "data_fe.csv")
+
+    # Computed columns are reused, a rewritten input drops them
+    stages = len(fe.stage_records)
+    fe.engineer(features=features[:1])
+    assert len(fe.stage_records) == stages
+    mtime = os.path.getmtime(input_path)
+    os.utime(input_path, (mtime + 10, mtime + 10))
+    fe.engineer(features=features[:1])
+    assert fe.stage_records[stages]["stage"] == "load_data"
+    assert "ventas_categoria_rmean_7_/_14" not in fe.df.columns
+
+
+def test_day_windows_keep_the_columns(tmp_path, full):
+    days = FeatureEngineer(VENTAS, str(tmp_path / "data_fe.csv"), window_unit="days").engineer()
+    assert list(days.columns) == list(full.columns)
+    # Only the rolling columns and the features built on them change
+    for col in ("semana", "cantidad_lag_1", "ventas_region_lag_1", "ID_Region"):
+        pd.testing.assert_series_equal(days[col], full[col])
+    with pytest.raises(ValueError):
+        FeatureEngineer(VENTAS, window_unit="weeks")
@@ -0,0 +1,55 @@
+from figure_cache import FigureCache
+
+
+def make_cache(maxsize=2):
+    versions = {"ventas": 1}
+    cache = FigureCache(maxsize=maxsize, version=versions.__getitem__)
+    calls = []
+
+    @cache.memoize("ventas")
+    def figura(regiones, semana):
+        calls.append((regiones, semana))
+        return (tuple(regiones), semana, versions["ventas"])
+
+    return cache, figura, calls, versions
+
+
+def test_same_selection_in_any_order_is_a_hit():
+    cache, figura, calls, _ = make_cache()
+    assert figura(["Sur", "Norte"], 1) == figura(["Norte", "Sur", "Sur"], 1)
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_least_recently_used_is_evicted():
+    cache, figura, calls, _ = make_cache(maxsize=2)
+    figura(["Sur"], 1)
+    figura(["Sur"], 2)
+    figura(["Sur"], 1)  # Now the most recent
+    figura(["Sur"], 3)  # Evicts week 2
+    assert cache.stats()["size"] == 2
+    figura(["Sur"], 1)
+    assert len(calls) == 3
+    figura(["Sur"], 2)
+    assert len(calls) == 4
+
+
+def test_new_data_version_drops_the_old_figures():
+    cache, figura, calls, versions = make_cache(maxsize=8)
+    figura(["Sur"], 1)
+    figura(["Sur"], 2)
+    versions["ventas"] = 2
+    assert figura(["Sur"], 1)[2] == 2
+    # The entries of the previous version are gone, not just unreachable
+    assert cache.stats()["size"] == 1
+    assert len(calls) == 3
+
+
+def test_invalidate():
+    cache, figura, calls, _ = make_cache(maxsize=8)
+    figura(["Sur"], 1)
+    cache.invalidate(figura.__qualname__)
+    figura(["Sur"], 1)
+    cache.invalidate()
+    figura(["Sur"], 1)
+    assert len(calls) == 3
@@ -0,0 +1,67 @@
+import gzip
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+from flask import Flask
+
+from figure_payload import gzip_responses, lttb_indices, reduce_figure
+
+
+def test_lttb_keeps_ends_and_peaks():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 300)
+    y[4_321] = 50.0
+    idx = lttb_indices(x, y, 500)
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert (np.diff(idx) > 0).all()
+    assert 4_321 in idx
+    # Fewer points than requested: everything is kept
+    assert (lttb_indices(x[:100], y[:100], 500) == np.arange(100)).all()
+
+
+def test_reduce_figure_shrinks_lines_and_keeps_bars():
+    x = np.arange(5_000, dtype=float)
+    fig = go.Figure([go.Scatter(x=x, y=np.sqrt(x) / 3), go.Bar(x=list(range(3_000)), y=np.full(3_000, 1 / 3))])
+    reduce_figure(fig, max_points=2_000, webgl_threshold=1_000)
+
+    line, bars = fig.data
+    assert line.type == "scattergl"
+    assert len(line.x) == 2_000
+    assert len(bars.x) == 3_000
+    assert np.asarray(bars.y).dtype == np.float32
+    np.testing.assert_allclose(np.asarray(bars.y), 0.33)
+
+
+def make_server():
+    server = Flask(__name__)
+    gzip_responses(server, min_size=100)
+
+    @server.route("/grande")
+    def grande():
+        return {"valores": list(range(1_000))}
+
+    @server.route("/chico")
+    def chico():
+        return {"ok": True}
+
+    return server.test_client()
+
+
+def test_gzip_round_trip():
+    client = make_server()
+    plain = client.get("/grande")
+    compressed = client.get("/grande", headers={"Accept-Encoding": "gzip, deflate"})
+    assert "Content-Encoding" not in plain.headers
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert int(compressed.headers["Content-Length"]) < len(plain.data)
+    assert json.loads(gzip.decompress(compressed.data)) == plain.json
+
+
+def test_small_responses_are_not_compressed():
+    client = make_server()
+    response = client.get("/chico", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.json == {"ok": True}
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from forecast import TARGET, Forecaster, feature_matrix
+
+
+def make_data(seed=0, n=400):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "Fecha": pd.date_range("2024-01-01", periods=n, freq="D"),
+            "ID_Region": rng.integers(0, 6, n),
+            "semana": rng.integers(1, 53, n),
+            "precio_x_cantidad": rng.random(n) * 100,
+            "Cantidad_Semanal": rng.integers(10, 100, n),
+        }
+    )
+
+
+def forecaster(model_dir, **kwargs):
+    return Forecaster(params_path="no_existe.json", model_dir=str(model_dir), num_boost_round=5, **kwargs)
+
+
+def test_boosters_are_cached_by_data_and_params(tmp_path):
+    df = make_data()
+    first = forecaster(tmp_path).fit(df)
+    again = forecaster(tmp_path).fit(df)
+    assert (first.trained, again.trained, again.loaded) == (1, 0, 1)
+    np.testing.assert_allclose(again.predict(df)["Cantidad_Predicha"], first.predict(df)["Cantidad_Predicha"])
+
+    # Other training data or other parameters are other boosters
+    assert forecaster(tmp_path).fit(make_data(seed=1)).trained == 1
+    other = forecaster(tmp_path)
+    other.params["learning_rate"] = 0.5
+    assert other.fit(df).trained == 1
+    assert len(list(tmp_path.glob("lgbm-*.txt"))) == 3
+
+
+def test_least_recently_used_boosters_are_deleted(tmp_path):
+    datasets = [make_data(seed) for seed in range(3)]
+    keys = []
+    for df in datasets[:2]:
+        model = forecaster(tmp_path, max_boosters=2).fit(df)
+        keys.append(model.fingerprint(*_training(model, df)))
+    # The first booster is used again, the second becomes the oldest
+    assert forecaster(tmp_path, max_boosters=2).fit(datasets[0]).loaded == 1
+    forecaster(tmp_path, max_boosters=2).fit(datasets[2])
+
+    names = {path.name for path in tmp_path.glob("lgbm-*.txt")}
+    assert len(names) == 2
+    assert f"lgbm-{keys[0]}.txt" in names
+    assert f"lgbm-{keys[1]}.txt" not in names
+
+
+def test_backtest_reuses_the_fold_boosters(tmp_path):
+    df = make_data()
+    first = forecaster(tmp_path, ma_window=3)
+    predicted = first.backtest(df, n_splits=3)
+    again = forecaster(tmp_path, ma_window=3)
+    pd.testing.assert_frame_equal(again.backtest(df, n_splits=3), predicted)
+    assert (first.trained, again.trained, again.loaded) == (3, 0, 3)
+
+
+def _training(model, df):
+    """Training matrix and target of the LightGBM rows, as ``fit`` builds them."""
+    lgbm = ~df["ID_Region"].isin(model.ma_regions)
+    return feature_matrix(df)[lgbm], df.loc[lgbm, TARGET]
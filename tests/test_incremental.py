@@ -0,0 +1,91 @@
+import os
+
+import pandas as pd
+import pytest
+
+from feature_engineering import FeatureEngineer
+from incremental import IncrementalFeatureEngineer
+
+VENTAS = os.path.join(os.path.dirname(__file__), "..", "data_clean", "ventas_clean.csv")
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["float64", "compacto"])
+@pytest.mark.parametrize("appends", [[1], [3], [1, 2, 1]], ids=["un_dia", "varios_dias", "sucesivos"])
+def test_append_matches_full_recompute(tmp_path, appends, compact):
+    ventas = pd.read_csv(VENTAS)
+    fechas = pd.to_datetime(ventas["Fecha"])
+    days = sorted(fechas.unique())
+    cut = len(days) - sum(appends)
+
+    # History without its last days, engineered from scratch
+    history_path = tmp_path / "ventas_historia.csv"
+    ventas[fechas < days[cut]].to_csv(history_path, index=False)
+    incremental = IncrementalFeatureEngineer(
+        str(history_path), str(tmp_path / "data_fe.csv"), str(tmp_path / "state.pkl")
+    )
+    incremental.engineer(compact=compact)
+
+    # The removed days appended in batches, in the order of the file
+    for n_days in appends:
+        batch = fechas.isin(days[cut:cut + n_days])
+        incremental.append(ventas[batch])
+        cut += n_days
+    incremental.export()
+
+    full_path = tmp_path / "data_fe_completo.csv"
+    FeatureEngineer(VENTAS, str(full_path)).engineer(compact=compact)
+    assert (tmp_path / "data_fe.csv").read_bytes() == full_path.read_bytes()
+
+
+def test_engineer_rejects_feature_subsets(tmp_path):
+    incremental = IncrementalFeatureEngineer(VENTAS, str(tmp_path / "data_fe.csv"), str(tmp_path / "state.pkl"))
+    with pytest.raises(ValueError):
+        incremental.engineer(features=["semana"])
+
+
+def test_fallback_keeps_every_appended_row(tmp_path):
+    ventas = pd.read_csv(VENTAS)
+    fechas = pd.to_datetime(ventas["Fecha"])
+    days = sorted(fechas.unique())
+
+    history_path = tmp_path / "ventas_historia.csv"
+    ventas[fechas < days[-2]].to_csv(history_path, index=False)
+    incremental = IncrementalFeatureEngineer(
+        str(history_path), str(tmp_path / "data_fe.csv"), str(tmp_path / "state.pkl")
+    )
+    incremental.engineer()
+    # The last day is spliced in, the day before it is out of order and recomputes everything
+    incremental.append(ventas[fechas == days[-1]])
+    incremental.append(ventas[fechas == days[-2]])
+
+    output = pd.read_csv(tmp_path / "data_fe.csv")
+    assert sorted(output["ID_Venta"]) == sorted(ventas["ID_Venta"])
+    assert sorted(pd.read_csv(history_path)["ID_Venta"]) == sorted(ventas["ID_Venta"])
+
+
+def test_append_leaves_other_blocks_untouched(tmp_path):
+    ventas = pd.read_csv(VENTAS)
+    fechas = pd.to_datetime(ventas["Fecha"])
+    days = sorted(fechas.unique())
+
+    history_path = tmp_path / "ventas_historia.csv"
+    ventas[fechas < days[-1]].to_csv(history_path, index=False)
+    incremental = IncrementalFeatureEngineer(
+        str(history_path), str(tmp_path / "data_fe.csv"), str(tmp_path / "state.pkl")
+    )
+    incremental.engineer()
+    blocks_dir = tmp_path / "data_fe_blocks"
+    before = {path.name: path.stat().st_mtime_ns for path in blocks_dir.iterdir()}
+    output_mtime = (tmp_path / "data_fe.csv").stat().st_mtime_ns
+
+    # A single pair gets the new day, only its files and the heads after it change
+    last = ventas[fechas == days[-1]]
+    pair = last[["Categoria", "Region"]].iloc[0]
+    incremental.append(last[(last["Categoria"] == pair["Categoria"]) & (last["Region"] == pair["Region"])])
+
+    after = {path.name: path.stat().st_mtime_ns for path in blocks_dir.iterdir()}
+    changed = {name for name in before if after[name] != before[name]}
+    bodies = {name for name in changed if name.endswith("_body.csv")}
+    assert len(bodies) <= 1
+    assert len(changed) < len(before) // 2
+    assert (tmp_path / "data_fe.csv").stat().st_mtime_ns == output_mtime
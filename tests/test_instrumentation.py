@@ -0,0 +1,32 @@
+import json
+
+import pandas as pd
+import pytest
+
+from feature_engineering import FeatureEngineer
+from instrumentation import json_lines_hook, measure_stage
+
+
+def test_measure_stage_records_shape_and_time():
+    frames = [pd.DataFrame({"a": [1, 2, 3]})]
+    with measure_stage("etapa", lambda: frames[-1]) as record:
+        frames.append(frames[-1].assign(b=1, c=2))
+    assert record["stage"] == "etapa"
+    assert (record["rows_in"], record["rows_out"]) == (3, 3)
+    assert (record["cols_in"], record["cols_out"], record["cols_added"]) == (1, 3, 2)
+    assert record["wall_s"] >= 0 and record["cpu_s"] >= 0
+    assert record["error"] is None
+
+
+def test_failed_stage_is_recorded_and_raised(tmp_path):
+    path = tmp_path / "etapas.jsonl"
+    fe = FeatureEngineer(str(tmp_path / "no_existe.csv"), str(tmp_path / "data_fe.csv"))
+    fe.add_hook(json_lines_hook(str(path)))
+    with pytest.raises(FileNotFoundError):
+        fe.engineer()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["stage"] for r in records] == ["load_data"]
+    assert records[0]["error"].startswith("FileNotFoundError")
+    assert records[0]["run_id"] == fe.run_id
+    assert fe.stage_records == records
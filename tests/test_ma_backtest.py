@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import TimeSeriesSplit
+
+from ma_backtest import backtest_windows, best_window, moving_average_matrix
+
+WINDOWS = range(1, 9)
+
+
+def make_data(seed=0, n=600):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(10, 100, n).astype(float)
+    values[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({"ID_Region": rng.integers(0, 5, n), "Cantidad_Semanal": values})
+
+
+def pandas_moving_average(df, window):
+    """The notebook's transform lambda."""
+    return df.groupby("ID_Region")["Cantidad_Semanal"].transform(
+        lambda x: x.shift(1).rolling(window, min_periods=1).mean()
+    )
+
+
+def test_moving_average_matrix_matches_pandas():
+    df = make_data()
+    matrix = moving_average_matrix(df, WINDOWS)
+    for j, window in enumerate(WINDOWS):
+        np.testing.assert_allclose(matrix[:, j], pandas_moving_average(df, window), rtol=1e-12)
+
+
+def test_backtest_matches_the_notebook_loop():
+    df = make_data()
+    results = backtest_windows(df, WINDOWS, n_splits=4).set_index(["window", "fold"])
+
+    # The loop of evaluate_ma: every window, every fold, errors of the scored rows
+    for window in WINDOWS:
+        predicted = pandas_moving_average(df, window)
+        for fold, (_, val) in enumerate(TimeSeriesSplit(n_splits=4).split(df), start=1):
+            err = (predicted.iloc[val] - df["Cantidad_Semanal"].iloc[val]).abs().dropna()
+            row = results.loc[(window, fold)]
+            assert row["n"] == len(err)
+            np.testing.assert_allclose(row["RMSE"], np.sqrt((err**2).mean()), rtol=1e-12)
+            np.testing.assert_allclose(row["MAE"], err.mean(), rtol=1e-12)
+            np.testing.assert_allclose(row["Max_Error"], err.max(), rtol=1e-12)
+
+
+def test_best_window_takes_the_smallest_on_ties():
+    results = pd.DataFrame(
+        {"window": [1, 2, 3, 1, 2, 3], "fold": [1, 1, 1, 2, 2, 2], "RMSE": [3.0, 2.0, 2.0, 3.0, 1.0, 1.0],
+         "MAE": 1.0, "Max_Error": 1.0, "n": 10}
+    )
+    assert best_window(results) == 2
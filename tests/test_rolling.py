@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rolling import daily_rolling_stats
+from rolling import shifted_rolling_stats as _shifted_rolling_stats
+
+MEAN_WINDOWS = (3, 7)
+STD_WINDOWS = (3, 7)
+
+
+def shifted_rolling_stats(df, value_col, n_jobs=1):
+    """Engine columns in the order of ``pandas_stats``."""
+    stats = _shifted_rolling_stats(df, ["grupo"], value_col, MEAN_WINDOWS, STD_WINDOWS, n_jobs=n_jobs)
+    return np.column_stack([stats["mean", w] for w in MEAN_WINDOWS] + [stats["std", w] for w in STD_WINDOWS])
+
+
+def pandas_stats(df, value_col):
+    """The groupby/transform lambdas the engine replaces."""
+    grouped = df.groupby("grupo")[value_col]
+    columns = [grouped.transform(lambda x: x.shift(1).rolling(w).mean()) for w in MEAN_WINDOWS]
+    columns += [grouped.transform(lambda x: x.shift(1).rolling(w).std()) for w in STD_WINDOWS]
+    return np.column_stack(columns)
+
+
+def exact_std(values, window):
+    """Two-pass sample std of every shifted window of one group."""
+    out = np.full(len(values), np.nan)
+    for i in range(window, len(values)):
+        x = values[i - window:i]
+        out[i] = np.sqrt(((x - x.mean()) ** 2).sum() / (window - 1))
+    return out
+
+
+def sales(n=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "grupo": rng.choice(list("ABCDE"), n),
+        "Cantidad": rng.integers(0, 50, n).astype(np.float64),
+    })
+    df.loc[rng.choice(n, n // 20, replace=False), "Cantidad"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_matches_pandas_on_integer_quantities(n_jobs):
+    df = sales()
+    stats = shifted_rolling_stats(df, "Cantidad", n_jobs)
+    expected = pandas_stats(df, "Cantidad")
+    np.testing.assert_array_equal(np.isnan(stats), np.isnan(expected))
+    np.testing.assert_allclose(stats, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_near_constant_floats_keep_precision():
+    rng = np.random.default_rng(1)
+    n = 5_000
+    df = pd.DataFrame({
+        "grupo": np.repeat(["A", "B"], n),
+        "valor": np.r_[0.5 + rng.normal(0, 1e-9, n), 25.25 + rng.normal(0, 1e-9, n)],
+    })
+    stats = shifted_rolling_stats(df, "valor")
+    for rows in df.groupby("grupo").indices.values():
+        values = df["valor"].to_numpy()[rows]
+        for j, window in enumerate(STD_WINDOWS):
+            expected = exact_std(values, window)
+            np.testing.assert_allclose(stats[rows, len(MEAN_WINDOWS) + j], expected, rtol=1e-6)
+        for j, window in enumerate(MEAN_WINDOWS):
+            expected = pd.Series(values).shift(1).rolling(window).mean().to_numpy()
+            np.testing.assert_allclose(stats[rows, j], expected, rtol=1e-14)
+
+
+def test_drifting_floats_keep_precision():
+    rng = np.random.default_rng(2)
+    n = 200_000
+    values = np.linspace(0, 1e7, n) + rng.normal(0, 1, n)
+    df = pd.DataFrame({"grupo": "A", "valor": values})
+    stats = shifted_rolling_stats(df, "valor")
+    for j, window in enumerate(STD_WINDOWS):
+        # Exact std of every window in extended precision
+        windows = np.lib.stride_tricks.sliding_window_view(values, window)[:-1].astype(np.longdouble)
+        deviations = windows - windows.mean(axis=1, keepdims=True)
+        exact = np.sqrt((deviations**2).sum(axis=1) / (window - 1)).astype(np.float64)
+        expected = np.r_[np.full(window, np.nan), exact]
+        np.testing.assert_allclose(stats[:, len(MEAN_WINDOWS) + j], expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize("n", [0, 1])
+def test_tiny_inputs_on_a_pool(n):
+    df = sales(n)
+    stats = shifted_rolling_stats(df, "Cantidad", n_jobs=4)
+    assert stats.shape == (n, len(MEAN_WINDOWS) + len(STD_WINDOWS))
+    assert np.isnan(stats).all()
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_daily_windows_match_pandas_calendar(n_jobs):
+    rng = np.random.default_rng(4)
+    n = 3_000
+    df = pd.DataFrame(
+        {
+            "grupo": rng.choice(["a", "b", "c"], n),
+            # Days without sales in every group, several sales on others
+            "Fecha": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 200, n), unit="D"),
+            "Cantidad": rng.integers(1, 10, n),
+        }
+    )
+    stats = daily_rolling_stats(df, ["grupo"], "Cantidad", (3, 7, 30), (7, 42), n_jobs=n_jobs)
+
+    # Reference: daily totals on the full calendar, shifted one day
+    calendar = pd.date_range(df["Fecha"].min(), df["Fecha"].max())
+    totals = df.groupby(["grupo", "Fecha"])["Cantidad"].sum()
+    for name, w in [("mean", 3), ("mean", 7), ("mean", 30), ("std", 7), ("std", 42)]:
+        expected = np.empty(n)
+        for grupo, rows in df.groupby("grupo").groups.items():
+            daily = totals[grupo].reindex(calendar, fill_value=0).shift(1).rolling(w)
+            daily = daily.mean() if name == "mean" else daily.std()
+            expected[df.index.get_indexer(rows)] = daily.reindex(df.loc[rows, "Fecha"]).to_numpy()
+        np.testing.assert_allclose(stats[name, w], expected, rtol=1e-9, atol=1e-12, equal_nan=True)
@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+import pytest
+
+from feature_engineering import FeatureEngineer
+from streaming import StreamingFeatureEngineer
+
+VENTAS = os.path.join(os.path.dirname(__file__), "..", "data_clean", "ventas_clean.csv")
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["float64", "compacto"])
+def test_streaming_matches_full_engineer(tmp_path, compact):
+    streaming_path = tmp_path / "data_fe_bloques.csv"
+    StreamingFeatureEngineer(VENTAS, str(streaming_path), chunksize=1000).engineer(compact=compact)
+
+    full_path = tmp_path / "data_fe.csv"
+    FeatureEngineer(VENTAS, str(full_path)).engineer(compact=compact)
+    assert streaming_path.read_bytes() == full_path.read_bytes()
+
+
+def test_streaming_rejects_rows_without_keys(tmp_path):
+    ventas = pd.read_csv(VENTAS)
+    ventas.loc[ventas.index[:3], "Region"] = None
+    input_path = tmp_path / "ventas.csv"
+    ventas.to_csv(input_path, index=False)
+
+    streaming = StreamingFeatureEngineer(str(input_path), str(tmp_path / "data_fe.csv"))
+    with pytest.raises(ValueError):
+        streaming.engineer()
+
+
+def test_streaming_rejects_feature_subsets(tmp_path):
+    streaming = StreamingFeatureEngineer(VENTAS, str(tmp_path / "data_fe.csv"))
+    with pytest.raises(ValueError):
+        streaming.engineer(features=["semana"])
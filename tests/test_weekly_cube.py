@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from weekly_cube import WeeklyCube, shared_cube
+
+
+def make_data(seed=0, n=500):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "Semana": rng.integers(1, 10, n),
+            "Region": rng.choice(["Norte", "Sur", "Este"], n),
+            "Categoria": rng.choice(["Bebidas", "Lácteos", "Panadería", None], n),
+            "Cantidad": rng.integers(0, 20, n),
+            # Missing values in a float measure
+            "Monto": np.where(rng.random(n) < 0.2, np.nan, rng.random(n) * 100),
+        }
+    )
+
+
+def make_cube(seed=0):
+    return WeeklyCube(make_data(seed), ["Semana", "Region"], ["Cantidad"])
+
+
+def test_stale_version_keeps_the_current_cube(tmp_path):
+    shared_cube(str(tmp_path), "ventas", ("v1",), make_cube, modified=1)
+    current = shared_cube(str(tmp_path), "ventas", ("v2",), make_cube, modified=2)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # A worker that still sees the previous version rebuilds it
+    shared_cube(str(tmp_path), "ventas", ("v1",), make_cube, modified=1)
+    reloaded = shared_cube(str(tmp_path), "ventas", ("v2",), make_cube, modified=2)
+    assert len(list(tmp_path.iterdir())) == 2
+    assert reloaded.attrs["version_modified"] == 2
+    assert np.array_equal(reloaded.rows, current.rows)
+
+    # The next version removes both
+    shared_cube(str(tmp_path), "ventas", ("v3",), make_cube, modified=3)
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+QUERIES = [
+    (["Semana"], {}),
+    (["Region", "Semana"], {"Categoria": ["Bebidas", "Panadería"]}),
+    (["Categoria"], {"Semana": [2, 3, 4], "Region": ["Sur", "Oeste"]}),
+    (["Semana", "Region", "Categoria"], {"Region": ["Norte"]}),
+]
+
+
+@pytest.mark.parametrize("by, where", QUERIES)
+@pytest.mark.parametrize("stat", ["sum", "mean"])
+@pytest.mark.parametrize("dropna", [False, True])
+def test_aggregate_matches_groupby(by, where, stat, dropna):
+    df = make_data()
+    cube = WeeklyCube(df, ["Semana", "Region", "Categoria"], ["Cantidad", "Monto"])
+    # dropna filters the groups of each measure, checked on the one with missing values
+    measures = ["Monto"] if dropna else ["Cantidad", "Monto"]
+    result = cube.aggregate(by, where=where, measures=measures, stat=stat, dropna=dropna)
+
+    # The filtered groupby the dashboard callbacks ran before the cubes
+    selected = df.dropna(subset=["Semana", "Region", "Categoria"])
+    for dim, labels in where.items():
+        selected = selected[selected[dim].isin(labels)]
+    if dropna:
+        selected = selected.dropna(subset=["Monto"])
+    expected = getattr(selected.groupby(by)[measures], stat)()
+    if len(by) == 1:
+        expected.index = expected.index.get_level_values(0)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False)
+
+
+def test_saved_cube_is_memory_mapped(tmp_path):
+    df = make_data()
+    cube = WeeklyCube(df, ["Semana", "Region", "Categoria"], ["Cantidad", "Monto"], {"inicio": "2024-01-01"})
+    cube.save(str(tmp_path / "cubo"))
+    loaded = WeeklyCube.load(str(tmp_path / "cubo"))
+
+    assert isinstance(loaded.rows, np.memmap)
+    assert not loaded.rows.flags.writeable
+    assert loaded.attrs == cube.attrs
+    for stat in ("sum", "mean"):
+        pd.testing.assert_frame_equal(
+            loaded.aggregate(["Region", "Categoria"], stat=stat),
+            cube.aggregate(["Region", "Categoria"], stat=stat),
+        )